@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from uuid import uuid4
+import products
+
+# Runs many independent conversations through Orchestrator.handle, for offline
+# evaluation and partner integrations. Each conversation gets its own session
+# (cleared afterwards), so nothing leaks between them; up to `parallelism` run
+# at once and results come back as they finish, one JSON line each, followed
+# by a summary line. The semantic cache is bypassed, so every answer is
+# freshly generated and batch questions don't fill the live cache.
+#
+# A conversation is a question string, {"id": ..., "question": "..."} or
+# {"id": ..., "turns": ["...", "..."]} (turns run in order in one session).
+#
+#   POST /api/chat/batch   JSON list, {"conversations": [...], "parallelism": N},
+#                          or JSONL (Content-Type: application/x-ndjson)
+#   uv run batch_chat.py questions.jsonl --parallelism 8 --out results.jsonl
+
+def default_parallelism() -> int:
+    return int(os.getenv("CHAT_BATCH_PARALLELISM", "8"))
+
+def clamp_parallelism(parallelism) -> int:
+    limit = int(os.getenv("CHAT_BATCH_MAX_PARALLELISM", "32"))
+    return max(1, min(int(parallelism or default_parallelism()), limit))
+
+def parse_jsonl(lines):
+    """Items of a JSONL document; a line that is not JSON becomes a ValueError item."""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield ValueError(f"line {number}: {e}")
+
+def parse_conversation(item, index: int) -> dict:
+    if isinstance(item, Exception):
+        raise item
+    if isinstance(item, str):
+        conv_id, turns = str(index), [item]
+    elif isinstance(item, dict):
+        conv_id = str(item.get("id", index))
+        turns = item.get("turns") or item.get("messages")
+        if turns is None and item.get("question"):
+            turns = [item["question"]]
+        if isinstance(turns, list):
+            # Chat-style messages: only the user's turns are replayed
+            turns = [t.get("content") if isinstance(t, dict) else t
+                     for t in turns if not isinstance(t, dict) or t.get("role", "user") == "user"]
+    else:
+        turns = None
+    if not isinstance(turns, list) or not turns or not all(isinstance(t, str) and t.strip() for t in turns):
+        raise ValueError("expected a question string or a non-empty list of turns")
+    return {"index": index, "id": conv_id, "turns": turns}
+
+async def _aiter(items):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+class BatchRunner:
+    def __init__(self, orch, parallelism: int = None, keep_sessions: bool = False, max_items: int = None):
+        self.orch = orch
+        self.parallelism = clamp_parallelism(parallelism)
+        self.keep_sessions = keep_sessions
+        self.max_items = max_items or int(os.getenv("CHAT_BATCH_MAX_ITEMS", "10000"))
+        self.batch_id = uuid4().hex[:8]
+
+    async def run_conversation(self, conversation: dict) -> dict:
+        session_id = f"batch-{self.batch_id}-{conversation['index']}"
+        started = time.perf_counter()
+        turns, error = [], None
+        try:
+            for question in conversation["turns"]:
+                turn_started = time.perf_counter()
+                result = await self.orch.handle(question, session_id, use_cache=False)
+                debug = (result or {}).get("debug") or {}
+                turns.append({
+                    "question": question,
+                    "message": (result or {}).get("message"),
+                    "action": debug.get("planner_action"),
+                    "timings_ms": debug.get("timings_ms") or {"total": round((time.perf_counter() - turn_started) * 1000, 2)},
+                })
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            if not self.keep_sessions:
+                await self.orch.history.clear(session_id)
+                await products.get_product_history().clear(session_id)
+        return {
+            "index": conversation["index"],
+            "id": conversation["id"],
+            "session_id": session_id,
+            "ok": error is None,
+            "error": error,
+            "turns": turns,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    async def results(self, items):
+        """Yield one result per conversation, in completion order."""
+        pending = asyncio.Queue(maxsize=self.parallelism * 2)
+        done = asyncio.Queue()
+
+        async def feed():
+            index = 0
+            try:
+                async for item in _aiter(items):
+                    if index >= self.max_items:
+                        await done.put({"index": index, "ok": False,
+                                        "error": f"batch limit of {self.max_items} conversations reached; rest skipped"})
+                        break
+                    await pending.put((index, item, time.perf_counter()))
+                    index += 1
+            finally:
+                for _ in range(self.parallelism):
+                    await pending.put(None)
+
+        async def work():
+            while (entry := await pending.get()) is not None:
+                index, item, queued = entry
+                try:
+                    conversation = parse_conversation(item, index)
+                except ValueError as e:
+                    await done.put({"index": index, "ok": False, "error": str(e), "turns": []})
+                    continue
+                waited = (time.perf_counter() - queued) * 1000
+                result = await self.run_conversation(conversation)
+                await done.put({**result, "queued_ms": round(waited, 2)})
+
+        workers = [asyncio.create_task(feed())] + [asyncio.create_task(work()) for _ in range(self.parallelism)]
+        finished = asyncio.gather(*workers)
+        try:
+            while True:
+                getter = asyncio.ensure_future(done.get())
+                await asyncio.wait([getter, finished], return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                    continue
+                getter.cancel()
+                while not done.empty():
+                    yield done.get_nowait()
+                await finished  # re-raises a failed feed/worker
+                return
+        finally:
+            # The client went away (or the caller stopped early): stop the rest
+            for task in workers:
+                task.cancel()
+
+    async def lines(self, items):
+        """JSON lines: each result as it finishes, then {"summary": ...}."""
+        started = time.perf_counter()
+        summary = {"conversations": 0, "turns": 0, "errors": 0, "parallelism": self.parallelism}
+        latencies = []
+        async for result in self.results(items):
+            summary["conversations"] += 1
+            summary["turns"] += len(result.get("turns", []))
+            summary["errors"] += not result["ok"]
+            if "elapsed_ms" in result:
+                latencies.append(result["elapsed_ms"])
+            yield json.dumps(result, ensure_ascii=False, default=str) + "\n"
+        latencies.sort()
+        summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        if latencies:
+            summary["p50_ms"] = latencies[len(latencies) // 2]
+            summary["p95_ms"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        yield json.dumps({"summary": summary}) + "\n"
+
+# ---------------- CLI ----------------
+
+def read_items(path: str):
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return list(parse_jsonl(text.splitlines()))
+
+async def run_local(args, out):
+    from orchestrator import Orchestrator
+    from clients import get_clients
+    orch = Orchestrator()
+    try:
+        runner = BatchRunner(orch, args.parallelism, keep_sessions=args.keep_sessions)
+        async for line in runner.lines(read_items(args.input)):
+            out.write(line)
+            out.flush()
+        await orch.history.drain()
+    finally:
+        await get_clients().aclose()
+
+async def run_remote(args, out):
+    import httpx
+    with open(args.input, "rb") as f:
+        body = f.read()
+    content_type = "application/json" if body.lstrip().startswith(b"[") else "application/x-ndjson"
+    params = {"parallelism": args.parallelism} if args.parallelism else {}
+    if args.keep_sessions:
+        params["keep_sessions"] = "true"
+    async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+        async with client.stream("POST", "/api/chat/batch", content=body, params=params,
+                                 headers={"Content-Type": content_type}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    out.write(line + "\n")
+                    out.flush()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a batch of independent conversations through the chatbot.")
+    parser.add_argument("input", help="JSON list or JSONL file of conversations")
+    parser.add_argument("--out", default="batch_results.jsonl", help="results, one JSON line per conversation ('-' for stdout)")
+    parser.add_argument("--parallelism", type=int, default=None, help="conversations run at once (CHAT_BATCH_PARALLELISM)")
+    parser.add_argument("--url", help="send to a running server's /api/chat/batch instead of running in-process")
+    parser.add_argument("--keep-sessions", action="store_true", help="leave each conversation's history in the session store")
+    args = parser.parse_args()
+
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    try:
+        asyncio.run(run_remote(args, out) if args.url else run_local(args, out))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if out is not sys.stdout:
+        with open(args.out, encoding="utf-8") as f:
+            last = f.read().splitlines()[-1:]
+        summary = json.loads(last[0]).get("summary") if last else None
+        print(f"[INFO] Wrote results to {args.out}: {summary}")
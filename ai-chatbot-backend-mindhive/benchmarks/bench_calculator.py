@@ -0,0 +1,124 @@
+"""
+SafeCalculator: per-expression cost of the old recursive AST evaluator vs. the
+bounded, compiled evaluator (cold and LRU-cached), plus adversarial inputs.
+
+The adversarial section is a check, not just a report: every input must come
+back (as a value or a limit error) within --budget-ms, and a random fuzz run
+of large operands and nested powers must stay within the same budget. The old
+evaluator is never run on these: 9**9**9 alone would not finish.
+
+    uv run python benchmarks/bench_calculator.py --repeat 20000 --budget-ms 5
+"""
+import argparse
+import ast
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculator import OPERATORS, SafeCalculator
+
+TYPICAL = [
+    "12*7+3", "2**10", "(1500-250)/4", "-3+5*2", "3.5*4", "100/3",
+    "(79+59)*2*0.9", "2**0.5", "1+2+3+4+5+6+7+8+9+10", "((2+3)*(4-1))**2",
+]
+
+ADVERSARIAL = [
+    "9**9**9",
+    "2**10000000",
+    "(10**100)**(10**100)",
+    "10**38**10",
+    "(2**127)**8",
+    "(2**127)*(2**127)*(2**127)*(2**127)*(2**127)*(2**127)*(2**127)*(2**127)*(2**127)",
+    "99999999999999999999*99999999999999999999*99999999999999999999*99999999999999999999",
+    "1e38*1e38*1e38*1e38*1e38*1e38*1e38*1e38*1e38",
+    "1.5**100000",
+    "2**1e300",
+    "2**-(2**1000)",
+    "(-8)**0.5",
+    "(2**1023)/1e-300",
+    "9" * 5000,
+    "(" * 120 + "1" + ")" * 120,
+    "-" * 200 + "1",
+    "1+" * 2000 + "1",
+    "2**2**2**2**2**2**2**2",
+    "((((2**64)**2)**2)**2)**2",
+    "1/0",
+]
+
+def legacy_eval(node):
+    # The pre-limits evaluator (with ast.Constant in place of ast.Num)
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and type(node.op) in OPERATORS:
+        return OPERATORS[type(node.op)](legacy_eval(node.operand))
+    if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+        return OPERATORS[type(node.op)](legacy_eval(node.left), legacy_eval(node.right))
+    raise ValueError("Unsupported expression or characters.")
+
+def legacy(expression):
+    return legacy_eval(ast.parse(expression, mode="eval").body)
+
+def per_call_us(fn, expressions, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(expressions[i % len(expressions)])
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def timed_cold(calculator, expressions):
+    """(expression, result, ms) with an empty cache, so parsing and validation are included."""
+    for expression in expressions:
+        calculator.compiled.clear()
+        start = time.perf_counter()
+        result = calculator.eval_expr(expression)
+        yield expression, result, (time.perf_counter() - start) * 1000
+
+def fuzz_expression(rng, depth=0):
+    if depth > 4 or rng.random() < 0.3:
+        return str(rng.choice([rng.randint(0, 10 ** rng.randint(1, 38)), round(rng.uniform(-1e6, 1e6), 3)]))
+    op = rng.choice(["+", "-", "*", "/", "**", "**", "**"])
+    return f"({fuzz_expression(rng, depth + 1)}){op}({fuzz_expression(rng, depth + 1)})"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20000)
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    parser.add_argument("--fuzz", type=int, default=2000)
+    args = parser.parse_args()
+
+    for expression in TYPICAL:
+        assert SafeCalculator().eval_expr(expression) == legacy(expression), expression
+
+    print(f"typical expressions ({len(TYPICAL)} distinct, {args.repeat} calls)")
+    print(f"  legacy evaluator:     {per_call_us(legacy, TYPICAL, args.repeat):8.2f} us/call")
+    cold = lambda e: SafeCalculator(cache_size=1).compile(e)()
+    print(f"  bounded, uncached:    {per_call_us(cold, TYPICAL, args.repeat):8.2f} us/call")
+    warm = SafeCalculator()
+    print(f"  bounded, LRU cached:  {per_call_us(warm.eval_expr, TYPICAL, args.repeat):8.2f} us/call  "
+          f"(hit rate {warm.compiled.stats()['hit_rate']:.3f})")
+
+    calculator = SafeCalculator()
+    print(f"adversarial inputs (budget {args.budget_ms} ms each)")
+    worst = 0.0
+    for expression, result, elapsed in timed_cold(calculator, ADVERSARIAL):
+        shown = expression if len(expression) <= 40 else expression[:37] + "..."
+        outcome = result["error"] if isinstance(result, dict) else f"= {str(result)[:30]}"
+        print(f"  {elapsed:7.3f} ms  {shown:42s} {outcome}")
+        worst = max(worst, elapsed)
+        assert elapsed < args.budget_ms, f"{expression!r} took {elapsed:.1f} ms"
+
+    rng = random.Random(0)
+    fuzz_worst = 0.0
+    for _ in range(args.fuzz):
+        expression = fuzz_expression(rng)
+        start = time.perf_counter()
+        calculator.eval_expr(expression)
+        elapsed = (time.perf_counter() - start) * 1000
+        fuzz_worst = max(fuzz_worst, elapsed)
+        assert elapsed < args.budget_ms, f"fuzzed {expression!r} took {elapsed:.1f} ms"
+    print(f"worst case: {worst:.3f} ms adversarial, {fuzz_worst:.3f} ms over {args.fuzz} fuzzed expressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Wall time to push a set of independent conversations through the bot: one
+/api/chat request at a time (today's client loop) vs. one /api/chat/batch
+request at increasing parallelism.
+
+Runs against fake_services.py (started as a subprocess, like bench_load.py),
+so the LLM, vector store and outlets DB are local stand-ins with the given
+latencies. Questions are made unique so the answer caches don't help.
+
+    uv run python benchmarks/bench_chat_batch.py --conversations 200 --parallelism 1,4,16,32
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_load import CHAT_QUESTIONS, start_services, wait_until_up
+from fake_services import add_fault_args
+
+def conversations(n: int):
+    return [
+        {"id": f"c{i}", "turns": [f"{question} (ref {i})"]}
+        for i, question in zip(range(n), itertools.cycle(CHAT_QUESTIONS))
+    ]
+
+def sequential(client, items) -> float:
+    started = time.perf_counter()
+    for item in items:
+        for question in item["turns"]:
+            client.post("/api/chat", json={"question": question, "session_id": item["id"]}).raise_for_status()
+    return time.perf_counter() - started
+
+def batch(client, items, parallelism: int):
+    started = time.perf_counter()
+    first = None
+    summary = None
+    with client.stream("POST", "/api/chat/batch", json={"conversations": items, "parallelism": parallelism}) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            first = first or time.perf_counter() - started
+            row = json.loads(line)
+            summary = row.get("summary", summary)
+    return time.perf_counter() - started, first, summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--parallelism", default="1,4,16,32")
+    parser.add_argument("--port", type=int, default=8013)
+    parser.add_argument("--openai-port", type=int, default=8770)
+    parser.add_argument("--verbose", action="store_true")
+    add_fault_args(parser)
+    args = parser.parse_args()
+    args.semantic_cache = False
+
+    process = start_services(args)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_up(base_url, process)
+        items = conversations(args.conversations)
+        with httpx.Client(base_url=base_url, timeout=None) as client:
+            print(f"{args.conversations} single-turn conversations, LLM {args.llm_latency_ms:.0f} ms "
+                  f"(+{args.llm_token_ms:.0f} ms/token)")
+            wall = sequential(client, items)
+            print(f"  /api/chat one at a time   {wall:7.2f} s  {len(items) / wall:7.1f} conv/s")
+            for parallelism in (int(p) for p in args.parallelism.split(",")):
+                wall, first, summary = batch(client, items, parallelism)
+                print(f"  batch parallelism {parallelism:3d}     {wall:7.2f} s  {len(items) / wall:7.1f} conv/s  "
+                      f"first result {first * 1000:6.0f} ms  errors {summary['errors']}  "
+                      f"per-item p50 {summary.get('p50_ms', 0):.0f} ms")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Per-request cost of building clients and chains vs. reusing the
+application-lifetime ones from clients.AppClients.
+
+Two measurements, both offline:
+  1. construction: AsyncOpenAI + ChatOpenAI + OpenAIEmbeddings + compiled
+     products chain per request (the old behaviour) vs. one shared set,
+     reporting wall time and tracemalloc allocations per request.
+  2. connections: N sequential HTTP calls to a local server with a fresh
+     httpx client per call vs. one pooled keep-alive client. Against the real
+     OpenAI/Supabase endpoints every fresh client also pays a TLS handshake,
+     so the gap there is larger than shown here.
+
+    uv run python benchmarks/bench_client_pooling.py --requests 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+import httpx
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from openai import AsyncOpenAI
+from clients import AppClients, CHAT_MODEL, EMBEDDING_MODEL
+from products import build_product_chain
+
+# Stands in for the Pinecone retriever so no index lookup happens
+fake_retriever = RunnableLambda(lambda q: [Document(page_content="ZUS All-Day Cup – RM79.00")])
+
+def build_per_request():
+    AsyncOpenAI()
+    llm = ChatOpenAI(model=CHAT_MODEL)
+    OpenAIEmbeddings(model=EMBEDDING_MODEL)
+    return build_product_chain(llm, fake_retriever)
+
+def build_pooled(clients):
+    _ = clients.openai
+    _ = clients.embeddings
+    return clients._product_chain
+
+def measure(fn, n):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size for stat in snapshot.statistics("filename"))
+    return elapsed / n * 1000, allocated / n / 1024, peak / 1024
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+async def connections(url, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        async with httpx.AsyncClient() as client:
+            await client.get(url)
+    fresh = (time.perf_counter() - start) / n * 1000
+
+    async with httpx.AsyncClient() as client:
+        start = time.perf_counter()
+        for _ in range(n):
+            await client.get(url)
+        pooled = (time.perf_counter() - start) / n * 1000
+    return fresh, pooled
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    clients = AppClients()
+    clients._product_chain = build_product_chain(clients.llm, fake_retriever)
+
+    before = measure(build_per_request, args.requests)
+    after = measure(lambda: build_pooled(clients), args.requests)
+    print("construction per request")
+    print(f"  per-request clients: {before[0]:8.3f} ms  {before[1]:9.1f} KiB retained  peak {before[2]:9.1f} KiB")
+    print(f"  pooled clients:      {after[0]:8.3f} ms  {after[1]:9.1f} KiB retained  peak {after[2]:9.1f} KiB")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    fresh, pooled = asyncio.run(connections(url, args.requests))
+    server.shutdown()
+    print("HTTP round trip per request (local, no TLS)")
+    print(f"  fresh client:        {fresh:8.3f} ms")
+    print(f"  pooled keep-alive:   {pooled:8.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Prompt size and latency as a conversation grows: the old full-history
+rendering (every stored message, raw tool answers) vs. history.ConversationHistory
+(compacted tool answers, HISTORY_TOKEN_BUDGET window, background summaries).
+
+A scripted 50-turn conversation (outlet lists with addresses and map links,
+product answers, sums, small talk) is played through both. At each checkpoint
+turn it reports the tokens of the planner prompt and the two products prompts
+(standalone-question rewrite and answer), the CPU time spent preparing history
+for the turn, and a time-to-first-token MODELED from the prompt size at
+--prefill-ms-per-1k (not measured: there is no real provider behind the fakes).
+No network: the LLMs are fakes that record the prompts they are sent, and the
+summarizer returns a fixed ~100-token summary.
+
+    uv run python benchmarks/bench_history.py --turns 50 --budget 800
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ["PRODUCTS_REWRITE"] = "always"
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.runnables import RunnableLambda
+from history import ConversationHistory, estimate_tokens, render_line
+from llm_gateway import LLMGateway
+from planner import Planner
+from products import build_product_chain
+from session_store import MemoryConversationStore
+
+try:
+    import tiktoken
+    encoding = tiktoken.get_encoding("cl100k_base")
+    count_tokens = lambda text: len(encoding.encode(text))
+    TOKENIZER = "tiktoken cl100k_base"
+except Exception:
+    count_tokens = estimate_tokens
+    TOKENIZER = "~4 chars/token estimate"
+
+OUTLET_ANSWER = "Here are the ZUS Coffee outlets I found:\n" + "\n".join(
+    f"{i}. ZUS Coffee – {name}\n   Address: {i}{i}-G, Jalan {name} {i}/{i}, {name.upper()}, 47400 PETALING JAYA, SELANGOR\n"
+    f"   Google Maps: https://maps.app.goo.gl/{name[:4]}{i}AbCdEfGhIjK"
+    for i, name in enumerate(["Uptown Damansara", "SS2", "Damansara Jaya", "Kota Damansara", "Tropicana Gardens"], 1)
+)
+PRODUCT_ANSWER = (
+    "Yes! We have a few blue options. The ZUS All-Day Cup 500ml comes in Sky Blue and Thunder Blue for RM79.00 "
+    "(Thunder Blue is currently sold out), and the All Can Tumbler 600ml comes in Misty Blue for RM105.00. "
+    "Both keep drinks hot for up to 12 hours and cold for up to 24 hours, have a leak-proof lid and fit most "
+    "car cup holders. If you're after something lighter, the OG Cup 2.0 with screw-on lid is RM55.00."
+)
+AREAS = ["Damansara", "Petaling Jaya", "Bangsar", "Cheras", "Subang", "Puchong", "Kepong"]
+COLOURS = ["blue", "black", "white", "green", "red"]
+
+def full_history(messages):
+    """The old rendering: every stored message, as the planner and products prompts used to get it."""
+    return "\n".join(render_line(i, message) for i, message in enumerate(messages))
+
+def scripted_turn(turn: int):
+    """(user message, answer, action); varied so no two exchanges in the store repeat exactly."""
+    kind = (turn - 1) % 4
+    if kind == 0:
+        return f"Which outlets are in {AREAS[turn % len(AREAS)]}?", OUTLET_ANSWER, "call_outlets"
+    if kind == 1:
+        return f"Do you have {COLOURS[turn % len(COLOURS)]} tumblers?", PRODUCT_ANSWER, "call_products"
+    if kind == 2:
+        return f"what is 79*{turn}+105", str(79 * turn + 105), "call_calculator"
+    return "thanks, that's helpful", "You're welcome! Anything else I can help with?", "chitchat"
+
+class FakeCompletions:
+    def __init__(self):
+        self.prompt = ""
+
+    async def create(self, model, messages, **kwargs):
+        self.prompt = "\n".join(m["content"] for m in messages)
+        content = '{"action": "chitchat", "response_text": "ok"}'
+        return SimpleNamespace(
+            model=model, usage=None,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        )
+
+class FakeOpenAI:
+    def __init__(self, completions):
+        self.chat = SimpleNamespace(completions=completions)
+
+    def with_options(self, **options):
+        return self
+
+class PromptRecorder(BaseCallbackHandler):
+    def __init__(self):
+        self.prompts = []
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.prompts.append("\n".join(m.content for batch in messages for m in batch))
+
+async def fixed_summary(self, previous, dropped):
+    return ("The user asked about ZUS outlets around Damansara and Petaling Jaya and was given a list with addresses; "
+            "they asked about blue tumblers (All-Day Cup RM79, All Can Tumbler RM105) and did a few price sums.")
+
+def build_products(recorder):
+    llm = FakeListChatModel(responses=["blue tumbler"], callbacks=[recorder])
+    retriever = RunnableLambda(lambda q: [Document(page_content="ZUS All Can Tumbler 600ml – Misty Blue – RM105.00")])
+    return build_product_chain(llm, retriever)
+
+async def run(args, mode):
+    store = MemoryConversationStore(max_messages=args.max_messages)
+    completions = FakeCompletions()
+    planner = Planner(gateway=LLMGateway(FakeOpenAI(completions)))
+    recorder = PromptRecorder()
+    chain = build_products(recorder)
+    chat_history = ConversationHistory(store, budget=args.budget, summarize=args.summaries)
+    product_history = ConversationHistory(store, prefix="products:", budget=args.budget, summarize=args.summaries)
+    rows = []
+
+    for turn in range(1, args.turns + 1):
+        user_msg, answer, action = scripted_turn(turn)
+
+        started = time.perf_counter()
+        if mode == "old":
+            rendered = full_history(await store.get("s"))
+            product_rendered = full_history(await store.get("products:s"))
+        else:
+            _, rendered = await chat_history.load("s")
+            _, product_rendered = await product_history.load("s")
+        prepare_us = (time.perf_counter() - started) * 1e6
+
+        await planner.plan_with_llm(user_msg, rendered)
+        planner_tokens = count_tokens(completions.prompt)
+        recorder.prompts.clear()
+        await chain.sequential_chain.ainvoke({"question": user_msg, "conv_history": product_rendered})
+        rewrite_tokens, answer_tokens = (count_tokens(p) for p in recorder.prompts[:2])
+
+        if mode == "old":
+            await store.append("s", user_msg, answer)
+            if action == "call_products":
+                await store.append("products:s", user_msg, answer)
+        else:
+            tool = action in ("call_outlets", "call_products")
+            await chat_history.append("s", user_msg, answer, tool=tool)
+            if action == "call_products":
+                await product_history.append("s", user_msg, answer, tool=True)
+            # Summaries run after the turn is answered; let them land before the next one
+            await chat_history.drain()
+            await product_history.drain()
+
+        total = planner_tokens + rewrite_tokens + answer_tokens
+        rows.append({
+            "turn": turn, "prepare_us": prepare_us, "planner": planner_tokens,
+            "rewrite": rewrite_tokens, "answer": answer_tokens, "total": total,
+            # Planner, rewrite and answer run one after another on an LLM-planned products turn
+            "ttft_ms": total / 1000 * args.prefill_ms_per_1k,
+        })
+    return rows, chat_history.stats
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--budget", type=int, default=800, help="HISTORY_TOKEN_BUDGET")
+    parser.add_argument("--max-messages", type=int, default=50, help="SESSION_MAX_MESSAGES")
+    parser.add_argument("--no-summaries", dest="summaries", action="store_false")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=120.0,
+                        help="modeled provider prefill time per 1k prompt tokens")
+    parser.add_argument("--checkpoints", default="1,10,25,50")
+    args = parser.parse_args()
+
+    ConversationHistory._llm_summary = fixed_summary
+    checkpoints = {int(t) for t in args.checkpoints.split(",")}
+    old, _ = asyncio.run(run(args, "old"))
+    new, stats = asyncio.run(run(args, "new"))
+
+    print(f"tokens: {TOKENIZER}; budget {args.budget}; store keeps {args.max_messages} messages; "
+          f"summaries {'on' if args.summaries else 'off'}")
+    print(f"{'turn':>5s} {'':4s} {'planner':>8s} {'rewrite':>8s} {'answer':>8s} {'total':>8s} {'history us':>11s} {'model TTFT':>10s}")
+    for before, after in zip(old, new):
+        if before["turn"] not in checkpoints:
+            continue
+        for label, row in (("old", before), ("new", after)):
+            print(f"{row['turn']:5d} {label:4s} {row['planner']:8d} {row['rewrite']:8d} {row['answer']:8d} "
+                  f"{row['total']:8d} {row['prepare_us']:11.1f} {row['ttft_ms']:10.1f}")
+    last_old, last_new = old[-1], new[-1]
+    print(f"turn {last_new['turn']}: prompt tokens {last_old['total']} → {last_new['total']} "
+          f"({(1 - last_new['total'] / last_old['total']) * 100:.0f}% fewer), "
+          f"modeled TTFT {last_old['ttft_ms']:.0f} → {last_new['ttft_ms']:.0f} ms; "
+          f"history views: {stats['incremental']} incremental updates, {stats['rebuilds']} rebuilds, "
+          f"{stats['summaries']} summaries")
+    cumulative_old = sum(r["total"] for r in old)
+    cumulative_new = sum(r["total"] for r in new)
+    print(f"whole conversation: {cumulative_old} → {cumulative_new} prompt tokens")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Offline accuracy and latency of the deterministic intent router.
+
+Every labelled message is routed without any network call. Messages the
+router is unsure about fall back to the LLM planner and count towards
+"fallback", not towards errors. Rows with a "reply" must also get exactly
+that canned reply.
+
+    uv run python benchmarks/bench_intent_router.py
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_router import FastIntentRouter
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intent_messages.jsonl")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.dataset, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    router = FastIntentRouter()
+    routed = correct = 0
+    mistakes = []
+    for row in rows:
+        plan = router.route(row["message"])
+        if plan is None:
+            continue
+        routed += 1
+        expected = (row["action"], row.get("reply", plan["response_text"]))
+        got = (plan["action"], plan["response_text"])
+        if got == expected:
+            correct += 1
+        else:
+            mistakes.append((row["message"], expected, got))
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for row in rows:
+            router.route(row["message"])
+    per_msg_us = (time.perf_counter() - start) / (args.repeat * len(rows)) * 1e6
+
+    print(f"messages:          {len(rows)}")
+    print(f"routed locally:    {routed} ({routed / len(rows):.0%} of LLM planner calls avoided)")
+    print(f"fallback to LLM:   {len(rows) - routed}")
+    print(f"local precision:   {correct / routed if routed else 0:.1%}")
+    print(f"latency / message: {per_msg_us:.1f} µs")
+    for message, expected, got in mistakes:
+        print(f"  mismatch: {message!r} expected={expected} got={got}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+llm_gateway.LLMGateway against the local OpenAI-compatible stub from
+fake_services.py (no network, no API key):
+
+  concurrency  --distinct different requests under --max-concurrency: the
+               stub's peak in-flight count must not exceed the cap
+  burst        --burst identical requests arriving together (a popular
+               question), as completions and as streams, with coalescing
+               off and on: upstream calls made and caller latency
+  errors       --distinct requests at --error-rate injected 500s, with
+               retries off and on: how many callers still get an answer
+  deadline     a stub slower than --timeout: how long a caller waits before
+               the gateway gives up
+
+    uv run python benchmarks/bench_llm_gateway.py --burst 50 --llm-latency-ms 300
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import numpy as np
+from openai import AsyncOpenAI
+from fake_services import Faults, create_openai_stub, serve_in_thread
+from llm_gateway import LLMGateway
+
+QUESTION = [
+    {"role": "system", "content": "You are a helpful assistant for ZUS Coffee."},
+    {"role": "user", "content": "Do you have blue tumblers?"},
+]
+
+def question(i: int) -> list:
+    return [QUESTION[0], {"role": "user", "content": f"Do you have blue tumblers? (ref {i})"}]
+
+def upstream_calls(base_url: str) -> int:
+    return httpx.get(f"{base_url}/stats").json()["llm"]["calls"]
+
+def percentiles(latencies) -> str:
+    ms = np.asarray(latencies) * 1000
+    return f"p50 {np.percentile(ms, 50):7.1f} ms  p95 {np.percentile(ms, 95):7.1f} ms"
+
+async def timed(call):
+    started = time.perf_counter()
+    try:
+        await call
+        ok = True
+    except Exception:
+        ok = False
+    return time.perf_counter() - started, ok
+
+async def collect(stream):
+    return "".join([token async for token in stream])
+
+def run(base_url: str, scenario, *args, **options):
+    """(gateway, results) of one scenario on a fresh client and event loop."""
+    async def go():
+        client = AsyncOpenAI(base_url=f"{base_url}/v1", api_key="sk-bench")
+        gateway = LLMGateway(client, **options)
+        try:
+            return gateway, await scenario(gateway, *args)
+        finally:
+            await client.close()
+    return asyncio.run(go())
+
+async def burst(gateway, n: int, streaming: bool):
+    if streaming:
+        calls = [collect(gateway.stream(QUESTION, stage="bench")) for _ in range(n)]
+    else:
+        calls = [gateway.complete(QUESTION, stage="bench") for _ in range(n)]
+    return await asyncio.gather(*(timed(call) for call in calls))
+
+async def distinct(gateway, n: int):
+    return await asyncio.gather(*(timed(gateway.complete(question(i), stage="bench")) for i in range(n)))
+
+async def single(gateway):
+    return await timed(gateway.complete(QUESTION, stage="bench"))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--distinct", type=int, default=100)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-token-ms", type=float, default=5)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--timeout", type=float, default=0.5, help="per-attempt timeout for the deadline case")
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    llm = Faults(args.llm_latency_ms, args.llm_latency_ms / 10, seed=1)
+    serve_in_thread(create_openai_stub(llm, Faults(), answer_words=40, token_ms=args.llm_token_ms), args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    print(f"stub: {args.llm_latency_ms:.0f} ms to first token, {args.llm_token_ms:.0f} ms/token, 40-word answers")
+    print(f"\n{args.distinct} distinct requests, LLM_MAX_CONCURRENCY={args.max_concurrency}")
+    started = time.perf_counter()
+    gateway, results = run(base_url, distinct, args.distinct, max_concurrency=args.max_concurrency)
+    wall = time.perf_counter() - started
+    peak = httpx.get(f"{base_url}/stats").json()["llm"]["peak_in_flight"]
+    print(f"  gateway peak in flight {gateway.stats['peak_in_flight']}, stub peak {peak}, "
+          f"wall {wall:.2f} s, ok {sum(r[1] for r in results)}/{args.distinct}")
+
+    print(f"\nburst of {args.burst} identical requests")
+    for streaming in (False, True):
+        for coalesce in (False, True):
+            before = upstream_calls(base_url)
+            _, results = run(base_url, burst, args.burst, streaming, coalesce=coalesce, max_concurrency=args.burst)
+            calls = upstream_calls(base_url) - before
+            kind = "stream  " if streaming else "complete"
+            print(f"  {kind} coalesce {'on ' if coalesce else 'off'}: {calls:4d} upstream calls  "
+                  f"{percentiles([r[0] for r in results])}  ok {sum(r[1] for r in results)}/{args.burst}")
+
+    print(f"\n{args.distinct} distinct requests at {args.error_rate:.0%} injected 500s")
+    llm.error_rate = args.error_rate
+    for retries in (0, 2):
+        gateway, results = run(base_url, distinct, args.distinct,
+                               retries=retries, backoff=0.05, max_concurrency=args.distinct)
+        print(f"  LLM_RETRIES={retries}: ok {sum(r[1] for r in results)}/{args.distinct}  "
+              f"retries {gateway.stats['retries']}  {percentiles([r[0] for r in results])}")
+    llm.error_rate = 0.0
+
+    deadline = args.timeout * 3
+    print(f"\nstub 10 s to first token, LLM_TIMEOUT_SECONDS={args.timeout}, LLM_DEADLINE_SECONDS={deadline}")
+    llm.latency_ms, llm.jitter_ms = 10_000, 0
+    gateway, (elapsed, ok) = run(base_url, single, timeout=args.timeout, deadline=deadline, retries=5, backoff=0.05)
+    print(f"  gave up after {elapsed:.2f} s ({gateway.stats['retries']} retries), ok {ok}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Throughput and tail latency of main:app with no paid or remote calls.
+
+Starts benchmarks/fake_services.py (the app plus local OpenAI / vector store /
+outlets DB stand-ins) as a subprocess, then drives /api/chat, /api/products and
+/api/outlets at a fixed concurrency and reports p50/p95/p99 latency and
+requests per second per endpoint. Fault options (--llm-latency-ms,
+--db-error-rate, ...) are passed through to the stand-ins.
+
+Save a run and compare later runs against it to check a change:
+
+    uv run python benchmarks/bench_load.py --concurrency 32 --requests 500 --save baseline.json
+    uv run python benchmarks/bench_load.py --concurrency 32 --requests 500 --baseline baseline.json
+
+--url targets an already running server instead (no stand-ins are started).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_services import add_fault_args
+
+ENDPOINTS = ("chat", "products", "outlets")
+
+CHAT_QUESTIONS = [
+    "hi",
+    "12*7+3",
+    "(1500-250)/4",
+    "Do you have blue tumblers?",
+    "What colours does the All-Day Cup come in?",
+    "Is the Aqua Flask in stock?",
+    "Where is the outlet in Uptown Damansara?",
+    "How many outlets in Petaling Jaya?",
+    "List the outlets in Bangsar",
+    "thanks!",
+]
+PRODUCT_QUESTIONS = [
+    "Do you have blue tumblers?",
+    "How much is the All Can Tumbler?",
+    "Which mugs are in stock?",
+    "Show me cups under RM60",
+]
+OUTLET_QUESTIONS = [
+    "Where is ZUS Coffee Uptown Damansara?",
+    "How many outlets in Cheras?",
+    "List outlets in Subang",
+    "Which outlets are in Kuala Lumpur?",
+]
+
+def build_requests(endpoint: str, n: int, unique: bool, stream: bool):
+    """(method, path, kwargs) for each request; --unique defeats the answer caches."""
+    questions = {"chat": CHAT_QUESTIONS, "products": PRODUCT_QUESTIONS, "outlets": OUTLET_QUESTIONS}[endpoint]
+    for i, question in zip(range(n), itertools.cycle(questions)):
+        if unique:
+            question = f"{question} (ref {i})"
+        if endpoint == "chat":
+            body = {"question": question, "session_id": f"load-{i}", "stream": stream}
+            yield "POST", "/api/chat", {"json": body}
+        elif endpoint == "products":
+            yield "GET", "/api/products", {"params": {"query": question, "session_id": f"load-{i}"}}
+        else:
+            yield "GET", "/api/outlets", {"params": {"query": question}}
+
+async def send(client, method, path, kwargs):
+    """Latency in seconds (to the last byte) and whether the request succeeded."""
+    started = time.perf_counter()
+    try:
+        async with client.stream(method, path, **kwargs) as response:
+            body = b"".join([chunk async for chunk in response.aiter_bytes()])
+        ok = response.status_code < 400 and b"event: error" not in body
+    except httpx.HTTPError:
+        ok = False
+    return time.perf_counter() - started, ok
+
+async def run_endpoint(base_url: str, endpoint: str, args):
+    requests = list(build_requests(endpoint, args.requests, args.unique, args.stream))
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+    latencies, errors = [], 0
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                method, path, kwargs = queue.get_nowait()
+                elapsed, ok = await send(client, method, path, kwargs)
+                latencies.append(elapsed)
+                errors += not ok
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        wall = time.perf_counter() - started
+
+    ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / wall,
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+async def warm_up(base_url: str, endpoints):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        for endpoint in endpoints:
+            for method, path, kwargs in build_requests(endpoint, 2, unique=False, stream=False):
+                await client.request(method, path, **kwargs)
+
+def start_services(args) -> subprocess.Popen:
+    forwarded = []
+    for name, value in vars(args).items():
+        if name.split("_")[0] in ("llm", "embed", "vector", "db") or name in ("answer_words", "seed"):
+            forwarded += [f"--{name.replace('_', '-')}", str(value)]
+    if args.semantic_cache:
+        forwarded.append("--semantic-cache")
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_services.py")
+    # The app print()s every question and answer; hide that unless asked
+    return subprocess.Popen(
+        [sys.executable, script, "--port", str(args.port), "--openai-port", str(args.openai_port), *forwarded],
+        stdout=None if args.verbose else subprocess.DEVNULL,
+    )
+
+def wait_until_up(base_url: str, process, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError("fake_services.py exited during startup")
+        try:
+            if httpx.get(f"{base_url}/", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{base_url} did not come up within {timeout:.0f}s")
+
+def print_results(results: dict, baseline: dict = None):
+    columns = ("requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    print(f"{'endpoint':10s}" + "".join(f"{c:>10s}" for c in columns))
+    for endpoint, row in results.items():
+        print(f"{endpoint:10s}" + "".join(
+            f"{row[c]:10d}" if isinstance(row[c], int) else f"{row[c]:10.1f}" for c in columns
+        ))
+        old = (baseline or {}).get(endpoint)
+        if old:
+            # Relative change vs. the baseline: + is more throughput / more latency
+            deltas = "".join(
+                f"{(row[c] - old[c]) / old[c] * 100:+9.1f}%" if old.get(c) else f"{'':10s}"
+                for c in columns[2:]
+            )
+            print(f"{'  vs base':10s}{'':20s}{deltas}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="per endpoint")
+    parser.add_argument("--stream", action="store_true", help="use the SSE variant of /api/chat")
+    parser.add_argument("--unique", action="store_true", help="make every question distinct (cold caches)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--url", help="load an already running server instead of starting the stand-ins")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--openai-port", type=int, default=8766)
+    parser.add_argument("--verbose", action="store_true", help="show the app's stdout")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    add_fault_args(parser)
+    args = parser.parse_args()
+
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    process = None if args.url else start_services(args)
+    base_url = args.url or f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_up(base_url, process)
+        asyncio.run(warm_up(base_url, endpoints))
+        results = {}
+        for endpoint in endpoints:
+            results[endpoint] = asyncio.run(run_endpoint(base_url, endpoint, args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    print(f"concurrency {args.concurrency}, {args.requests} requests per endpoint, "
+          f"LLM {args.llm_latency_ms:.0f} ms (+{args.llm_token_ms:.0f} ms/token), "
+          f"vector {args.vector_latency_ms:.0f} ms, DB {args.db_latency_ms:.0f} ms")
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    if args.save:
+        config = {k: v for k, v in vars(args).items() if k not in ("save", "baseline")}
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Recall and latency of the local vector store: exact (brute force) vs. IVF.
+
+Synthetic clustered embeddings stand in for product chunks, so no OpenAI
+calls are made. Recall@k is measured against the exact top-k.
+
+    uv run python benchmarks/bench_local_vectorstore.py --rows 300 50000 --dim 1536
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from local_vectorstore import LocalVectorStore
+
+def synthetic(rows, dim, clusters, rng):
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    return centers[labels] + 0.3 * rng.standard_normal((rows, dim)).astype(np.float32)
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[300, 50_000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--nprobe", type=int, default=8)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for rows in args.rows:
+        vectors = synthetic(rows, args.dim, clusters=max(4, rows // 50), rng=rng)
+        store = LocalVectorStore(embedding=None, ann_min_rows=0, nprobe=args.nprobe)
+        store.add_vectors(vectors, [f"chunk {i}" for i in range(rows)])
+        queries = vectors[rng.integers(0, rows, args.queries)] + 0.1 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+        exact, exact_us = timed(lambda q: store.search_vector(q, args.k, exact=True)[0], queries)
+        start = time.perf_counter()
+        store._index()
+        build_s = time.perf_counter() - start
+        approx, approx_us = timed(lambda q: store.search_vector(q, args.k)[0], queries)
+        recall = np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approx, exact)])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store.save(tmp)
+            start = time.perf_counter()
+            loaded = LocalVectorStore.load(tmp, embedding=None)
+            load_ms = (time.perf_counter() - start) * 1000
+            assert list(loaded.search_vector(queries[0], args.k, exact=True)[0]) == list(exact[0])
+
+        print(f"rows={rows:>7} dim={args.dim} k={args.k}")
+        print(f"  brute force: {exact_us:10.1f} µs/query")
+        print(f"  IVF (nlist={store._ivf.nlist}, nprobe={args.nprobe}): {approx_us:10.1f} µs/query  "
+              f"recall@{args.k}={recall:.3f}  build={build_s:.2f}s")
+        print(f"  snapshot load (memmap): {load_ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+outlet_index against the LLM filter path, over the real outlets.sql (no
+OpenAI calls):
+
+  recall    "how many outlets in X": what the filter path can find at best
+            (the LLM's keywords ILIKE'd against the name only, as
+            outlet_queries.build_query does) vs. a name-or-address match vs.
+            the index (parsed postcode / city / state + phrase search)
+  coverage  which sample questions get a templated answer and which are left
+            to the LLM path (opening hours, follow-ups, unknown places); the
+            questions in MUST_DEFER (several places, negations, words that
+            are not a known place) must never get one
+  latency   index answer per question, vs. the filter + summary LLM calls it
+            replaces (see bench_load.py for those under the stand-ins)
+
+    uv run python benchmarks/bench_outlet_index.py --repeat 200
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outlets_replica import OutletsReplica
+from outlet_queries import build_query
+from outlet_index import ALIASES, COVERAGE, OutletIndex
+
+PLACES = ["pj", "kl", "shah alam", "cheras", "bangsar", "damansara", "selangor", "putrajaya", "47400"]
+
+QUESTIONS = [
+    "How many outlets in Petaling Jaya?",
+    "how many outlets in PJ",
+    "How many ZUS outlets are there in KL?",
+    "list outlets in 47400",
+    "Where is ZUS Coffee Uptown Damansara?",
+    "where is sunway pyramd",
+    "Any outlets in Bangsar?",
+    "how many outlets in selangor",
+    "How many outlets do you have?",
+    "list 3 outlets in shah alam",
+    "outlets in petalng jaya",
+    "Which outlets open in PJ?",
+    "what time does the Sunway Pyramid outlet close",
+    "is that one near the LRT?",
+    "any outlets in penang",
+    "How many outlets in Malaysia?",
+]
+
+# Several places, "outside"/"not", or a phrase that is no known city, state or
+# outlet name: a templated answer here would be wrong
+MUST_DEFER = [
+    "How many outlets in PJ and KL?",
+    "outlets in shah alam or klang",
+    "outlets outside KL",
+    "how many outlets are not in Selangor",
+    "how many outlets in jalan",
+    "list outlets in the mall",
+    "outlets in petalng jaya damansara",
+]
+
+SCOPED = ["How many outlets in Malaysia?", "How many outlets do you have?", "list outlets nationwide"]
+
+def count(replica, sql, params=()) -> int:
+    return replica._execute(sql, params)[0]["count"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    replica = OutletsReplica()
+    replica.load_sql_file()
+    index = OutletIndex()
+    index.load_replica(replica)
+
+    print(f"\nrecall: outlets found for \"how many outlets in X\" ({replica.row_count} outlets)")
+    print(f"  {'place':12s} {'name ILIKE':>10s} {'name/address':>12s} {'index':>6s}")
+    for place in PLACES:
+        phrase = ALIASES.get(place, place)
+        name_only = count(replica, *build_query({"intent": "count", "keywords": [phrase], "limit": 1}))
+        anywhere = count(replica, "SELECT COUNT(id) AS count FROM outlets WHERE name LIKE ? OR address LIKE ?",
+                         (f"%{phrase}%", f"%{phrase}%"))
+        found, _ = index.resolve(phrase)
+        print(f"  {place:12s} {name_only:10d} {anywhere:12d} {len(found or ()):6d}")
+
+    print("\ncoverage")
+    answered = 0
+    for question in QUESTIONS:
+        answer = index.answer(question)
+        answered += answer is not None
+        first = answer.splitlines()[0][:70] if answer else "→ LLM path"
+        print(f"  {question:48s} {first}")
+    print(f"  {answered}/{len(QUESTIONS)} answered from the index")
+    deferred = 0
+    for question in MUST_DEFER:
+        answer = index.answer(question)
+        deferred += answer is None
+        print(f"  {question:48s} {'→ LLM path ok' if answer is None else 'WRONG ' + answer.splitlines()[0][:60]}")
+    print(f"  {deferred}/{len(MUST_DEFER)} compound / unknown-place questions left to the LLM path")
+    # The table is one region's outlets: a nationwide answer must say so
+    scoped = all(index.answer(q) and COVERAGE in index.answer(q) for q in SCOPED)
+    print(f"  answers about every outlet scoped to {COVERAGE}: {'ok' if scoped else 'WRONG'}")
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for question in QUESTIONS:
+            index.answer(question)
+    per_question = (time.perf_counter() - started) / (args.repeat * len(QUESTIONS)) * 1e6
+    started = time.perf_counter()
+    for _ in range(20):
+        index.load_replica(replica)
+    build_ms = (time.perf_counter() - started) / 20 * 1000
+    print(f"\nlatency: {per_question:.1f} us per question (index rebuild {build_ms:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Outlet listing parser: the previous implementation (two html.parser trees
+per page, several CSS selectors per card) vs. scrapeData.parse_listing
+(one tree, one walk; lxml when installed, html.parser otherwise).
+
+Runs over the saved listing pages in benchmarks/data/outlet_pages/ and first
+checks that every implementation extracts exactly the same outlets and
+next-page links, then reports pages/second and the peak RSS growth of a
+fresh process parsing the pages (tracemalloc would miss lxml's C allocations).
+
+    uv run python benchmarks/bench_outlet_parser.py --repeat 50
+"""
+import argparse
+import glob
+import gc
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+import scrapeData
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "outlet_pages")
+
+def legacy_parse_store_cards(html):
+    soup = BeautifulSoup(html, "html.parser")
+    articles = soup.select("article.elementor-post")
+    outlets = []
+
+    for art in articles:
+        name_tag = art.select_one("p.elementor-heading-title")
+        if not name_tag:
+            name_tag = art.select_one("span.entry-title")
+        name = name_tag.get_text(strip=True) if name_tag else None
+
+        address_tag = name_tag.find_next("p") if name_tag else None
+        address = address_tag.get_text(strip=True) if address_tag else None
+
+        map_tag = art.select_one("a[href*='maps'], a[href*='goo.gl'], a[href*='g.page'], a[href*='google.com']")
+        map_link = map_tag["href"] if map_tag else None
+
+        if name and address and map_link:
+            outlets.append({
+                "name": name,
+                "address": address,
+                "google_map": map_link
+            })
+
+    return outlets
+
+def legacy_parse(html):
+    stores = legacy_parse_store_cards(html)
+    soup = BeautifulSoup(html, "html.parser")
+    next_btn = soup.select_one("a.next.page-numbers")
+    return stores, next_btn["href"] if next_btn else None
+
+def single_pass(html):
+    outlets, next_url = scrapeData.parse_listing(html)
+    return list(outlets), next_url
+
+def single_pass_html_parser(html):
+    lxml, scrapeData.lxml = scrapeData.lxml, None
+    try:
+        return single_pass(html)
+    finally:
+        scrapeData.lxml = lxml
+
+IMPLEMENTATIONS = {
+    "legacy (2x html.parser)": legacy_parse,
+    "single pass, html.parser": single_pass_html_parser,
+    "single pass, lxml": single_pass,
+}
+
+def load_pages():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+def check_equivalence(pages):
+    for name, html in pages:
+        expected = legacy_parse(html)
+        for impl_name, impl in IMPLEMENTATIONS.items():
+            got = impl(html)
+            assert got == expected, f"{impl_name} differs from the legacy parser on {name}"
+    return sum(len(legacy_parse(html)[0]) for _, html in pages)
+
+def throughput(impl, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, html in pages:
+            impl(html)
+    return repeat * len(pages) / (time.perf_counter() - start)
+
+def _vm_kib(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+
+def _peak_memory_child(impl_name, queue):
+    pages = load_pages()
+    gc.collect()
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")  # reset the VmHWM high-water mark to the current RSS
+    before = _vm_kib("VmRSS")
+    results = [IMPLEMENTATIONS[impl_name](html) for _, html in pages]
+    queue.put(_vm_kib("VmHWM") - before)
+    del results
+
+def peak_memory(impl_name):
+    """Peak RSS growth (KiB) of a fresh process parsing every page once; Linux only."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_peak_memory_child, args=(impl_name, queue))
+    proc.start()
+    peak = queue.get()
+    proc.join()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    pages = load_pages()
+    if scrapeData.lxml is None:
+        IMPLEMENTATIONS.pop("single pass, lxml")
+        print("lxml is not installed; skipping the lxml backend")
+    outlets = check_equivalence(pages)
+    print(f"{len(pages)} fixture pages, {outlets} outlets: all implementations produce identical output")
+
+    baseline = None
+    for name, impl in IMPLEMENTATIONS.items():
+        rate = throughput(impl, pages, args.repeat)
+        baseline = baseline or rate
+        print(f"  {name:26s} {rate:8.1f} pages/s  x{rate / baseline:5.1f}  peak RSS +{peak_memory(name) / 1024:6.2f} MiB")
+
+if __name__ == "__main__":
+    main()
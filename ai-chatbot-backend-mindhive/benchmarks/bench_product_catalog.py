@@ -0,0 +1,173 @@
+"""
+product_catalog against plain vector retrieval, with no OpenAI calls:
+
+  accuracy  superlative / filter / count questions over fake_services'
+            catalog: does the exact structured answer name the right
+            products, and do the vector store's top-k chunks (what the LLM
+            would have to answer from) even contain them? Questions about one
+            named product, yes/no questions and sizes must be left to RAG.
+  lookup    exact product names and sizes: is the product in the top-k of
+            the vector store alone vs. HybridRetriever (vector + BM25)?
+  latency   parse + answer, and BM25 search, per question on the catalog
+            replicated to --products products
+
+    uv run python benchmarks/bench_product_catalog.py --products 100 10000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_services import HashEmbeddings, PRODUCT_TAGS, PRODUCT_VARIANTS, build_product_snapshot, product_catalog
+from local_vectorstore import LocalVectorStore
+from product_catalog import HybridRetriever, ProductCatalog
+
+def names_where(keep, key, reverse=False, n=None):
+    rows = sorted((v for v in PRODUCT_VARIANTS if keep(v)), key=key, reverse=reverse)
+    names = list(dict.fromkeys(f"ZUS {v[0]}" for v in rows))
+    return names[:n] if n else names
+
+def is_a(v, category):
+    """Name, product type or tag, as the catalog categorizes."""
+    return category in v[0] or category in PRODUCT_TAGS.get(v[0], [])
+
+# question -> the products a correct answer must name
+QUESTIONS = {
+    "What are your most expensive tumblers?":
+        names_where(lambda v: is_a(v, "Tumbler"), key=lambda v: v[2], reverse=True, n=3),
+    "cheapest cup":
+        names_where(lambda v: is_a(v, "Cup"), key=lambda v: v[2], n=1),
+    "do you have blue tumblers":
+        names_where(lambda v: is_a(v, "Tumbler") and "Blue" in v[1], key=lambda v: v[2]),
+    "Which blue items are in stock?":
+        names_where(lambda v: "Blue" in v[1] and v[3], key=lambda v: v[2]),
+    "How many mugs do you have?":
+        names_where(lambda v: is_a(v, "Mug"), key=lambda v: v[2]),
+    "products under RM60":
+        names_where(lambda v: v[2] < 60, key=lambda v: v[2]),
+    "cheapest 2 cups":
+        names_where(lambda v: is_a(v, "Cup"), key=lambda v: v[2], n=2),
+    "most expensive 2 tumblers":
+        names_where(lambda v: is_a(v, "Tumbler"), key=lambda v: v[2], reverse=True, n=2),
+    "what is sold out":
+        names_where(lambda v: not v[3], key=lambda v: v[2]),
+}
+
+# Not filters: a structured answer here would be wrong, so they must go to RAG
+NOT_STRUCTURED = [
+    "Is the white mug microwave safe?",
+    "Can I buy the OG cup online?",
+    "Tell me about the Sky Blue All-Day Cup",
+    "tumblers over 500ml",
+    "cups under 20oz",
+]
+
+LOOKUPS = {
+    "Corak Malaysia 500ml": "ZUS Corak Malaysia Tumbler 500ml",
+    "Aqua Flask 1L price": "ZUS Aqua Flask 1L",
+    "Sundaze": "ZUS Sundaze Bundle",
+    "Frozee": "ZUS Frozee Cold Cup 650ml",
+    "OG Cup 2.0 screw on lid": "ZUS OG Cup 2.0 With Screw On Lid 500ml",
+    "kopi 470ml": "ZUS Kopi Tumbler 470ml",
+}
+
+def load(path: str, products: list) -> ProductCatalog:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"products": products}, f)
+    catalog = ProductCatalog()
+    catalog.load(path)
+    return catalog
+
+def replicate(products: list, n: int) -> list:
+    out = []
+    while len(out) < n:
+        for product in products:
+            copy = dict(product, product_id=product["product_id"] + 1000 * (len(out) // len(products) + 1))
+            copy["product_name"] = f"{product['product_name']} Edition {len(out) // len(products)}"
+            out.append(copy)
+            if len(out) == n:
+                break
+    return out
+
+def contains(text: str, names: list) -> bool:
+    return all(name in text for name in names)
+
+def timed(fn, inputs, repeat: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for x in inputs:
+            fn(x)
+    return (time.perf_counter() - start) / (repeat * len(inputs)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, nargs="+", default=[100, 10000])
+    parser.add_argument("--k", type=int, default=3, help="chunks the vector retriever returns")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        catalog_path = os.path.join(workdir, "zus_products.json")
+        build_product_snapshot(workdir, catalog_path)
+        store = LocalVectorStore.load(workdir, HashEmbeddings())
+        catalog = ProductCatalog()
+        catalog.load(catalog_path)
+        vector = store.as_retriever(search_kwargs={"k": args.k})
+        hybrid = HybridRetriever(vector_retriever=vector, catalog=catalog, k=args.k)
+
+        print(f"\naccuracy ({len(PRODUCT_VARIANTS)} variants, vector top-{args.k})")
+        exact = retrieved = 0
+        for question, expected in QUESTIONS.items():
+            answer = catalog.answer(question) or ""
+            context = " ".join(d.page_content for d in vector.invoke(question))
+            exact += contains(answer, expected)
+            retrieved += contains(context, expected)
+            print(f"  {question:42s} structured {'ok  ' if contains(answer, expected) else 'MISS'}  "
+                  f"vector context {'ok' if contains(context, expected) else 'MISS'}")
+        print(f"  structured {exact}/{len(QUESTIONS)} correct, "
+              f"vector top-{args.k} holds the answer {retrieved}/{len(QUESTIONS)}")
+        deferred = 0
+        for question in NOT_STRUCTURED:
+            spec = catalog.parse(question)
+            deferred += spec is None
+            print(f"  {question:42s} {'→ RAG ok' if spec is None else f'WRONG structured {spec}'}")
+        print(f"  {deferred}/{len(NOT_STRUCTURED)} non-filter questions left to RAG")
+        # The scraper can list a product twice (collection page + product URL)
+        base = product_catalog()["products"]
+        doubled = load(os.path.join(workdir, "doubled.json"), base + base[:3])
+        same = doubled.answer("How many cups do you have?") == catalog.answer("How many cups do you have?")
+        print(f"  duplicate product rows counted once: {'ok' if same else 'WRONG'}")
+        # A catalog scraped without tags can't tell which products are tumblers
+        untagged = load(os.path.join(workdir, "untagged.json"),
+                        [{k: v for k, v in p.items() if k not in ("tags", "product_type")} for p in base])
+        deferred = untagged.parse("do you have blue tumblers") is None
+        print(f"  untagged catalog leaves category questions to RAG: {'ok' if deferred else 'WRONG'}")
+        # A bound the question excludes is not listed: "over RM79" leaves out the RM79 cups
+        cases = {"products over RM79": "RM79.00 –", "products under RM55": "RM55.00 –"}
+        exact_bounds = all(text not in (catalog.answer(q) or text) for q, text in cases.items())
+        print(f"  over/under exclude the bound itself: {'ok' if exact_bounds else 'WRONG'}")
+
+        print(f"\nlookup (product in top-{args.k})")
+        hits = {"vector": 0, "hybrid": 0}
+        for query, name in LOOKUPS.items():
+            row = [query]
+            for label, retriever in (("vector", vector), ("hybrid", hybrid)):
+                found = any(name in d.page_content for d in retriever.invoke(query))
+                hits[label] += found
+                row.append(f"{label} {'ok  ' if found else 'MISS'}")
+            print(f"  {row[0]:28s} {'  '.join(row[1:])}")
+        print(f"  vector {hits['vector']}/{len(LOOKUPS)}, hybrid {hits['hybrid']}/{len(LOOKUPS)}")
+
+        print("\nlatency per question")
+        for n in args.products:
+            scaled = load(os.path.join(workdir, f"scaled_{n}.json"), replicate(base, n))
+            answer_us = timed(scaled.answer, list(QUESTIONS))
+            bm25_us = timed(lambda q: scaled.search(q, 5), list(LOOKUPS))
+            print(f"  {n:6d} products  parse+answer {answer_us:8.1f} us  bm25 top-5 {bm25_us:8.1f} us")
+
+if __name__ == "__main__":
+    main()
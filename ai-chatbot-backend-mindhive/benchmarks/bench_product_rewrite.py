@@ -0,0 +1,88 @@
+"""
+Products RAG latency with the standalone-question rewrite always on vs. the
+"auto" mode (skip it when there is no history or the question is
+self-contained), with the number of retriever calls each mode makes.
+
+The LLM and retriever are stubs with fixed latency, so the numbers show the
+critical path of each mode rather than OpenAI/Pinecone variance.
+
+    uv run python benchmarks/bench_product_rewrite.py --llm-ms 800 --retrieval-ms 120
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda
+from products import build_product_chain
+
+HISTORY = "Human: Do you have blue tumblers?\nAI: Yes, the All-Day Cup comes in Thunder Blue for RM79."
+
+# (question, conversation history) — first turns, self-contained follow-ups,
+# and follow-ups that genuinely need the rewrite
+WORKLOAD = [
+    ("Do you have blue tumblers from ZUS?", ""),
+    ("most expensive tumblers", ""),
+    ("What colours does the OG cup come in?", ""),
+    ("How much is the Frozee cold cup?", ""),
+    ("Is the All-Day Cup dishwasher safe?", HISTORY),
+    ("Any mugs under RM50?", HISTORY),
+    ("Do you sell the Sundaze collection tumbler?", HISTORY),
+    ("Is it available in red?", HISTORY),
+    ("How much is that one?", HISTORY),
+    ("Do you have those in 650ml?", HISTORY),
+]
+
+def stub_llm(latency):
+    async def call(prompt_value):
+        text = prompt_value.to_string()
+        await asyncio.sleep(latency)
+        if text.rstrip().endswith("standalone question:"):
+            question = text.split("question: ")[-1].split("standalone question:")[0]
+            # Context-dependent questions get rewritten; the rest come back unchanged
+            if any(w in question.lower() for w in (" it ", "that", "those")):
+                return "Is the ZUS All-Day Cup available in red?"
+            return question
+        return "The ZUS All-Day Cup in Thunder Blue is RM79.00."
+    return RunnableLambda(call)
+
+def stub_retriever(latency, calls):
+    async def call(query):
+        calls.append(query)
+        await asyncio.sleep(latency)
+        return [Document(page_content="ZUS All-Day Cup 500ml – Thunder Blue – RM79.00 (Available)")]
+    return RunnableLambda(call)
+
+async def run(chain, repeat):
+    samples = []
+    for _ in range(repeat):
+        for question, history in WORKLOAD:
+            start = time.perf_counter()
+            async for _ in chain.astream({"question": question, "conv_history": history}):
+                pass
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ms", type=float, default=800)
+    parser.add_argument("--retrieval-ms", type=float, default=120)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for mode in ("always", "auto"):
+        calls = []
+        chain = build_product_chain(stub_llm(args.llm_ms / 1000), stub_retriever(args.retrieval_ms / 1000, calls))
+        chain.rewrite_mode = mode
+        samples = asyncio.run(run(chain, args.repeat))
+        print(f"{mode:<7} mean={statistics.mean(samples):7.1f} ms  p50={statistics.median(samples):7.1f} ms  "
+              f"max={max(samples):7.1f} ms  retrievals={len(calls)}  {chain.stats}")
+
+if __name__ == "__main__":
+    main()
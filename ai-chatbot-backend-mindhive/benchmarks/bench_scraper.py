@@ -0,0 +1,171 @@
+"""
+Scraper wall-clock: the old sequential requests.get loop (with its sleep
+between listing pages) vs. the async Fetcher used by scrapeData, against a
+local fixture server with injected latency.
+
+The fixture server serves N product JSON documents and P paginated store
+listing pages, answers conditional requests with 304, and records the peak
+number of concurrent requests so the politeness limit can be checked.
+
+Three runs: baseline, async cold (empty validator cache), async warm (every
+page revalidated with If-None-Match → 304, no body transferred). The async runs
+use the production politeness settings (SCRAPE_PER_HOST / SCRAPE_MIN_INTERVAL,
+4 and 0.25 s by default); the baseline sleeps 1 s between listing pages, as
+the old scraper did.
+
+    uv run python benchmarks/bench_scraper.py --products 40 --pages 10 --latency-ms 150
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+import scrapeData
+from fetcher import Fetcher
+
+def product_json(i):
+    return (
+        '{"product": {"id": %d, "title": "Cup %d", "handle": "cup-%d", "tags": ["Tumbler"], '
+        '"variants": [{"option1": "Blue", "price": "79.00", "available": true}]}}' % (i, i, i)
+    )
+
+def listing_html(page, pages, base):
+    cards = "".join(
+        f'<article class="elementor-post"><p class="elementor-heading-title">ZUS Coffee – Store {page}-{n}</p>'
+        f'<p>{n} Jalan {page}, Petaling Jaya, Selangor</p>'
+        f'<a href="https://maps.app.goo.gl/{page}{n}">Direction</a></article>'
+        for n in range(12)
+    )
+    nav = f'<a class="next page-numbers" href="{base}/stores/page/{page + 1}/">Next</a>' if page < pages else ""
+    return f"<html><body><main>{cards}</main><nav>{nav}</nav></body></html>"
+
+class FixtureState:
+    def __init__(self, latency, pages):
+        self.latency = latency
+        self.pages = pages
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = 0
+        self.not_modified = 0
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            with state.lock:
+                state.in_flight += 1
+                state.peak = max(state.peak, state.in_flight)
+                state.requests += 1
+            try:
+                time.sleep(state.latency)
+                base = f"http://{self.headers['Host']}"
+                parts = self.path.strip("/").split("/")
+                if parts[0] == "products":
+                    body, content_type = product_json(int(parts[1])), "application/json"
+                else:
+                    body, content_type = listing_html(int(parts[2]), state.pages, base), "text/html"
+                etag = f'"{hash(body) & 0xffffffff:x}"'
+                if self.headers.get("If-None-Match") == etag:
+                    with state.lock:
+                        state.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(data)
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+def baseline(product_urls, start_url, page_sleep):
+    """The pre-async scraper: one blocking request at a time, sleep between listing pages."""
+    products = [requests.get(url).json() for url in product_urls]
+    stores = []
+    next_url = start_url
+    while next_url:
+        html = requests.get(next_url).text
+        stores.extend(scrapeData.parse_store_cards(html))
+        next_url = scrapeData.next_page_url(html)
+        if next_url:
+            time.sleep(page_sleep)
+    return len(products), len(stores)
+
+async def scrape_async(product_urls, start_url, cache_path, per_host, min_interval):
+    async with Fetcher(per_host=per_host, min_interval=min_interval, cache_path=cache_path) as fetcher:
+        responses = await scrapeData.fetch_all(product_urls, fetcher, progress=False)
+        stores = await scrapeData.crawl_outlet_pages(start_url, fetcher)
+    return len(responses), len(stores)
+
+def run_async(*args):
+    return asyncio.run(scrape_async(*args))
+
+def timed(state, fn):
+    state.peak = state.requests = state.not_modified = 0
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--per-host", type=int, default=int(os.getenv("SCRAPE_PER_HOST", "4")),
+                        help="politeness limit: concurrent requests per host")
+    parser.add_argument("--min-interval", type=float, default=float(os.getenv("SCRAPE_MIN_INTERVAL", "0.25")),
+                        help="minimum seconds between request starts on one host")
+    parser.add_argument("--page-sleep", type=float, default=1.0, help="baseline sleep between listing pages (old scraper)")
+    args = parser.parse_args()
+
+    state = FixtureState(args.latency_ms / 1000, args.pages)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    product_urls = [f"{base}/products/{i}/product.json" for i in range(args.products)]
+    start_url = f"{base}/stores/page/1/"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "validators.json")
+        runs = [
+            ("baseline (sequential)", lambda: baseline(product_urls, start_url, args.page_sleep)),
+            ("async cold", lambda: run_async(product_urls, start_url, cache_path, args.per_host, args.min_interval)),
+            ("async warm (304s)", lambda: run_async(product_urls, start_url, cache_path, args.per_host, args.min_interval)),
+        ]
+        print(f"{args.products} product URLs, {args.pages} listing pages, {args.latency_ms:.0f} ms server latency, "
+              f"per-host limit {args.per_host}, {args.min_interval:g} s between starts")
+        baseline_s = None
+        for name, fn in runs:
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed, (n_products, n_stores) = timed(state, fn)
+            baseline_s = baseline_s or elapsed
+            print(f"  {name:22s} {elapsed:7.2f} s  x{baseline_s / elapsed:5.1f}  "
+                  f"products={n_products} stores={n_stores} requests={state.requests} "
+                  f"304s={state.not_modified} peak concurrency={state.peak}")
+            if name.startswith("async"):
+                assert state.peak <= args.per_host, "politeness limit exceeded"
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Per-turn overhead of in-process tool dispatch vs. HTTP loopback.
+
+The products/outlets pipelines are replaced with instant stubs so the numbers
+only reflect the dispatch path (HTTP round trip + JSON encode/decode + an extra
+worker thread) and not LLM latency.
+
+    uv run python benchmarks/bench_tool_dispatch.py --turns 500
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# main:app builds an Orchestrator at import time; no request reaches OpenAI here.
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+import uvicorn
+import products
+import outlets
+from tools import ToolDispatcher
+from clients import get_clients
+
+ANSWER = "We have the ZUS All-Day Cup in Thunder Blue for RM79.00. " * 4
+
+async def stub_products(query, session_id):
+    return ANSWER
+
+async def stub_outlets(query, schema=None):
+    return ANSWER
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(port):
+    from main import app
+    # lifespan off: the stubs need no OpenAI/Pinecone clients or outlets replica
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+async def run(dispatcher, turns):
+    samples = []
+    for i in range(turns):
+        start = time.perf_counter()
+        if i % 2 == 0:
+            await dispatcher.call_products("blue tumbler", "bench")
+        else:
+            await dispatcher.call_outlets("outlets in PJ")
+        samples.append((time.perf_counter() - start) * 1000)
+    await get_clients().aclose()
+    return samples
+
+def report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{name:<8} mean={statistics.mean(samples):8.3f} ms  "
+          f"p50={statistics.median(samples):8.3f} ms  p95={p95:8.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=500)
+    args = parser.parse_args()
+
+    products.answer_product_question = stub_products
+    outlets.answer_outlet_question = stub_outlets
+
+    port = free_port()
+    server = start_server(port)
+    try:
+        local = asyncio.run(run(ToolDispatcher(mode="local"), args.turns))
+        remote = asyncio.run(run(ToolDispatcher(mode="remote", api_base=f"http://127.0.0.1:{port}/api"), args.turns))
+    finally:
+        server.should_exit = True
+
+    report("local", local)
+    report("remote", remote)
+    saved = statistics.mean(remote) - statistics.mean(local)
+    print(f"Per-turn latency saved by in-process dispatch: {saved:.3f} ms")
+
+if __name__ == "__main__":
+    main()
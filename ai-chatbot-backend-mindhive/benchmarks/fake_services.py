@@ -0,0 +1,359 @@
+"""
+Runs main:app against local stand-ins for every paid or remote dependency, so
+load tests cost nothing and need no network:
+
+  OpenAI    → an OpenAI-compatible stub (chat completions, streaming, embeddings)
+              served on --openai-port. Planner and outlet-filter prompts get
+              canned JSON, everything else a --answer-words answer.
+  Pinecone  → VECTOR_BACKEND=local over a snapshot of synthetic products,
+              embedded with the same bag-of-words hash the stub uses; the
+              same products are written as the zus_products.json catalog.
+  Supabase  → OUTLETS_BACKEND=local, the embedded replica loaded from outlets.sql.
+
+Each stand-in takes a latency (plus uniform jitter) and an error rate. LLM
+latency is time to first token plus a per-token delay. Injected OpenAI errors
+are HTTP 500s, which the app's LLM gateway retries like real ones; vector store
+and outlets DB errors are raised as exceptions inside the app.
+
+bench_load.py starts this as a subprocess; to run it by hand:
+
+    uv run python benchmarks/fake_services.py --port 8000 --llm-latency-ms 300
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_DIM = 256
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+OUTLET_AREAS = (
+    "uptown", "damansara", "bangsar", "cheras", "subang", "puchong", "kepong",
+    "klang", "shah alam", "petaling jaya", "kuala lumpur", "mont kiara", "cyberjaya",
+)
+
+PRODUCT_VARIANTS = [
+    ("All-Day Cup 500ml", "Sky Blue", 79.00, True),
+    ("All-Day Cup 500ml", "Thunder Blue", 79.00, False),
+    ("All Can Tumbler 600ml", "Midnight Black", 105.00, True),
+    ("All Can Tumbler 600ml", "Misty Blue", 105.00, True),
+    ("OG Cup 2.0 With Screw On Lid 500ml", "Ivory", 55.00, True),
+    ("OG Ceramic Mug 16oz", "Cloud White", 39.00, True),
+    ("Frozee Cold Cup 650ml", "Lavender", 55.00, True),
+    ("Aqua Flask 1L", "Forest Green", 129.00, False),
+    ("Sundaze Bundle", "Yellow", 149.00, True),
+    ("Corak Malaysia Tumbler 500ml", "Red", 89.00, True),
+    ("Travel Mug 350ml", "Steel", 69.00, True),
+    ("Kopi Tumbler 470ml", "Brown", 75.00, True),
+]
+
+# Shopify tags: the shop files cups under "Tumbler" too, whatever the name says
+PRODUCT_TAGS = {
+    "All-Day Cup 500ml": ["Tumbler", "BYSS"],
+    "All Can Tumbler 600ml": ["Tumbler"],
+    "OG Cup 2.0 With Screw On Lid 500ml": ["Tumbler", "BYSS"],
+    "OG Ceramic Mug 16oz": ["Mug"],
+    "Frozee Cold Cup 650ml": ["Cold Cup"],
+    "Aqua Flask 1L": ["Flask"],
+    "Sundaze Bundle": ["Bundle"],
+    "Corak Malaysia Tumbler 500ml": ["Tumbler"],
+    "Travel Mug 350ml": ["Mug", "Tumbler"],
+    "Kopi Tumbler 470ml": ["Tumbler"],
+}
+
+def product_catalog() -> dict:
+    """PRODUCT_VARIANTS in the zus_products.json layout scrapeData.extract_product_info writes."""
+    products = {}
+    for name, color, price, stock in PRODUCT_VARIANTS:
+        handle = "-".join(name.lower().replace(".", "").split())
+        product = products.setdefault(name, {
+            "product_name": f"ZUS {name}", "product_id": 1000 + len(products),
+            "product_type": "Drinkware", "tags": PRODUCT_TAGS.get(name, []), "variants": [],
+            "source_url": f"https://shop.zuscoffee.com/products/{handle}",
+        })
+        product["variants"].append({"color": color, "price": f"{price:.2f}", "available": stock})
+    return {"products": list(products.values())}
+
+def embed_text(text) -> list:
+    """Bag-of-words hashing: texts sharing words land close together."""
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for token in TOKEN_RE.findall(str(text).lower()):
+        digest = hashlib.md5(token.encode("utf-8")).digest()
+        vector[int.from_bytes(digest[:4], "little") % EMBEDDING_DIM] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+class HashEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [embed_text(t) for t in texts]
+
+    def embed_query(self, text):
+        return embed_text(text)
+
+class Faults:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    def delay(self) -> float:
+        return max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def should_fail(self) -> bool:
+        self.calls += 1
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            return True
+        return False
+
+    async def apply(self, name: str):
+        await asyncio.sleep(self.delay())
+        if self.should_fail():
+            raise RuntimeError(f"Injected {name} failure")
+
+    def apply_sync(self, name: str):
+        time.sleep(self.delay())
+        if self.should_fail():
+            raise RuntimeError(f"Injected {name} failure")
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "errors": self.errors}
+
+# ---------------- OpenAI-compatible stub ----------------
+
+def planner_reply(user_msg: str) -> dict:
+    text = user_msg.lower()
+    if any(word in text for word in ("outlet", "store", "branch", "where")):
+        return {"action": "call_outlets", "reasoning": "stub: outlet question", "missing_info": None,
+                "payload": {"query": user_msg}, "response_text": None}
+    if any(word in text for word in ("cup", "tumbler", "mug", "flask", "product", "drinkware")):
+        return {"action": "call_products", "reasoning": "stub: product question", "missing_info": None,
+                "payload": {"query": user_msg}, "response_text": None}
+    return {"action": "chitchat", "reasoning": "stub: small talk", "missing_info": None,
+            "payload": {}, "response_text": "Happy to help with ZUS drinkware and outlets!"}
+
+def filter_reply(question: str) -> dict:
+    text = question.lower()
+    keywords = [area for area in OUTLET_AREAS if area in text][:1]
+    intent = "count" if "how many" in text else "list"
+    return {"intent": intent, "keywords": keywords, "limit": 10}
+
+def completion_text(messages, answer_words: int) -> str:
+    system = " ".join(m["content"] for m in messages if m.get("role") == "system")
+    user = [m["content"] for m in messages if m.get("role") == "user"]
+    prompt = user[-1] if user else ""
+    if "AI Planner" in system:
+        match = re.search(r'User message: "(.*)"\s*$', prompt, re.S)
+        return json.dumps(planner_reply(match.group(1) if match else prompt))
+    if "JSON filter" in system:
+        return json.dumps(filter_reply(prompt))
+    if "standalone question" in prompt:
+        match = re.search(r"question: (.*?)standalone question:", prompt, re.S)
+        return match.group(1).strip() if match else prompt
+    return " ".join(["Sure!"] + ["ZUS"] * max(0, answer_words - 1))
+
+def create_openai_stub(llm: Faults, embed: Faults, answer_words: int = 40, token_ms: float = 0.0) -> FastAPI:
+    app = FastAPI()
+
+    def failure():
+        return JSONResponse({"error": {"message": "Injected failure", "type": "server_error"}}, status_code=500)
+
+    # Completions being served right now (streams until their last chunk)
+    load = {"in_flight": 0, "peak_in_flight": 0}
+
+    def begin():
+        load["in_flight"] += 1
+        load["peak_in_flight"] = max(load["peak_in_flight"], load["in_flight"])
+
+    def end():
+        load["in_flight"] -= 1
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        begin()
+        try:
+            await asyncio.sleep(llm.delay())
+        except BaseException:
+            end()
+            raise
+        if llm.should_fail():
+            end()
+            return failure()
+        content = completion_text(body["messages"], answer_words)
+        words = content.split(" ")
+        usage = {
+            "prompt_tokens": sum(len(str(m.get("content", ""))) for m in body["messages"]) // 4,
+            "completion_tokens": len(words),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": "chatcmpl-stub", "created": int(time.time()), "model": body["model"]}
+
+        if not body.get("stream"):
+            end()
+            return {**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}
+            ]}
+
+        async def events():
+            try:
+                for i, word in enumerate(words):
+                    if i and token_ms:
+                        await asyncio.sleep(token_ms / 1000)
+                    delta = {"content": word if i == len(words) - 1 else word + " "}
+                    chunk = {**base, "object": "chat.completion.chunk",
+                             "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+                yield "data: [DONE]\n\n"
+            finally:
+                end()
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        await asyncio.sleep(embed.delay())
+        if embed.should_fail():
+            return failure()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        data = [{"object": "embedding", "index": i, "embedding": embed_text(text)} for i, text in enumerate(inputs)]
+        return {"object": "list", "data": data, "model": body["model"],
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}}
+
+    @app.get("/stats")
+    def stats():
+        return {"llm": {**llm.stats(), **load}, "embeddings": embed.stats()}
+
+    return app
+
+def serve_in_thread(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+# ---------------- stand-ins inside the app ----------------
+
+def build_product_snapshot(directory: str, catalog_path: str = None):
+    """The vector snapshot dataProcess would ingest, plus the zus_products.json it came from."""
+    from local_vectorstore import LocalVectorStore
+    from dataProcess import preprocess_chunks
+    catalog = product_catalog()
+    docs = preprocess_chunks(catalog["products"])
+    store = LocalVectorStore.from_texts(
+        [d.page_content for d in docs], HashEmbeddings(),
+        metadatas=[d.metadata for d in docs], ids=[d.id for d in docs],
+    )
+    store.save(directory)
+    if catalog_path:
+        with open(catalog_path, "w", encoding="utf-8") as f:
+            json.dump(catalog, f, indent=2)
+
+def install_faults(vector: Faults, db: Faults):
+    from local_vectorstore import LocalVectorStore
+    from outlets_replica import OutletsReplica
+
+    async def asimilarity_search_with_score(self, query, k: int = 4, **kwargs):
+        embedding = await self._embedding.aembed_query(query)
+        await vector.apply("vector store")
+        return self.similarity_search_by_vector_with_score(embedding, k, **kwargs)
+
+    execute = OutletsReplica._execute
+
+    def _execute(self, sql, params=()):
+        # Runs in a worker thread, like a blocking database driver
+        db.apply_sync("outlets DB")
+        return execute(self, sql, params)
+
+    LocalVectorStore.asimilarity_search_with_score = asimilarity_search_with_score
+    OutletsReplica._execute = _execute
+
+def use_raw_text_embeddings():
+    # The app's OpenAIEmbeddings would otherwise tokenize with tiktoken (a
+    # download on first use) and send token ids, which the stub can't hash
+    import langchain_openai
+
+    class RawTextEmbeddings(langchain_openai.OpenAIEmbeddings):
+        check_embedding_ctx_length: bool = False
+
+    langchain_openai.OpenAIEmbeddings = RawTextEmbeddings
+
+def add_fault_args(parser):
+    for name, latency in (("llm", 300), ("embed", 50), ("vector", 20), ("db", 5)):
+        parser.add_argument(f"--{name}-latency-ms", type=float, default=latency)
+        parser.add_argument(f"--{name}-jitter-ms", type=float, default=latency / 4)
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-token-ms", type=float, default=5.0, help="delay between streamed tokens")
+    parser.add_argument("--answer-words", type=int, default=40)
+    parser.add_argument("--semantic-cache", action="store_true", help="leave the semantic answer cache on")
+    parser.add_argument("--seed", type=int, default=0)
+
+def faults_from_args(args, name: str) -> Faults:
+    return Faults(
+        getattr(args, f"{name}_latency_ms"),
+        getattr(args, f"{name}_jitter_ms"),
+        getattr(args, f"{name}_error_rate"),
+        seed=args.seed + sum(map(ord, name)),
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--openai-port", type=int, default=8765)
+    add_fault_args(parser)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chatbot-load-")
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-load-test",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.openai_port}/v1",
+        "VECTOR_BACKEND": "local",
+        "LOCAL_VECTOR_PATH": os.path.join(workdir, "product_index"),
+        "PRODUCTS_CATALOG_PATH": os.path.join(workdir, "zus_products.json"),
+        "EMBEDDING_CACHE_DIR": os.path.join(workdir, "embedding_cache"),
+        "OUTLETS_BACKEND": "local",
+        "OUTLETS_REPLICA_SOURCE": "sql",
+        "OUTLETS_SUPABASE_FALLBACK": "0",
+        "OUTLETS_SQL_PATH": os.path.join(BACKEND, "outlets.sql"),
+        "SESSION_BACKEND": "memory",
+        "TOOL_DISPATCH_MODE": "local",
+        "SEMANTIC_CACHE": "1" if args.semantic_cache else "0",
+    })
+
+    stub = create_openai_stub(
+        faults_from_args(args, "llm"), faults_from_args(args, "embed"),
+        answer_words=args.answer_words, token_ms=args.llm_token_ms,
+    )
+    serve_in_thread(stub, args.openai_port)
+    build_product_snapshot(os.environ["LOCAL_VECTOR_PATH"], os.environ["PRODUCTS_CATALOG_PATH"])
+    use_raw_text_embeddings()
+    install_faults(faults_from_args(args, "vector"), faults_from_args(args, "db"))
+
+    import main as app_module
+    print(f"[INFO] main:app on :{args.port}, OpenAI stub on :{args.openai_port}, scratch dir {workdir}", flush=True)
+    uvicorn.run(app_module.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import ast
+import math
 import operator
+from cache import TTLCache
 
 # Allowed operators mapping
 OPERATORS = {
@@ -11,36 +13,141 @@ OPERATORS = {
     ast.Pow: operator.pow
 }
 
+# Resource limits: every expression that passes them evaluates in microseconds.
+# Integer growth is checked *before* an operation runs, so 9**9**9 is rejected
+# instead of pinning a worker.
+MAX_SOURCE_LENGTH = 256
+MAX_NODES = 128
+MAX_DEPTH = 64
+MAX_OPERAND_BITS = 128      # |literal| < 2**128 (~3.4e38)
+MAX_RESULT_BITS = 1024      # any intermediate integer result (~1.8e308, the float range)
+
+class UnsupportedExpression(ValueError):
+    pass
+
+class LimitExceeded(ValueError):
+    pass
+
+def _bits(value) -> int:
+    return abs(value).bit_length() if isinstance(value, int) else 0
+
+def _check_result(value):
+    if isinstance(value, complex):
+        raise UnsupportedExpression("Result is not a real number.")
+    if _bits(value) > MAX_RESULT_BITS or (isinstance(value, float) and not math.isfinite(value)):
+        raise LimitExceeded("Result is too large.")
+    return value
+
+def _checked_mul(left, right):
+    if _bits(left) + _bits(right) > MAX_RESULT_BITS + 1:
+        raise LimitExceeded("Result is too large.")
+    return _check_result(left * right)
+
+def _checked_pow(base, exponent):
+    # Estimate the size of an integer power before computing it
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        if exponent > MAX_RESULT_BITS or (abs(base).bit_length() - 1) * exponent > MAX_RESULT_BITS:
+            raise LimitExceeded("Result is too large.")
+    return _check_result(base ** exponent)
+
+def _checked(op):
+    return lambda left, right: _check_result(op(left, right))
+
+BINARY = {
+    ast.Add: _checked(operator.add),
+    ast.Sub: _checked(operator.sub),
+    ast.Mult: _checked_mul,
+    ast.Div: _checked(operator.truediv),
+    ast.Pow: _checked_pow,
+}
+
 class SafeCalculator:
+    def __init__(self, cache_size: int = 1024):
+        # source → compiled evaluator, or (error type, message) for rejected input.
+        # Keyed on the exact text: dropping whitespace would change what an
+        # input means ("1 2" is an error, not 12; "2* *3" is not 2**3)
+        self.compiled = TTLCache(maxsize=cache_size, ttl=float("inf"), name="calculator")
 
     def eval_expr(self, expression: str):
         try:
-            tree = ast.parse(expression, mode='eval')
-            return self._eval(tree.body)
+            return self.compile(expression)()
         except ZeroDivisionError:
             return {
                 "success": False,
                 "error": "Division by zero is not allowed."
             }
+        except LimitExceeded as e:
+            return {
+                "success": False,
+                "error": f"Expression exceeds calculator limits: {str(e)}"
+            }
+        except OverflowError:
+            return {
+                "success": False,
+                "error": "Expression exceeds calculator limits: Result is too large."
+            }
         except Exception as e:
             return {
                 "success": False,
                 "error": f"Invalid expression: {str(e)}"
             }
 
-    def _eval(self, node):
+    def is_expression(self, expression: str) -> bool:
+        """Check that the text parses to arithmetic we can evaluate, without evaluating it."""
+        try:
+            self.compile(expression)
+        except LimitExceeded:
+            # Still arithmetic; eval_expr explains the limit to the user
+            return True
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            return False
+        return True
+
+    def compile(self, expression: str):
+        """Parse, validate and compile an expression into a zero-argument callable (LRU-cached)."""
+        cached = self.compiled.get(expression)
+        if cached is None:
+            try:
+                cached = self._compile_source(expression)
+            except (SyntaxError, ValueError, RecursionError, MemoryError) as e:
+                cached = (type(e), str(e))
+            self.compiled.set(expression, cached)
+        if isinstance(cached, tuple):
+            error_type, message = cached
+            raise error_type(message)
+        return cached
+
+    def _compile_source(self, source: str):
+        if len(source) > MAX_SOURCE_LENGTH:
+            raise LimitExceeded("Expression is too long.")
+        tree = ast.parse(source, mode='eval')
+        nodes = sum(1 for _ in ast.walk(tree.body))
+        if nodes > MAX_NODES:
+            raise LimitExceeded("Expression is too complex.")
+        return self._compile(tree.body, 1)
+
+    def _compile(self, node, depth):
+        if depth > MAX_DEPTH:
+            raise LimitExceeded("Expression is nested too deeply.")
+
         # Number: 10, 3.5, etc.
-        if isinstance(node, ast.Num):
-            return node.n
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            value = node.value
+            if _bits(value) > MAX_OPERAND_BITS or (isinstance(value, float) and abs(value) >= 2.0 ** MAX_OPERAND_BITS):
+                raise LimitExceeded("Number is too large.")
+            return lambda: value
 
         # Unary operator: -5
         if isinstance(node, ast.UnaryOp) and type(node.op) in OPERATORS:
-            return OPERATORS[type(node.op)](self._eval(node.operand))
+            operand = self._compile(node.operand, depth + 1)
+            op = OPERATORS[type(node.op)]
+            return lambda: op(operand())
 
         # Binary operators: + - * / **
-        if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
-            left = self._eval(node.left)
-            right = self._eval(node.right)
-            return OPERATORS[type(node.op)](left, right)
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY:
+            left = self._compile(node.left, depth + 1)
+            right = self._compile(node.right, depth + 1)
+            op = BINARY[type(node.op)]
+            return lambda: op(left(), right())
 
-        raise ValueError("Unsupported expression or characters.")
+        raise UnsupportedExpression("Unsupported expression or characters.")
@@ -1,10 +1,78 @@
-from fastapi import APIRouter
+import json
+from uuid import uuid4
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import StreamingResponse
 from orchestrator import Orchestrator
+from batch_chat import BatchRunner, clamp_parallelism, parse_jsonl
 
 router = APIRouter(tags=["Chat"])
 orch = Orchestrator()
 
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+async def chat_events(user_msg: str, session_id: str):
+    try:
+        async for event, data in orch.handle_stream(user_msg, session_id):
+            if event == "plan":
+                data = {**data, "session_id": session_id}
+            elif event == "token":
+                data = {"text": data}
+            elif event == "done" and isinstance(data, dict):
+                data = {**data, "session_id": session_id}
+            yield sse(event, data)
+    except Exception as e:
+        yield sse("error", {"message": str(e)})
+
+@router.get("/chat/cache")
+def chat_cache_stats():
+    cache = orch.semantic_cache
+    return {"enabled": cache is not None, **(cache.stats() if cache is not None else {})}
+
 @router.post("/chat")
-def chat(payload: dict):
+async def chat(payload: dict):
     user_msg = payload["question"]
-    return orch.handle(user_msg)
+    session_id = payload.get("session_id") or str(uuid4())
+
+    if payload.get("stream"):
+        return StreamingResponse(
+            chat_events(user_msg, session_id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    res = await orch.handle(user_msg, session_id)
+    if isinstance(res, dict):
+        res["session_id"] = session_id
+    return res
+
+@router.post("/chat/batch")
+async def chat_batch(request: Request, parallelism: int = None, keep_sessions: bool = False):
+    # JSONL is read in full first: the request body can't be consumed while
+    # the response is already streaming
+    body = await request.body()
+    if "ndjson" in request.headers.get("content-type", "") or "jsonl" in request.headers.get("content-type", ""):
+        items = list(parse_jsonl(body.decode("utf-8").splitlines()))
+    else:
+        try:
+            payload = json.loads(body)
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+        if isinstance(payload, dict):
+            parallelism = parallelism or payload.get("parallelism")
+            keep_sessions = keep_sessions or bool(payload.get("keep_sessions"))
+            payload = payload.get("conversations")
+        if not isinstance(payload, list):
+            raise HTTPException(status_code=400, detail="Expected a list of conversations")
+        items = payload
+    try:
+        parallelism = clamp_parallelism(parallelism)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="parallelism must be an integer")
+
+    runner = BatchRunner(orch, parallelism, keep_sessions=keep_sessions)
+    return StreamingResponse(
+        runner.lines(items),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,122 @@
+import os
+import asyncio
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+load_dotenv()
+
+# Application-lifetime clients shared by every request. main.lifespan warms them
+# up at startup and closes them at shutdown; anything used before that (scripts,
+# __main__ blocks) is built lazily on first access.
+
+CHAT_MODEL = "gpt-5-mini-2025-08-07"
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")),
+    )
+
+def _http_timeout() -> httpx.Timeout:
+    return httpx.Timeout(float(os.getenv("HTTP_TIMEOUT_SECONDS", "60")), connect=10.0)
+
+class AppClients:
+    def __init__(self):
+        self._http = None
+        self._openai = None
+        self._gateway = None
+        self._llm = None
+        self._embeddings = None
+        self._supabase = None
+        self._retriever = None
+        self._product_chain = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(limits=_http_limits(), timeout=_http_timeout())
+        return self._http
+
+    @property
+    def openai(self) -> AsyncOpenAI:
+        if self._openai is None:
+            self._openai = AsyncOpenAI(http_client=self.http)
+        return self._openai
+
+    @property
+    def gateway(self):
+        # Every chat completion goes through this (see llm_gateway.py)
+        if self._gateway is None:
+            from llm_gateway import LLMGateway
+            self._gateway = LLMGateway(self.openai)
+        return self._gateway
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            from llm_gateway import GatewayChatModel
+            self._llm = GatewayChatModel(model_name=CHAT_MODEL, gateway=self.gateway)
+        return self._llm
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+            embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL, http_async_client=self.http)
+            # EMBEDDING_CACHE=0 disables the query-embedding cache
+            if os.getenv("EMBEDDING_CACHE", "1") != "0":
+                from embedding_cache import CachedEmbeddings
+                embeddings = CachedEmbeddings(
+                    embeddings,
+                    model=EMBEDDING_MODEL,
+                    directory=os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache") or None,
+                    memory_items=int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "4096")),
+                )
+                import metrics
+                metrics.register_cache("embeddings", embeddings.cache_counts)
+            self._embeddings = embeddings
+        return self._embeddings
+
+    async def get_supabase(self):
+        if self._supabase is None:
+            async with self._lock:
+                if self._supabase is None:
+                    from outlets import Outlets
+                    self._supabase = await Outlets.supabaseConnect()
+        return self._supabase
+
+    async def get_retriever(self):
+        if self._retriever is None:
+            async with self._lock:
+                if self._retriever is None:
+                    from products import pineconeConnect
+                    # Pinecone resolves the index host with a blocking HTTP call
+                    self._retriever = await asyncio.to_thread(pineconeConnect, self.embeddings)
+        return self._retriever
+
+    async def get_product_chain(self):
+        if self._product_chain is None:
+            retriever = await self.get_retriever()
+            from products import build_product_chain
+            self._product_chain = build_product_chain(self.llm, retriever)
+        return self._product_chain
+
+    async def warm_up(self, supabase: bool = False):
+        _ = self.openai
+        await self.get_product_chain()
+        if supabase:
+            await self.get_supabase()
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+        self.__init__()
+
+clients = AppClients()
+
+def get_clients() -> AppClients:
+    return clients
@@ -1,7 +1,8 @@
 import os
 import json
+import hashlib
+import argparse
 from dotenv import load_dotenv
-from uuid import uuid4
 from langchain_pinecone import PineconeVectorStore, Pinecone
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
@@ -9,6 +10,8 @@ from pinecone import Pinecone, ServerlessSpec
 
 load_dotenv()
 index_name  = "pinecone-chatbot"  
+# Pinecone accepts at most 1000 ids per delete request
+DELETE_BATCH_SIZE = 1000
 
 def pineconeConnect() :
     pinecone_api_key = os.environ["PINECONE_API_KEY"] 
@@ -43,12 +46,18 @@ def format_chunk(product):
     lines.append(f"Source: {product['source_url']}")
     return "\n".join(lines)
     
+def chunk_id(product_id, chunk_text: str) -> str:
+    """Deterministic vector ID: the same product with the same content always maps to the same ID."""
+    digest = hashlib.sha1(chunk_text.encode("utf-8")).hexdigest()[:16]
+    return f"{product_id}:{digest}"
+
 def preprocess_chunks(products):
     docs = []
     for p in products:
         chunk_text = format_chunk(p)
 
         doc = Document(
+            id=chunk_id(p["product_id"], chunk_text),
             page_content=chunk_text,
             metadata={
                 "product_id": p["product_id"],
@@ -59,27 +68,110 @@ def preprocess_chunks(products):
         docs.append(doc)
     return docs
 
-def ingest_to_pinecone(docs):
-    index = pineconeConnect()
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    vectorstore = PineconeVectorStore(
-        index=index,
-        embedding=embeddings
-    )
+def use_local_backend():
+    return os.getenv("VECTOR_BACKEND", "pinecone").lower() == "local"
+
+def manifest_path():
+    # The manifest records what is already in the index: {chunk id: product_id}
+    if use_local_backend():
+        return os.path.join(os.getenv("LOCAL_VECTOR_PATH", "product_index"), "manifest.json")
+    return os.getenv("INGEST_MANIFEST_PATH", "pinecone_manifest.json")
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    # Older manifests were keyed by product_id ({product_id: chunk id})
+    if manifest and all(":" in str(v) for v in manifest.values()):
+        manifest = {v: k for k, v in manifest.items()}
+    return manifest
+
+def save_manifest(path, manifest):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def plan_changes(docs, manifest):
+    """
+    Split docs against the manifest into (docs to embed, ids to delete,
+    unchanged count). Keyed on chunk id, so products sharing a product_id each
+    keep their own chunk.
+    """
+    current = {doc.id: doc for doc in docs}
+    upserts = [doc for doc_id, doc in current.items() if doc_id not in manifest]
+    deletes = [doc_id for doc_id in manifest if doc_id not in current]
+    return upserts, deletes, len(current) - len(upserts)
 
-    uuids = [str(uuid4()) for _ in range(len(docs))]
+def ingest_to_pinecone(docs, full: bool = False):
+    """
+    Incremental, idempotent ingestion: only new or changed chunks are embedded
+    (EMBED_BATCH_SIZE texts per embedding call) and chunks of removed or changed
+    products are deleted. full=True clears the index and re-ingests everything.
+    """
+    batch_size = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+    embeddings = OpenAIEmbeddings(model="text-embedding-3-small", chunk_size=batch_size)
+    if use_local_backend():
+        from local_vectorstore import LocalVectorStore
+        path = os.getenv("LOCAL_VECTOR_PATH", "product_index")
+        vectorstore = LocalVectorStore.load(path, embeddings)
+    else:
+        index = pineconeConnect()
+        vectorstore = PineconeVectorStore(
+            index=index,
+            embedding=embeddings
+        )
+
+    mpath = manifest_path()
+    manifest = {} if full else load_manifest(mpath)
+    if full:
+        if use_local_backend():
+            vectorstore.delete(ids=list(vectorstore.ids))
+        else:
+            vectorstore.delete(delete_all=True)
 
-    print(f"[INFO] Uploading {len(docs)} documents into Pinecone…")
-    vectorstore.add_documents(documents=docs, ids=uuids)
+    upserts, deletes, unchanged = plan_changes(docs, manifest)
+    if use_local_backend():
+        # Rows written before the manifest existed (random IDs) are dropped too
+        wanted = {doc.id for doc in docs}
+        deletes = sorted(set(deletes) | {doc_id for doc_id in vectorstore.ids if doc_id not in wanted})
+    elif not manifest and not full:
+        print("[WARN] No ingestion manifest found; run once with --full to drop vectors from older ingestions")
+    print(f"[INFO] {len(upserts)} new/changed, {len(deletes)} removed, {unchanged} unchanged "
+          f"({'local index' if use_local_backend() else 'Pinecone'})")
+    if not upserts and not deletes:
+        print("[SUCCESS] Index already up to date")
+        return
+
+    for i in range(0, len(deletes), DELETE_BATCH_SIZE):
+        vectorstore.delete(ids=deletes[i:i + DELETE_BATCH_SIZE])
+    for i in range(0, len(upserts), batch_size):
+        batch = upserts[i:i + batch_size]
+        vectorstore.add_texts(
+            [doc.page_content for doc in batch],
+            metadatas=[doc.metadata for doc in batch],
+            ids=[doc.id for doc in batch],
+        )
+        print(f"[INFO] Embedded {min(i + batch_size, len(upserts))}/{len(upserts)} chunks")
+
+    if use_local_backend():
+        vectorstore.save(path)
+    save_manifest(mpath, {doc.id: str(doc.metadata["product_id"]) for doc in docs})
     print("[SUCCESS] Ingestion completed!")
 
 def main():
-    index = pineconeConnect()
     embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    vectorstore = PineconeVectorStore(
-        index=index,
-        embedding=embeddings
-    )
+    if use_local_backend():
+        from local_vectorstore import LocalVectorStore
+        vectorstore = LocalVectorStore.load(os.getenv("LOCAL_VECTOR_PATH", "product_index"), embeddings)
+    else:
+        index = pineconeConnect()
+        vectorstore = PineconeVectorStore(
+            index=index,
+            embedding=embeddings
+        )
     results = vectorstore.similarity_search(
         "most expensive tumblers",
         k=2
@@ -88,9 +180,12 @@ def main():
         print(f"* {res.page_content} [{res.metadata}]")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="clear the index and re-ingest every product")
+    args = parser.parse_args()
     products = load_docs("zus_products_readable.txt")
     data = preprocess_chunks(products)
-    ingest_to_pinecone(data)
+    ingest_to_pinecone(data, full=args.full)
     #main()
 
 
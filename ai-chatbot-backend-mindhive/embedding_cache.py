@@ -0,0 +1,218 @@
+import os
+import hashlib
+import sqlite3
+import asyncio
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from cache import TTLCache, normalize_text
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process locking only
+    fcntl = None
+
+# Query-embedding cache in front of the OpenAI embedder.
+#   L1: in-process LRU (EMBEDDING_CACHE_MEMORY_ITEMS entries)
+#   L2: on-disk store shared by every worker on the node: an append-only float32
+#       matrix read through np.memmap, plus a SQLite hash → row index.
+# Keys are sha1(model, normalized text), so "Blue tumbler?" and "blue tumbler"
+# share one embedding.
+
+def embedding_key(model: str, text: str) -> str:
+    return hashlib.sha1(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+class DiskEmbeddingStore:
+    def __init__(self, directory: str, model: str):
+        os.makedirs(directory, exist_ok=True)
+        safe_model = model.replace("/", "_")
+        self.vectors_path = os.path.join(directory, f"{safe_model}.f32")
+        self.lock_path = os.path.join(directory, f"{safe_model}.lock")
+        self.index_path = os.path.join(directory, f"{safe_model}.sqlite")
+        self._thread_lock = threading.Lock()
+        self._local = threading.local()
+        self._matrix = None
+        self.dim = None
+        with self._index() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            row = conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+            self.dim = row[0] if row else None
+
+    def _index(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _map(self, min_rows: int):
+        """(Re)open the memmap when another worker has appended past our view."""
+        matrix = self._matrix
+        if matrix is not None and matrix.shape[0] >= min_rows:
+            return matrix
+        rows = os.path.getsize(self.vectors_path) // (self.dim * 4)
+        matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        self._matrix = matrix
+        return matrix
+
+    def get_many(self, keys):
+        if self.dim is None or not keys:
+            return {}
+        conn = self._index()
+        found = {}
+        # SQLite caps bound parameters; chunk large lookups
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(conn.execute(
+                f"SELECT key, row FROM embeddings WHERE key IN ({placeholders})", chunk
+            ).fetchall())
+        if not found:
+            return {}
+        matrix = self._map(max(found.values()) + 1)
+        return {key: np.array(matrix[row]) for key, row in found.items()}
+
+    def put_many(self, items):
+        """items: list of (key, vector). Appends under an exclusive file lock."""
+        if not items:
+            return
+        vectors = np.asarray([v for _, v in items], dtype=np.float32)
+        with self._thread_lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                conn = self._index()
+                with conn:
+                    if self.dim is None:
+                        self.dim = vectors.shape[1]
+                        conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('dim', ?)", (self.dim,))
+                    existing = set()
+                    keys = [k for k, _ in items]
+                    for i in range(0, len(keys), 500):
+                        chunk = keys[i:i + 500]
+                        placeholders = ",".join("?" * len(chunk))
+                        existing.update(k for (k,) in conn.execute(
+                            f"SELECT key FROM embeddings WHERE key IN ({placeholders})", chunk
+                        ))
+                    fresh = [(k, v) for (k, _), v in zip(items, vectors) if k not in existing]
+                    if not fresh:
+                        return
+                    row_bytes = self.dim * 4
+                    with open(self.vectors_path, "ab") as f:
+                        # An append that died half-way leaves a partial row at the
+                        # end; cut it off so new rows line up with their keys
+                        size = f.seek(0, os.SEEK_END)
+                        first_row = size // row_bytes
+                        if size % row_bytes:
+                            print(f"[WARN] Dropping {size % row_bytes} trailing bytes of a partial row in {self.vectors_path}")
+                            f.truncate(first_row * row_bytes)
+                        f.write(np.asarray([v for _, v in fresh], dtype=np.float32).tobytes())
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO embeddings (key, row) VALUES (?, ?)",
+                        [(k, first_row + i) for i, (k, _) in enumerate(fresh)]
+                    )
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __len__(self):
+        return self._index().execute("SELECT COUNT(key) FROM embeddings").fetchone()[0]
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embedder: Embeddings, model: str, directory: str = None, memory_items: int = 4096):
+        self.embedder = embedder
+        self.model = model
+        # Same name as the register_cache() entry in clients.py, which replaces
+        # this cache's own numbers with the memory + disk totals below
+        self.memory = TTLCache(maxsize=memory_items, ttl=float("inf"), name="embeddings")
+        self.disk = DiskEmbeddingStore(directory, model) if directory else None
+        # Updated from asyncio.to_thread workers
+        self._stats_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "model": self.model,
+            "lookups": lookups,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self.memory),
+            "disk_items": len(self.disk) if self.disk is not None else 0,
+        }
+
+    def cache_counts(self) -> dict:
+        return {
+            "hits": self.memory_hits + self.disk_hits,
+            "misses": self.misses,
+            "size": len(self.memory),
+            "evictions": self.memory.evictions,
+        }
+
+    def _lookup(self, texts):
+        keys = [embedding_key(self.model, t) for t in texts]
+        vectors = {}
+        for key in keys:
+            vector = self.memory.get(key)
+            if vector is not None:
+                vectors[key] = vector
+        memory_hits = len(vectors)
+        on_disk = {}
+        if self.disk is not None:
+            pending = [k for k in dict.fromkeys(keys) if k not in vectors]
+            on_disk = self.disk.get_many(pending)
+            for key, vector in on_disk.items():
+                vector = vector.tolist()
+                self.memory.set(key, vector)
+                vectors[key] = vector
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        with self._stats_lock:
+            self.memory_hits += memory_hits
+            self.disk_hits += len(on_disk)
+            self.misses += len(missing)
+        return keys, vectors, missing
+
+    def _store(self, vectors, missing, embedded):
+        items = list(zip(missing.keys(), embedded))
+        for key, vector in items:
+            self.memory.set(key, vector)
+            vectors[key] = vector
+        return items
+
+    def embed_documents(self, texts):
+        keys, vectors, missing = self._lookup(texts)
+        if missing:
+            with metrics.span("embedding"):
+                embedded = self.embedder.embed_documents(list(missing.values()))
+            metrics.record_usage(self.model, "embedding")
+            items = self._store(vectors, missing, embedded)
+            if self.disk is not None:
+                self.disk.put_many(items)
+        return [vectors[k] for k in keys]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        keys, vectors, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            with metrics.span("embedding"):
+                embedded = await self.embedder.aembed_documents(list(missing.values()))
+            metrics.record_usage(self.model, "embedding")
+            items = self._store(vectors, missing, embedded)
+            if self.disk is not None:
+                await asyncio.to_thread(self.disk.put_many, items)
+        return [vectors[k] for k in keys]
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import httpx
+
+# Async HTTP fetcher for the scrapers.
+#   - one pooled keep-alive client for every request
+#   - at most SCRAPE_PER_HOST requests in flight per host, and request starts
+#     on one host spaced by at least SCRAPE_MIN_INTERVAL seconds (politeness)
+#   - retries with exponential backoff + jitter on 429/5xx and transport errors;
+#     a Retry-After header (seconds or HTTP-date) is honoured up to max_backoff
+#   - conditional requests: ETag / Last-Modified from the previous run are sent
+#     as If-None-Match / If-Modified-Since; a 304 reuses the stored body
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+
+class FetchResult:
+    def __init__(self, url: str, status: int, text: str, changed: bool):
+        self.url = url
+        self.status = status
+        self.text = text
+        self.changed = changed
+
+    def json(self):
+        return json.loads(self.text)
+
+class ValidatorCache:
+    """url → {etag, last_modified, body}, persisted as one JSON file between runs."""
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def headers(self, url: str) -> dict:
+        entry = self.entries.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def body(self, url: str):
+        entry = self.entries.get(url)
+        return entry["body"] if entry else None
+
+    def update(self, url: str, response: httpx.Response):
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if etag or last_modified:
+            self.entries[url] = {"etag": etag, "last_modified": last_modified, "body": response.text}
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+class Fetcher:
+    def __init__(self, per_host: int = None, min_interval: float = None, retries: int = None,
+                 backoff: float = 0.5, max_backoff: float = 30.0, timeout: float = 30.0, cache_path: str = None):
+        self.per_host = per_host or int(os.getenv("SCRAPE_PER_HOST", "4"))
+        self.min_interval = min_interval if min_interval is not None else float(os.getenv("SCRAPE_MIN_INTERVAL", "0.25"))
+        self.retries = retries if retries is not None else int(os.getenv("SCRAPE_RETRIES", "3"))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cache = ValidatorCache(cache_path if cache_path is not None else os.getenv("SCRAPE_CACHE_PATH", "scrape_cache.json"))
+        self.client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.per_host * 4, max_keepalive_connections=self.per_host * 4),
+        )
+        self._hosts = {}
+        self.stats = {"requests": 0, "not_modified": 0, "retries": 0}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+        self.cache.save()
+
+    def _host(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = {"semaphore": asyncio.Semaphore(self.per_host), "lock": asyncio.Lock(), "next_start": 0.0}
+        return self._hosts[host]
+
+    async def _polite_start(self, host):
+        # Space out request starts on one host
+        async with host["lock"]:
+            delay = host["next_start"] - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            host["next_start"] = time.monotonic() + self.min_interval
+
+    def _retry_delay(self, attempt: int, response) -> float:
+        """Seconds to wait before retrying: the server's Retry-After if it sent one, capped at max_backoff."""
+        retry_after = response.headers.get("retry-after", "").strip() if response is not None else ""
+        delay = None
+        if retry_after.isdigit():
+            delay = int(retry_after)
+        elif retry_after:
+            try:
+                delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                pass
+        if delay is None:
+            delay = self.backoff * (2 ** attempt) * (1 + random.random() / 2)
+        return min(max(delay, 0.0), self.max_backoff)
+
+    async def get(self, url: str) -> FetchResult:
+        host = self._host(url)
+        for attempt in range(self.retries + 1):
+            async with host["semaphore"]:
+                await self._polite_start(host)
+                self.stats["requests"] += 1
+                try:
+                    response = await self.client.get(url, headers=self.cache.headers(url))
+                except httpx.TransportError:
+                    if attempt == self.retries:
+                        raise
+                    response = None
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                break
+            if response is not None and attempt == self.retries:
+                break
+            self.stats["retries"] += 1
+            await asyncio.sleep(self._retry_delay(attempt, response))
+
+        if response.status_code == 304 and self.cache.body(url) is not None:
+            self.stats["not_modified"] += 1
+            return FetchResult(url, 304, self.cache.body(url), changed=False)
+        response.raise_for_status()
+        self.cache.update(url, response)
+        return FetchResult(url, response.status_code, response.text, changed=True)
@@ -0,0 +1,240 @@
+import os
+import re
+import hashlib
+import asyncio
+from collections import deque
+from cache import TTLCache
+from clients import get_clients
+import metrics
+
+# Token-budgeted conversation history for the planner and products prompts.
+#
+# The session store keeps the raw turns (tool answers stored compacted); this
+# keeps, per session, the rendered tail that fits HISTORY_TOKEN_BUDGET and
+# updates it in place on every append, so a turn renders only its own two
+# messages. Turns that fall out of the budget are folded into a running
+# summary by a background task after the turn has been answered; until that
+# summary lands they are simply dropped from the prompt.
+#
+# Tokens are estimated at ~4 characters each, which is close enough for a
+# budget and needs no tokenizer download.
+
+URL_RE = re.compile(r"https?://\S+")
+SUMMARY_PREFIX = "Summary of earlier conversation: "
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def truncate(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + "…"
+
+def compact_tool_result(result, max_chars: int = None) -> str:
+    """The history copy of a tool answer: links elided, whitespace collapsed, length capped."""
+    max_chars = max_chars or int(os.getenv("TOOL_RESULT_MAX_CHARS", "400"))
+    text = " ".join(URL_RE.sub("<link>", str(result)).split())
+    return truncate(text, max_chars)
+
+def render_line(index: int, message) -> str:
+    return f"Human: {message}" if index % 2 == 0 else f"AI: {message}"
+
+def marker(messages: list, index: int, width: int = 4) -> str:
+    """Identifies the last message a summary covers by it and the few before it."""
+    recent = "\0".join(str(m) for m in messages[max(0, index - width + 1):index + 1])
+    return hashlib.sha1(f"{index % 2}\0{recent}".encode("utf-8")).hexdigest()
+
+class HistoryView:
+    """The rendered, in-budget tail of one session."""
+
+    def __init__(self, count: int, summary: str = "", covered: int = -1):
+        self.count = count          # messages in the store this view reflects
+        self.last = None            # newest message, to notice appends from other workers
+        self.summary = summary
+        self.covered = covered      # index of the last message the summary covers
+        self.lines = deque()        # (index, line, tokens), oldest first
+        self.tokens = estimate_tokens(SUMMARY_PREFIX + summary) if summary else 0
+        self._text = None
+
+    @property
+    def start(self) -> int:
+        return self.lines[0][0] if self.lines else self.count
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            lines = [line for _, line, _ in self.lines]
+            if self.summary:
+                lines.insert(0, SUMMARY_PREFIX + self.summary)
+            self._text = "\n".join(lines)
+        return self._text
+
+    def matches(self, messages: list) -> bool:
+        return self.count == len(messages) and (not messages or self.last == messages[-1])
+
+class ConversationHistory:
+    def __init__(self, store, prefix: str = "", budget: int = None, summarize: bool = None):
+        self.store = store
+        self.prefix = prefix
+        self.budget = budget or int(os.getenv("HISTORY_TOKEN_BUDGET", "800"))
+        self.summarize = summarize if summarize is not None else os.getenv("HISTORY_SUMMARY", "1") != "0"
+        self.summary_min_messages = int(os.getenv("HISTORY_SUMMARY_MIN_MESSAGES", "6"))
+        self.summary_tokens = int(os.getenv("HISTORY_SUMMARY_TOKENS", "150"))
+        self.max_messages = getattr(store, "max_messages", None)
+        self.views = TTLCache(
+            maxsize=int(os.getenv("SESSION_MAX_SESSIONS", "10000")),
+            ttl=float(os.getenv("SESSION_TTL_SECONDS", "3600")),
+            name=f"{prefix or 'chat:'}history"
+        )
+        self._summarizing = set()
+        self._cleared = set()       # sessions cleared while their summary was in flight
+        self._tasks = set()
+        self.stats = {"rebuilds": 0, "incremental": 0, "summaries": 0, "summary_failures": 0}
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def _line(self, index: int, message):
+        # One oversized message must not push the whole window out
+        line = truncate(render_line(index, message), self.budget * 2)
+        return index, line, estimate_tokens(line)
+
+    def _fit(self, view: HistoryView):
+        while view.lines and view.tokens > self.budget:
+            view.tokens -= view.lines.popleft()[2]
+        # Keep whole Human/AI pairs so the window never opens on an AI turn
+        while view.lines and view.lines[0][0] % 2 == 1:
+            view.tokens -= view.lines.popleft()[2]
+        view._text = None
+
+    def _build(self, messages: list, summary_entry: list) -> HistoryView:
+        summary, covered = "", -1
+        if len(summary_entry) == 2:
+            summary_marker, summary = summary_entry
+            # The covered message may since have been trimmed from the store, in
+            # which case the summary only describes turns before this window.
+            # Oldest match first: a repeated exchange then gets summarized twice
+            # rather than left out
+            for i in range(len(messages)):
+                if marker(messages, i) == summary_marker:
+                    covered = i
+                    break
+        view = HistoryView(len(messages), summary, covered)
+        view.last = messages[-1] if messages else None
+        for index in range(len(messages) - 1, covered, -1):
+            entry = self._line(index, messages[index])
+            if view.tokens + entry[2] > self.budget:
+                break
+            view.lines.appendleft(entry)
+            view.tokens += entry[2]
+        self._fit(view)
+        return view
+
+    async def _view(self, session_id: str):
+        key = self._key(session_id)
+        messages = await self.store.get(key)
+        view = self.views.get(key)
+        if view is None or not view.matches(messages):
+            self.stats["rebuilds"] += 1
+            view = self._build(messages, await self.store.get(f"summary:{key}"))
+            self.views.set(key, view)
+        return messages, view
+
+    async def load(self, session_id: str):
+        """(raw messages, rendered history within the token budget)."""
+        messages, view = await self._view(session_id)
+        return messages, view.text
+
+    async def append(self, session_id: str, user_msg, answer, tool: bool = False):
+        """Record one turn; tool answers are stored compacted."""
+        if tool:
+            answer = compact_tool_result(answer)
+        key = self._key(session_id)
+        view = self.views.get(key)
+        await self.store.append(key, user_msg, answer)
+        if view is None:
+            return
+
+        self.stats["incremental"] += 1
+        for message in (user_msg, answer):
+            entry = self._line(view.count, message)
+            view.lines.append(entry)
+            view.tokens += entry[2]
+            view.count += 1
+        view.last = answer
+        # Mirror the store dropping its oldest pairs past SESSION_MAX_MESSAGES
+        if self.max_messages and view.count > self.max_messages:
+            shift = view.count - self.max_messages
+            shift += shift % 2
+            view.count -= shift
+            view.covered = max(-1, view.covered - shift)
+            view.lines = deque((i - shift, line, tokens) for i, line, tokens in view.lines if i >= shift)
+            view.tokens = sum(t for _, _, t in view.lines) + (estimate_tokens(SUMMARY_PREFIX + view.summary) if view.summary else 0)
+        self._fit(view)
+
+        if self.summarize and view.start - (view.covered + 1) >= self.summary_min_messages:
+            self._schedule_summary(session_id)
+
+    async def clear(self, session_id: str):
+        key = self._key(session_id)
+        if key in self._summarizing:
+            self._cleared.add(key)
+        self.views.invalidate(key)
+        await self.store.clear(key)
+        await self.store.clear(f"summary:{key}")
+
+    # ---------------- background summaries ----------------
+    def _schedule_summary(self, session_id: str):
+        key = self._key(session_id)
+        if key in self._summarizing:
+            return
+        self._summarizing.add(key)
+        task = asyncio.create_task(self._summarize(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, session_id: str):
+        key = self._key(session_id)
+        # Not part of the turn that scheduled it
+        metrics.start_request()
+        try:
+            messages = await self.store.get(key)
+            summary_entry = await self.store.get(f"summary:{key}")
+            view = self._build(messages, summary_entry)
+            if view.start - (view.covered + 1) < self.summary_min_messages:
+                return
+            dropped = "\n".join(render_line(i, messages[i]) for i in range(view.covered + 1, view.start))
+            summary = await self._llm_summary(view.summary, dropped)
+            # The session was reset (here, or by another worker) while the
+            # summary was being written; it would describe a conversation
+            # that no longer exists
+            if key in self._cleared or not await self.store.get(key):
+                return
+            await self.store.clear(f"summary:{key}")
+            await self.store.append(f"summary:{key}", marker(messages, view.start - 1), summary)
+            self.views.invalidate(key)
+            self.stats["summaries"] += 1
+        except Exception as e:
+            self.stats["summary_failures"] += 1
+            print(f"[WARN] History summary for {key} failed: {e}")
+        finally:
+            self._summarizing.discard(key)
+            self._cleared.discard(key)
+
+    async def _llm_summary(self, previous: str, dropped: str) -> str:
+        instructions = (
+            "Summarize the earlier part of a conversation between a user and the ZUS Coffee assistant "
+            f"in at most {self.summary_tokens * 3 // 4} words. Keep what the user asked for and told us "
+            "(locations, products, preferences) and what was already answered. Output only the summary."
+        )
+        content = await get_clients().gateway.complete(
+            [
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": f"Previous summary: {previous or '(none)'}\n\nConversation:\n{dropped}"}
+            ],
+            stage="history.summary"
+        )
+        return truncate(" ".join(content.split()), self.summary_tokens * 4)
+
+    async def drain(self):
+        """Wait for in-flight summaries (scripts and benchmarks)."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
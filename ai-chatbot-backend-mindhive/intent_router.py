@@ -0,0 +1,154 @@
+import re
+from calculator import SafeCalculator
+import metrics
+
+# Deterministic routing rules that run before the LLM planner. Each rule only
+# fires when it is confident; anything ambiguous returns None so the planner
+# can decide with the full conversation context.
+
+RESET_PHRASES = {
+    "reset", "/reset", "clear", "clear chat", "clear history", "start over",
+    "restart", "new chat", "reset chat", "reset conversation", "clear conversation",
+}
+
+SMALL_TALK_END = r"( there| zus| bot| so much| a lot| for now)?[\s!.,~:)]*$"
+GREETING_RE = re.compile(r"^(hi+|hello+|hey+|hai|helo|yo|howdy|good (morning|afternoon|evening))" + SMALL_TALK_END)
+THANKS_RE = re.compile(r"^(thanks|thank you|thank u|thx|ty|cheers)" + SMALL_TALK_END)
+GOODBYE_RE = re.compile(r"^(bye+|goodbye|bye bye|see (you|ya)|good night)" + SMALL_TALK_END)
+
+CALC_PREFIX_RE = re.compile(
+    r"^(/calc|calc|calculate|compute|what is|what's|whats|how much is|solve)\b[:\s]*"
+)
+ARITHMETIC_CHARS_RE = re.compile(r"^[\d\s.+\-*/()]+$")
+ARITHMETIC_OP_RE = re.compile(r"\d\s*(\*\*|[+\-*/])\s*[\d(\-]")
+
+OUTLET_KEYWORDS = re.compile(r"\b(outlets?|stores?|branch(es)?|cafes?|shops? near|located|location|address|directions?)\b")
+OUTLET_PLACES = re.compile(
+    r"\b(pj|petaling jaya|kl|kuala lumpur|selangor|shah alam|subang|klang|cheras|ampang|bangi|"
+    r"damansara|puchong|kepong|sentul|putrajaya|cyberjaya|sepang|kajang|setia alam|"
+    r"wangsa maju|bangsar|mont kiara|uptown|ss2|ss15|usj|seri kembangan|rawang|semenyih)\b"
+)
+OUTLET_COUNT_RE = re.compile(r"\b(how many|list|all|which|any)\b")
+# An outlet keyword alone is not enough: the message has to ask to find outlets
+OUTLET_REQUEST_RE = re.compile(
+    r"\b(where|address|location|located|directions?|how many|list|all|which|any|is there|are there|"
+    r"do you have|find|show|nearest|closest)\b|^(zus )?(coffee )?(outlets?|stores?|branch(es)?)\b"
+)
+# Outlet details the data doesn't hold; the planner explains or asks which outlet
+OUTLET_ATTRIBUTE_RE = re.compile(
+    r"\b(open|opens|opening|close|closes|closing|hours?|24|menu|wifi|parking|drive[- ]?thru|halal|phone|contact)\b"
+)
+
+PRODUCT_KEYWORDS = re.compile(
+    r"\b(tumblers?|cups?|mugs?|bottles?|drinkware|merch(andise)?|flasks?|"
+    r"all[- ]day cup|og cup|frozee|sundaze|byss)\b"
+)
+
+PRODUCT_REQUEST_RE = re.compile(
+    r"\b(do you (have|sell|carry)|show|list|see|prices?|how much|cost|cheap\w*|expensive|afford\w*|"
+    r"available|in stock|stock|colou?rs?|sizes?|capacity|what|which|any|tell me about|looking for|"
+    r"recommend|suggest|buy|purchase|collection|new|latest)\b"
+)
+
+# Orders, complaints and after-sales requests are not lookups; the planner
+# decides whether to ask a follow-up
+SERVICE_RE = re.compile(
+    r"\b(cancel\w*|refunds?|return(s|ed|ing)?|exchange|broken|damaged|defective|leak\w*|crack\w*|"
+    r"complain\w*|orders?|ordered|deliver\w*|shipping|late|wrong|missing|warranty|replace\w*|staff|rude)\b"
+)
+# More than one sentence usually means more than one request
+MULTI_SENTENCE_RE = re.compile(r"[.!?;]\s+\w")
+
+# Follow-ups that lean on earlier turns ("that one", "the second outlet") need the planner
+CONTEXT_DEPENDENT_RE = re.compile(r"\b(it|that|this|those|these|them|one|ones|same|there|above|previous|again)\b")
+
+def is_self_contained(question: str) -> bool:
+    """A product question that names a product and does not point back at earlier turns."""
+    text = " ".join(question.lower().split())
+    return bool(PRODUCT_KEYWORDS.search(text)) and not CONTEXT_DEPENDENT_RE.search(text)
+
+GREETING_REPLY = "Hi! I'm the ZUS Coffee assistant. Ask me about our drinkware, outlet locations, or a quick calculation."
+THANKS_REPLY = "You're welcome! Let me know if there's anything else I can help with."
+GOODBYE_REPLY = "Goodbye! Come back any time you need help with ZUS Coffee."
+
+# Canned replies; "ok" and other bare acknowledgements are left to the planner,
+# which can see what they answer
+SMALL_TALK = (
+    (GREETING_RE, "Rule: greeting", GREETING_REPLY),
+    (THANKS_RE, "Rule: thanks", THANKS_REPLY),
+    (GOODBYE_RE, "Rule: goodbye", GOODBYE_REPLY),
+)
+
+def _plan(action, reasoning, payload=None, response_text=None):
+    return {
+        "action": action,
+        "reasoning": reasoning,
+        "missing_info": None,
+        "payload": payload or {},
+        "response_text": response_text,
+    }
+
+class FastIntentRouter:
+    def __init__(self, calculator: SafeCalculator = None):
+        self.calculator = calculator or SafeCalculator()
+
+    def route(self, user_msg: str, conv_history: str = "") -> dict:
+        """Return a planner-shaped plan, or None when the LLM should decide."""
+        plan = self._route(user_msg, conv_history)
+        metrics.ROUTER_DECISIONS.inc(action="planner" if plan is None else plan["action"])
+        return plan
+
+    def _route(self, user_msg, conv_history):
+        text = " ".join(user_msg.lower().split())
+        stripped = text.strip(" !.?")
+        if not stripped:
+            return None
+
+        if stripped in RESET_PHRASES:
+            return _plan("reset", "Rule: reset keyword")
+
+        for pattern, reasoning, reply in SMALL_TALK:
+            if pattern.match(text):
+                return _plan("chitchat", reasoning, response_text=reply)
+
+        expression = self._extract_expression(stripped)
+        if expression is not None:
+            return _plan("call_calculator", "Rule: arithmetic expression", payload={"expression": expression})
+
+        # Follow-ups that depend on earlier turns are left to the planner
+        if conv_history and CONTEXT_DEPENDENT_RE.search(stripped):
+            return None
+
+        # Mixed, multi-part and complaint-style messages need the planner's
+        # clarify / ask_followup judgement
+        if SERVICE_RE.search(stripped) or MULTI_SENTENCE_RE.search(stripped):
+            return None
+
+        is_outlet = bool(OUTLET_KEYWORDS.search(stripped))
+        is_product = bool(PRODUCT_KEYWORDS.search(stripped))
+        if is_outlet and is_product:
+            return None
+
+        if is_outlet:
+            if OUTLET_ATTRIBUTE_RE.search(stripped) or not OUTLET_REQUEST_RE.search(stripped):
+                return None
+            # "Where is your outlet?" names no place: the planner asks which one
+            if not (OUTLET_PLACES.search(stripped) or OUTLET_COUNT_RE.search(stripped)):
+                return None
+            return _plan("call_outlets", "Rule: outlet request with a location or listing intent", payload={"query": user_msg})
+
+        if is_product and PRODUCT_REQUEST_RE.search(stripped):
+            return _plan("call_products", "Rule: product request", payload={"query": user_msg})
+
+        return None
+
+    def _extract_expression(self, text):
+        candidate = CALC_PREFIX_RE.sub("", text).strip(" =?")
+        candidate = candidate.replace("x", "*").replace("×", "*").replace("÷", "/").replace("^", "**")
+        if not candidate or not ARITHMETIC_CHARS_RE.match(candidate):
+            return None
+        if not ARITHMETIC_OP_RE.search(candidate):
+            return None
+        if not self.calculator.is_expression(candidate):
+            return None
+        return candidate
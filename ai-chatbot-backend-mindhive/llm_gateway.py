@@ -0,0 +1,353 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from typing import Any
+import openai
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from clients import get_clients, CHAT_MODEL
+import metrics
+
+# Every chat completion the app makes goes through one LLMGateway
+# (get_clients().gateway), which adds what the bare SDK calls lacked:
+#
+#   coalescing   identical requests (model, messages, params) already in flight
+#                share that call; streams are fanned out token by token, and a
+#                caller joining late first gets the tokens it missed
+#   concurrency  LLM_MAX_CONCURRENCY calls in flight overall and
+#                LLM_MODEL_CONCURRENCY per model ("16" or "gpt-5-mini=8,*=16");
+#                the rest queue
+#   deadlines    LLM_TIMEOUT_SECONDS per attempt (for streams: until the first
+#                token) and LLM_DEADLINE_SECONDS for the whole call, retries included
+#   retries      LLM_RETRIES more attempts on timeouts, connection errors, 429s
+#                and 5xx, with full-jitter exponential backoff from
+#                LLM_RETRY_BACKOFF seconds. A stream is never retried once it
+#                has produced a token.
+#
+# The SDK's own retries are switched off so the two don't multiply.
+
+RETRYABLE = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    TimeoutError,
+)
+MAX_BACKOFF_SECONDS = 8.0
+
+def parse_model_limits(value: str, default: int) -> dict:
+    """"16" or "gpt-5-mini=8,*=16" → {"*": 16, "gpt-5-mini": 8}."""
+    limits = {"*": default}
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        model, _, limit = part.rpartition("=")
+        limits[model.strip() or "*"] = int(limit)
+    return limits
+
+def request_key(model: str, messages: list, params: dict, stream: bool) -> str:
+    payload = json.dumps([model, messages, params, stream], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+class _SharedStream:
+    """One upstream stream and everything it has produced so far."""
+
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self.changed = asyncio.Event()
+
+    def notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+class LLMGateway:
+    def __init__(self, client=None, max_concurrency: int = None, model_concurrency=None,
+                 timeout: float = None, deadline: float = None, retries: int = None,
+                 backoff: float = None, coalesce: bool = None):
+        self._client = client
+        self._wrapped = None
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+        if isinstance(model_concurrency, int):
+            model_concurrency = str(model_concurrency)
+        self.model_limits = parse_model_limits(
+            model_concurrency or os.getenv("LLM_MODEL_CONCURRENCY", ""), self.max_concurrency
+        )
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+        self.deadline = deadline or float(os.getenv("LLM_DEADLINE_SECONDS", "60"))
+        self.retries = retries if retries is not None else int(os.getenv("LLM_RETRIES", "2"))
+        self.backoff = backoff if backoff is not None else float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+        self.coalesce = coalesce if coalesce is not None else os.getenv("LLM_COALESCE", "1") != "0"
+        self.random = random.Random()
+        # Semaphores and in-flight calls belong to one event loop; they are
+        # recreated if a script runs the gateway under a new one
+        self._loop = None
+        self._global = None
+        self._models = {}
+        self._inflight = {}
+        self.stats = {"calls": 0, "upstream": 0, "coalesced": 0, "retries": 0, "failures": 0,
+                      "in_flight": 0, "peak_in_flight": 0}
+
+    @property
+    def client(self):
+        raw = self._client or get_clients().openai
+        if self._wrapped is None or self._wrapped[0] is not raw:
+            self._wrapped = (raw, raw.with_options(max_retries=0, timeout=self.timeout))
+        return self._wrapped[1]
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._global = asyncio.Semaphore(self.max_concurrency)
+            self._models = {}
+            self._inflight = {}
+
+    @asynccontextmanager
+    async def _slot(self, model: str):
+        self._bind_loop()
+        model_slot = self._models.get(model)
+        if model_slot is None:
+            limit = self.model_limits.get(model, self.model_limits["*"])
+            model_slot = self._models[model] = asyncio.Semaphore(limit)
+        started = time.perf_counter()
+        # Per-model first: a call queued behind its own model must not hold a global slot
+        async with model_slot, self._global:
+            metrics.observe("llm.queue", time.perf_counter() - started)
+            self.stats["upstream"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+            try:
+                yield
+            finally:
+                self.stats["in_flight"] -= 1
+
+    def _retry_delay(self, attempt: int, error: Exception, deadline: float):
+        """Seconds to wait before the next attempt, or None to give up."""
+        if attempt >= self.retries:
+            return None
+        delay = self.random.uniform(0, min(MAX_BACKOFF_SECONDS, self.backoff * 2 ** attempt))
+        retry_after = getattr(getattr(error, "response", None), "headers", {}).get("retry-after")
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        if time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+    async def _backoff(self, stage: str, attempt: int, error: Exception, deadline: float):
+        delay = self._retry_delay(attempt, error, deadline)
+        if delay is None:
+            self.stats["failures"] += 1
+            raise error
+        self.stats["retries"] += 1
+        metrics.LLM_RETRIES.inc(stage=stage)
+        print(f"[WARN] LLM call for {stage} failed ({type(error).__name__}: {error}), retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+    # ---------------- single completions ----------------
+    async def complete(self, messages: list, *, stage: str, model: str = CHAT_MODEL, **params) -> str:
+        """The reply text of one chat completion."""
+        self.stats["calls"] += 1
+        with metrics.span(stage):
+            if not self.coalesce:
+                return await self._complete(model, messages, stage, params)
+            self._bind_loop()
+            key = request_key(model, messages, params, stream=False)
+            call = self._inflight.get(key)
+            if call is None:
+                # Its own task, so one caller going away doesn't fail the others
+                call = asyncio.create_task(self._complete(model, messages, stage, params))
+                self._inflight[key] = call
+                call.add_done_callback(lambda task: self._finished(key, task))
+            else:
+                self.stats["coalesced"] += 1
+                metrics.LLM_COALESCED.inc(stage=stage)
+            return await asyncio.shield(call)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved by the callers; avoids a warning if all of them left
+
+    async def _complete(self, model: str, messages: list, stage: str, params: dict) -> str:
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                async with self._slot(model):
+                    async with asyncio.timeout(min(self.timeout, max(0.0, deadline - time.monotonic()))):
+                        response = await self.client.chat.completions.create(
+                            model=model, messages=messages, **params
+                        )
+                metrics.record_openai_usage(response.model, stage, response.usage)
+                return response.choices[0].message.content
+            except RETRYABLE as e:
+                await self._backoff(stage, attempt, e, deadline)
+                attempt += 1
+
+    # ---------------- streams ----------------
+    async def stream(self, messages: list, *, stage: str, model: str = CHAT_MODEL, **params):
+        """Reply tokens of one streamed chat completion."""
+        self.stats["calls"] += 1
+        async for token in metrics.timed_stream(stage, self._subscribe(model, messages, stage, params)):
+            yield token
+
+    async def _subscribe(self, model: str, messages: list, stage: str, params: dict):
+        self._bind_loop()
+        key = request_key(model, messages, params, stream=True) if self.coalesce else None
+        shared = self._inflight.get(key) if key else None
+        if shared is None:
+            # The upstream stream always runs in its own task: its timeouts
+            # then can't fire inside the caller's code between tokens
+            shared = _SharedStream()
+            shared.task = asyncio.create_task(self._pump(key, shared, model, messages, stage, params))
+            if key:
+                self._inflight[key] = shared
+        else:
+            self.stats["coalesced"] += 1
+            metrics.LLM_COALESCED.inc(stage=stage)
+
+        shared.subscribers += 1
+        position = 0
+        try:
+            while True:
+                changed = shared.changed
+                if position < len(shared.tokens):
+                    position += 1
+                    yield shared.tokens[position - 1]
+                elif shared.done:
+                    if shared.error is not None:
+                        raise shared.error
+                    return
+                else:
+                    await changed.wait()
+        finally:
+            shared.subscribers -= 1
+            if shared.subscribers == 0 and not shared.done:
+                shared.task.cancel()
+
+    async def _pump(self, key, shared: _SharedStream, model: str, messages: list, stage: str, params: dict):
+        try:
+            async for token in self._stream(model, messages, stage, params):
+                shared.tokens.append(token)
+                shared.notify()
+        except asyncio.CancelledError:
+            shared.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            shared.error = e
+        finally:
+            shared.done = True
+            if key and self._inflight.get(key) is shared:
+                del self._inflight[key]
+            shared.notify()
+
+    async def _stream(self, model: str, messages: list, stage: str, params: dict):
+        deadline = time.monotonic() + self.deadline
+        loop_deadline = asyncio.get_running_loop().time() + self.deadline
+        attempt = 0
+        while True:
+            started_output = False
+            try:
+                async with self._slot(model):
+                    async with asyncio.timeout(min(self.timeout, max(0.0, deadline - time.monotonic()))) as window:
+                        stream = await self.client.chat.completions.create(
+                            model=model, messages=messages, stream=True,
+                            stream_options={"include_usage": True}, **params
+                        )
+                        async for chunk in stream:
+                            if chunk.usage is not None:
+                                metrics.record_openai_usage(chunk.model, stage, chunk.usage)
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                if not started_output:
+                                    # First token in: from here only the overall deadline applies
+                                    started_output = True
+                                    window.reschedule(loop_deadline)
+                                yield chunk.choices[0].delta.content
+                return
+            except RETRYABLE as e:
+                if started_output:
+                    self.stats["failures"] += 1
+                    raise
+                await self._backoff(stage, attempt, e, deadline)
+                attempt += 1
+
+_sync_client = None
+
+def sync_client(gateway: LLMGateway) -> openai.OpenAI:
+    """Blocking OpenAI client for GatewayChatModel.invoke(), with the gateway's timeout and retry count."""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = openai.OpenAI(max_retries=gateway.retries, timeout=gateway.timeout)
+    return _sync_client
+
+class GatewayChatModel(BaseChatModel):
+    """
+    A LangChain chat model backed by the gateway, so LCEL chains share its
+    coalescing, limits and retries. Bind the metrics stage per chain step:
+    llm.bind(stage="products.answer").
+    """
+
+    model_name: str = CHAT_MODEL
+    stage: str = "langchain"
+    gateway: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "llm-gateway"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name}
+
+    def _gateway(self) -> LLMGateway:
+        return self.gateway or get_clients().gateway
+
+    @staticmethod
+    def _messages(messages) -> list:
+        roles = {"human": "user", "ai": "assistant", "system": "system"}
+        return [{"role": roles.get(m.type, "user"), "content": m.content} for m in messages]
+
+    def _generate(self, messages, stop=None, run_manager=None, stage: str = None, **kwargs):
+        # Sync callers (invoke() from scripts) bypass the gateway: its
+        # semaphores, coalescing and pooled client belong to the server's event
+        # loop. The same timeout applies and the SDK does the retries.
+        gateway = self._gateway()
+        response = sync_client(gateway).chat.completions.create(
+            model=self.model_name, messages=self._messages(messages)
+        )
+        metrics.record_openai_usage(response.model, stage or self.stage, response.usage)
+        text = response.choices[0].message.content
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, stage: str = None, **kwargs):
+        text = await self._gateway().complete(
+            self._messages(messages), stage=stage or self.stage, model=self.model_name
+        )
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, stage: str = None, **kwargs):
+        async for token in self._gateway().stream(
+            self._messages(messages), stage=stage or self.stage, model=self.model_name
+        ):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+def with_stage(llm, stage: str):
+    """`llm` labelled with a metrics stage when it is a GatewayChatModel; other models as they are."""
+    return llm.bind(stage=stage) if isinstance(llm, GatewayChatModel) else llm
@@ -0,0 +1,251 @@
+import os
+import json
+import uuid
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+# In-process vector store for the product catalog (a few hundred chunks).
+# Embeddings are L2-normalized into one float32 matrix, so cosine similarity
+# is a single matrix-vector product. Past LOCAL_VECTOR_ANN_MIN rows an IVF
+# index (k-means coarse quantizer) restricts the scan to the nearest lists.
+#
+# Snapshot layout (directory):
+#   vectors-<gen>.f32  raw float32 matrix, opened with np.memmap on load
+#   docs-<gen>.jsonl   one {"id", "page_content", "metadata"} per row
+#   meta.json          {"dim", "count", "vectors", "docs"}: names the current pair
+# A save writes a new pair and then swaps meta.json in with os.replace, so a
+# crash at any point leaves the previous snapshot intact and self-consistent.
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+class IVFIndex:
+    def __init__(self, matrix: np.ndarray, nlist: int = None, iterations: int = 10, seed: int = 0):
+        n = matrix.shape[0]
+        self.nlist = nlist or max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        centroids = matrix[rng.choice(n, size=self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(matrix @ centroids.T, axis=1)
+            for c in range(self.nlist):
+                members = matrix[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+        self.centroids = centroids.astype(np.float32)
+        assign = np.argmax(matrix @ self.centroids.T, axis=1)
+        self.lists = [np.flatnonzero(assign == c) for c in range(self.nlist)]
+
+    def search(self, matrix: np.ndarray, query: np.ndarray, k: int, nprobe: int):
+        probes = top_k(self.centroids @ query, nprobe)
+        candidates = np.concatenate([self.lists[c] for c in probes])
+        scores = matrix[candidates] @ query
+        best = top_k(scores, k)
+        return candidates[best], scores[best]
+
+class LocalVectorStore(VectorStore):
+    def __init__(self, embedding, ann_min_rows: int = None, nprobe: int = None):
+        self._embedding = embedding
+        self.ann_min_rows = ann_min_rows if ann_min_rows is not None else int(os.getenv("LOCAL_VECTOR_ANN_MIN", "20000"))
+        self.nprobe = nprobe or int(os.getenv("LOCAL_VECTOR_NPROBE", "8"))
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.ids = []
+        self.docs = []
+        self._ivf = None
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ---------------- writes ----------------
+    def add_vectors(self, vectors, texts, metadatas=None, ids=None):
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        with self._lock:
+            # Re-adding an id replaces the old row
+            self._delete(set(ids))
+            if self.matrix.shape[0] == 0:
+                matrix = vectors
+            else:
+                matrix = np.vstack([self.matrix, vectors])
+            # New lists rather than in-place extends: searches hold on to the old ones
+            self.matrix = np.ascontiguousarray(matrix)
+            self.ids = self.ids + ids
+            self.docs = self.docs + [Document(page_content=t, metadata=m or {}) for t, m in zip(texts, metadatas)]
+            self._ivf = None
+        return ids
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        return self.add_vectors(self._embedding.embed_documents(texts), texts, metadatas, ids)
+
+    async def aadd_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        return self.add_vectors(await self._embedding.aembed_documents(texts), texts, metadatas, ids)
+
+    def _delete(self, ids):
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in ids]
+        if len(keep) == len(self.ids):
+            return False
+        self.matrix = self.matrix[keep] if keep else np.zeros((0, self.matrix.shape[1]), dtype=np.float32)
+        self.ids = [self.ids[i] for i in keep]
+        self.docs = [self.docs[i] for i in keep]
+        self._ivf = None
+        return True
+
+    def delete(self, ids=None, **kwargs):
+        if not ids:
+            return False
+        with self._lock:
+            return self._delete(set(ids))
+
+    def get_by_ids(self, ids):
+        wanted = set(ids)
+        return [
+            Document(id=doc_id, page_content=doc.page_content, metadata=doc.metadata)
+            for doc_id, doc in zip(self.ids, self.docs) if doc_id in wanted
+        ]
+
+    # ---------------- search ----------------
+    def _snapshot(self):
+        """(matrix, ids, docs, ivf) as one consistent view; writes swap in new objects."""
+        with self._lock:
+            return self.matrix, self.ids, self.docs, self._ivf
+
+    def _index(self, matrix=None):
+        """The IVF index of `matrix` (default: the current one), built on first use."""
+        with self._lock:
+            matrix = self.matrix if matrix is None else matrix
+            if self.matrix is not matrix:
+                return None  # a write landed since the snapshot; scan this one exactly
+            if self._ivf is None:
+                self._ivf = IVFIndex(np.asarray(matrix))
+            return self._ivf
+
+    def _search(self, snapshot, query_vector, k: int, exact: bool = False):
+        matrix, ids, _, ivf = snapshot
+        if len(ids) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        if not exact and ivf is None and len(ids) >= self.ann_min_rows:
+            ivf = self._index(matrix)
+        if not exact and ivf is not None:
+            return ivf.search(matrix, query, k, self.nprobe)
+        scores = matrix @ query
+        best = top_k(scores, k)
+        return best, scores[best]
+
+    def search_vector(self, query_vector, k: int = 4, exact: bool = False):
+        """(row indices, cosine scores) of the k nearest rows."""
+        return self._search(self._snapshot(), query_vector, k, exact)
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4, score_threshold: float = None, **kwargs):
+        snapshot = self._snapshot()
+        _, ids, docs, _ = snapshot
+        rows, scores = self._search(snapshot, embedding, k)
+        results = []
+        for row, score in zip(rows, scores):
+            if score_threshold is not None and score < score_threshold:
+                continue
+            doc = docs[row]
+            results.append((Document(id=ids[row], page_content=doc.page_content, metadata=doc.metadata), float(score)))
+        return results
+
+    def similarity_search_with_score(self, query, k: int = 4, **kwargs):
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k, **kwargs)
+
+    async def asimilarity_search_with_score(self, query, k: int = 4, **kwargs):
+        embedding = await self._embedding.aembed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k, **kwargs)
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, **kwargs)]
+
+    def similarity_search(self, query, k: int = 4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    async def asimilarity_search(self, query, k: int = 4, **kwargs):
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, **kwargs):
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+    # ---------------- snapshots ----------------
+    @staticmethod
+    def _read_meta(directory: str):
+        meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        # Snapshots written before meta.json named its files
+        meta.setdefault("vectors", "vectors.f32")
+        meta.setdefault("docs", "docs.jsonl")
+        return meta
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        matrix, ids, docs, _ = self._snapshot()
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        previous = self._read_meta(directory)
+        generation = uuid.uuid4().hex[:12]
+        meta = {
+            "dim": int(matrix.shape[1]) if matrix.size else 0,
+            "count": len(ids),
+            "vectors": f"vectors-{generation}.f32",
+            "docs": f"docs-{generation}.jsonl",
+        }
+        matrix.tofile(os.path.join(directory, meta["vectors"]))
+        with open(os.path.join(directory, meta["docs"]), "w", encoding="utf-8") as f:
+            for doc_id, doc in zip(ids, docs):
+                f.write(json.dumps({"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata}, ensure_ascii=False) + "\n")
+        tmp = os.path.join(directory, "meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(directory, "meta.json"))
+        # Readers that already mapped the old files keep them until they close
+        for name in (previous["vectors"], previous["docs"]) if previous else ():
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+    @classmethod
+    def load(cls, directory: str, embedding, **kwargs):
+        store = cls(embedding, **kwargs)
+        meta = cls._read_meta(directory)
+        if meta is None:
+            return store
+        if meta["count"]:
+            store.matrix = np.memmap(os.path.join(directory, meta["vectors"]), dtype=np.float32,
+                                     mode="r", shape=(meta["count"], meta["dim"]))
+        with open(os.path.join(directory, meta["docs"]), encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                store.ids.append(row["id"])
+                store.docs.append(Document(page_content=row["page_content"], metadata=row["metadata"]))
+        return store
@@ -1,10 +1,34 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from products import router as products_router
-from outlets import router as outlets_router
+from outlets import router as outlets_router, ensure_index
+from outlet_index import index_enabled
 from chat import router as chat_router
+from metrics import router as metrics_router
+from clients import get_clients
+import outlets_replica
+import metrics
+import time
 
-app = FastAPI(title="Mindhive Chatbot API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    clients = get_clients()
+    # Build pooled clients and the compiled products chain once per worker
+    await clients.warm_up(supabase=not outlets_replica.use_replica())
+    app.state.clients = clients
+    if outlets_replica.use_replica():
+        await outlets_replica.replica.refresh()
+    # With OUTLETS_BACKEND=supabase the index comes from a Supabase snapshot
+    if index_enabled():
+        await ensure_index()
+    refresher = outlets_replica.start_refresher()
+    yield
+    if refresher is not None:
+        refresher.cancel()
+    await clients.aclose()
+
+app = FastAPI(title="Mindhive Chatbot API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,9 +38,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # No route has path parameters, so the path is the route; unmatched paths
+    # share one series to keep the label set bounded
+    matched = request.scope.get("route") is not None
+    metrics.HTTP_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=request.url.path if matched else "unmatched",
+        status=response.status_code,
+    )
+    return response
+
 app.include_router(products_router, prefix="/api")
 app.include_router(outlets_router, prefix="/api")
 app.include_router(chat_router, prefix="/api")
+app.include_router(metrics_router)
 
 @app.get("/")
 def home():
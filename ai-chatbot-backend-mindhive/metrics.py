@@ -0,0 +1,210 @@
+import math
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from fastapi import APIRouter
+from fastapi.responses import Response
+from cache import all_caches
+
+# In-process Prometheus metrics, rendered in the text exposition format at
+# GET /metrics (each worker reports its own numbers; scrape them per worker).
+#
+# Stages are timed with span("outlets.query") etc. Besides the histogram, every
+# span adds its duration to the current request's breakdown (start_request()),
+# which the orchestrator returns as debug["timings_ms"]. Nested spans overlap:
+# "embedding" is also counted inside "products.retrieval".
+
+router = APIRouter(tags=["Metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+_caches = {}
+_timings = contextvars.ContextVar("request_timings", default=None)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(names, values, extra=None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _number(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.labels), 0)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labels, key)} {_number(value)}"
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._series = {}  # labels → [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labels, key, ('le', _number(bound)))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, key)} {_number(series[-2])}"
+            yield f"{self.name}_count{_labels(self.labels, key)} {series[-1]}"
+
+STAGE_SECONDS = Histogram("chatbot_stage_seconds", "Time spent in one stage of a request.", ["stage"])
+STAGE_ERRORS = Counter("chatbot_stage_errors_total", "Stages that ended with an exception.", ["stage"])
+TURN_SECONDS = Histogram("chatbot_chat_turn_seconds", "End-to-end /api/chat turn time by planner action.", ["action"])
+HTTP_SECONDS = Histogram("chatbot_http_request_seconds", "Time until the response starts, by route.", ["method", "route", "status"])
+LLM_CALLS = Counter("chatbot_llm_calls_total", "LLM and embedding API calls.", ["model", "stage"])
+LLM_TOKENS = Counter("chatbot_llm_tokens_total", "Tokens reported by the provider.", ["model", "stage", "kind"])
+LLM_COALESCED = Counter("chatbot_llm_coalesced_total", "LLM calls served by an identical call already in flight.", ["stage"])
+LLM_RETRIES = Counter("chatbot_llm_retries_total", "LLM call attempts retried after a transient error.", ["stage"])
+ROUTER_DECISIONS = Counter("chatbot_router_decisions_total", "Messages routed by the fast intent router, by action (\"planner\" = left to the LLM planner).", ["action"])
+
+def start_request() -> dict:
+    """Start a fresh stage breakdown for the current task (and tasks it spawns)."""
+    timings = {}
+    _timings.set(timings)
+    return timings
+
+def observe(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds * 1000
+
+@contextmanager
+def span(stage: str):
+    """Time a block (sync or async code) as one stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        observe(stage, time.perf_counter() - started)
+
+async def timed_stream(stage: str, stream):
+    """Re-yield a token stream, timing only the waits on the stream itself."""
+    elapsed = 0.0
+    started = time.perf_counter()
+    try:
+        async for token in stream:
+            elapsed += time.perf_counter() - started
+            yield token
+            started = time.perf_counter()
+        elapsed += time.perf_counter() - started
+    finally:
+        observe(stage, elapsed)
+
+def timings_ms(timings: dict, started: float) -> dict:
+    breakdown = {stage: round(ms, 2) for stage, ms in timings.items()}
+    breakdown["total"] = round((time.perf_counter() - started) * 1000, 2)
+    return breakdown
+
+def record_usage(model: str, stage: str, prompt_tokens=None, completion_tokens=None):
+    LLM_CALLS.inc(model=model, stage=stage)
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, model=model, stage=stage, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, model=model, stage=stage, kind="completion")
+
+def record_openai_usage(model: str, stage: str, usage):
+    """`usage` from an OpenAI response or final stream chunk (None when not reported)."""
+    record_usage(
+        model, stage,
+        getattr(usage, "prompt_tokens", None),
+        getattr(usage, "completion_tokens", None),
+    )
+
+def register_cache(name: str, stats):
+    """Export a non-TTLCache cache: `stats()` returns {"hits", "misses", "size"}."""
+    _caches[name] = stats
+
+def _cache_lines():
+    totals = {}
+    for cache in all_caches():
+        row = totals.setdefault(cache.name, {"hits": 0, "misses": 0, "size": 0, "evictions": 0})
+        row["hits"] += cache.hits
+        row["misses"] += cache.misses
+        row["size"] += len(cache)
+        row["evictions"] += cache.evictions
+    for name, stats in list(_caches.items()):
+        try:
+            totals[name] = {"evictions": 0, **stats()}
+        except Exception as e:
+            print(f"[WARN] Cache stats for {name} failed: {e}")
+
+    names = sorted(totals)
+    for metric, field, kind, help in (
+        ("chatbot_cache_hits_total", "hits", "counter", "Cache hits."),
+        ("chatbot_cache_misses_total", "misses", "counter", "Cache misses."),
+        ("chatbot_cache_evictions_total", "evictions", "counter", "Entries evicted for space."),
+        ("chatbot_cache_entries", "size", "gauge", "Entries currently cached."),
+    ):
+        yield f"# HELP {metric} {help}"
+        yield f"# TYPE {metric} {kind}"
+        for name in names:
+            yield f"{metric}{_labels(('cache',), (name,))} {_number(totals[name][field])}"
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    lines.extend(_cache_lines())
+    return "\n".join(lines) + "\n"
+
+@router.get("/metrics")
+def metrics():
+    return Response(render(), media_type=CONTENT_TYPE)
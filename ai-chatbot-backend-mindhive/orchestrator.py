@@ -1,35 +1,97 @@
 from planner import Planner
 from calculator import SafeCalculator
-import requests
+from tools import ToolDispatcher, ToolError
+from session_store import ConversationStore, get_store
+from history import ConversationHistory
+from semantic_cache import SemanticCache, CACHEABLE_ACTIONS, context_key, semantic_cache_enabled
+import outlets
+import products
+import metrics
 import json
-import os
-
-conv_history = []
+import time
 
 class Orchestrator:
-    def __init__(self):
+    def __init__(self, store: ConversationStore = None):
         self.planner = Planner()
         self.calculator = SafeCalculator()
-        self.api_base = os.getenv("API_BASE_URL")
+        self.tools = ToolDispatcher()
+        self.store = store or get_store()
+        self.history = ConversationHistory(self.store)
+        self.semantic_cache = SemanticCache() if semantic_cache_enabled() else None
+        if self.semantic_cache is not None:
+            metrics.register_cache("semantic", self.semantic_cache.cache_counts)
+
+    @staticmethod
+    def data_versions():
+        return {"outlets": outlets.data_version(), "products": products.data_version()}
+
+    def _remember(self, vector, user_msg, context, versions, action, answer, started):
+        if vector is None or not answer:
+            return
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.semantic_cache.store(vector, user_msg, context, versions, {"action": action, "message": answer}, latency_ms)
 
     @staticmethod
-    def formatConvHistory(messages):
-        return (
-            "\n".join(
-                f"Human: {message}" if i%2==0 else f"AI: {message}"
-                for i, message in enumerate(messages)
-            )
-        )
-
-    def handle(self, user_msg: str):
-        history = Orchestrator.formatConvHistory(conv_history)
+    def _finish(action, timings, started):
+        """Close out a turn: record its latency and return the per-stage breakdown."""
+        breakdown = metrics.timings_ms(timings, started)
+        metrics.TURN_SECONDS.observe(breakdown["total"] / 1000, action=action)
+        return breakdown
+
+    async def handle(self, user_msg: str, session_id: str, use_cache: bool = True):
+        result = None
+        async for event, data in self.handle_stream(user_msg, session_id, use_cache=use_cache):
+            if event == "done":
+                result = data
+        return result
+
+    async def handle_stream(self, user_msg: str, session_id: str, use_cache: bool = True):
+        """
+        Yields (event, data) pairs: one "plan", zero or more "token" chunks of
+        the answer, then "done" with the same payload handle() returns.
+        use_cache=False neither reads nor fills the semantic cache.
+        """
+        started = time.perf_counter()
+        timings = metrics.start_request()
+        with metrics.span("session"):
+            conv_history, history = await self.history.load(session_id)
         print(history)
-        plan = json.loads(self.planner.plan(user_msg, history))
+
+        with metrics.span("router"):
+            fast_plan = self.planner.route_locally(user_msg, history)
+        plan = fast_plan or json.loads(await self.planner.plan_with_llm(user_msg, history))
         print(plan)
-        
+
         action = plan.get("action", {})
         payload = plan.get("payload", {})
-        conv_history.append(user_msg)
+
+        # Semantic cache: only consulted once the plan is a tool call, so a
+        # message the planner answers with a follow-up question never gets a
+        # cached tool answer, and greetings/arithmetic never pay for an embedding
+        cache_vector = context = versions = None
+        if self.semantic_cache is not None and use_cache and action in CACHEABLE_ACTIONS:
+            context = context_key(conv_history)
+            versions = Orchestrator.data_versions()
+            with metrics.span("semantic_cache"):
+                cache_vector = await self.semantic_cache.embed(user_msg)
+                entry, similarity = self.semantic_cache.lookup(cache_vector, context, versions)
+            if entry is not None and entry["response"]["action"] == action:
+                answer = entry["response"]["message"]
+                await self.history.append(session_id, user_msg, answer, tool=True)
+                if action == "call_products":
+                    await products.get_product_history().append(session_id, user_msg, answer, tool=True)
+                yield "plan", {"planner_action": action}
+                yield "token", answer
+                yield "done", {
+                    "message": answer,
+                    "debug": {
+                        "planner_action": action,
+                        "reasoning": f"Semantic cache hit (similarity {similarity:.3f})",
+                        "missing_info": None,
+                        "timings_ms": self._finish(action, timings, started),
+                    }
+                }
+                return
 
         # Developer logs for UI
         debug = {
@@ -37,63 +99,85 @@ class Orchestrator:
             "reasoning": plan.get("reasoning", {}),
             "missing_info": plan.get("missing_info", {})
         }
+        yield "plan", {"planner_action": action}
 
         # ---------------- Routing ----------------
         if action == "call_calculator":
-            result  = self.calculator.eval_expr(plan["payload"]["expression"])
+            with metrics.span("calculator"):
+                result  = self.calculator.eval_expr(plan["payload"]["expression"])
             if isinstance(result, dict):
                 if result.get("success") == False:
-                    conv_history.append(result.get("error"))
-                    return {
+                    await self.history.append(session_id, user_msg, result.get("error"))
+                    self._finish(action, timings, started)
+                    yield "token", result.get("error")
+                    yield "done", {
                         "message": result.get("error"),
                     }
-                conv_history.append(result)
-                return {"message": result, "debug": debug}
+                    return
+                await self.history.append(session_id, user_msg, result)
+                debug["timings_ms"] = self._finish(action, timings, started)
+                yield "token", str(result)
+                yield "done", {"message": result, "debug": debug}
+                return
 
             # Otherwise, result is a normal number
-            conv_history.append(result)
-            return {
+            await self.history.append(session_id, user_msg, result)
+            debug["timings_ms"] = self._finish(action, timings, started)
+            yield "token", str(result)
+            yield "done", {
                 "message": result,
                 "debug": debug
             }
-    
+            return
+
         if action == "call_products":
-            res = requests.get(
-                f"{self.api_base}/products",
-                params={"query": payload["query"]}
-            )
-            conv_history.append(res.json())
-            return {"message": res.json(), "debug": debug}
+            chunks = []
+            async for token in self.tools.stream_products(payload["query"], session_id):
+                chunks.append(token)
+                yield "token", token
+            answer = "".join(chunks)
+            await self.history.append(session_id, user_msg, answer, tool=True)
+            self._remember(cache_vector, user_msg, context, versions, action, answer, started)
+            debug["timings_ms"] = self._finish(action, timings, started)
+            yield "done", {"message": answer, "debug": debug}
+            return
 
         if action == "call_outlets":
-            res = requests.get(
-                f"{self.api_base}/outlets",
-                params={"query": payload["query"]}
-            )
-            if res.ok:
-                conv_history.append(res.json())
-                return {"message": res.json(), "debug": debug}
-            else:
-                conv_history.append("Failed to get answer.")
-                return {"message": "Failed to get answer."}
-
-        if action == "ask_followup":
-            conv_history.append(plan["response_text"])
-            return {
-                "message": plan["response_text"],                
-                "debug": debug
-            }
+            chunks = []
+            try:
+                async for token in self.tools.stream_outlets(payload["query"]):
+                    chunks.append(token)
+                    yield "token", token
+            except ToolError:
+                await self.history.append(session_id, user_msg, "Failed to get answer.")
+                self._finish(action, timings, started)
+                yield "done", {"message": "Failed to get answer."}
+                return
+            answer = "".join(chunks)
+            await self.history.append(session_id, user_msg, answer, tool=True)
+            self._remember(cache_vector, user_msg, context, versions, action, answer, started)
+            debug["timings_ms"] = self._finish(action, timings, started)
+            yield "done", {"message": answer, "debug": debug}
+            return
+
         if action == "reset":
-            conv_history.clear()
+            await self.history.clear(session_id)
+            await products.get_product_history().clear(session_id)
+            self._finish(action, timings, started)
+            yield "done", None
             return
 
-        conv_history.append(plan["response_text"])
-        return {
+        # ask_followup / chitchat: the planner already wrote the reply
+        await self.history.append(session_id, user_msg, plan["response_text"])
+        debug["timings_ms"] = self._finish(action, timings, started)
+        yield "token", plan["response_text"]
+        yield "done", {
             "message": plan["response_text"],
             "debug": debug
-        }             
+        }
 
 if __name__ == "__main__":
+    import asyncio
     user_msg = "Which outlets open in PJ?"
     client = Orchestrator()
-    client.handle(user_msg)
\ No newline at end of file
+    asyncio.run(client.handle(user_msg, "local-test"))
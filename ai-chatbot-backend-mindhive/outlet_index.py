@@ -0,0 +1,272 @@
+import os
+import re
+import threading
+from collections import Counter
+from outlet_queries import DEFAULT_LIMIT, MAX_LIMIT
+
+# In-memory index over the outlets table, rebuilt whenever the replica reloads.
+# "How many outlets in PJ?", "list outlets in 47400", "where is ZUS Uptown
+# Damansara" are answered from it with fixed templates: no filter LLM call,
+# no query, no summary LLM call. Questions it can't resolve (opening hours,
+# follow-ups, places it doesn't know) return None and take the LLM path.
+#
+#   localities  postcode / city / state parsed from each address → rows
+#   postings    every word of name + address → rows (phrase search, so a city
+#               that only appears in the address is still found)
+#   trigrams    3-grams of outlet names and locality names, for typos
+#
+# Only known places are answered: a postcode, a parsed city / state or an
+# outlet name, or a misspelling of one. Anything else ("near the LRT", "PJ and
+# KL", "outside Selangor") returns None.
+#
+# OUTLETS_INDEX=1                → answer from the index first (0 disables)
+# OUTLETS_FUZZY_THRESHOLD=0.6    → minimum trigram similarity for a typo match
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+POSTCODE_RE = re.compile(r"\b(\d{5})\b")
+BRAND_RE = re.compile(r"^zus coffee\s*[-–—]?\s*", re.IGNORECASE)
+
+# Malaysian postcode prefixes (first two digits) → state
+POSTCODE_STATES = [
+    (range(1, 3), "Perlis"), (range(5, 10), "Kedah"), (range(10, 15), "Penang"),
+    (range(15, 19), "Kelantan"), (range(20, 25), "Terengganu"), (range(25, 29), "Pahang"),
+    (range(30, 37), "Perak"), (range(39, 40), "Pahang"), (range(40, 49), "Selangor"),
+    (range(49, 50), "Pahang"), (range(50, 61), "Kuala Lumpur"), (range(62, 63), "Putrajaya"),
+    (range(63, 69), "Selangor"), (range(69, 70), "Pahang"), (range(70, 74), "Negeri Sembilan"),
+    (range(75, 79), "Melaka"), (range(79, 87), "Johor"), (range(87, 88), "Labuan"),
+    (range(88, 92), "Sabah"), (range(93, 99), "Sarawak"),
+]
+# Trailing state / country words after the city in an address
+STATE_SUFFIX_RE = re.compile(
+    r"\b(selangor( darul ehsan)?|(wilayah persekutuan|wp)( kuala lumpur| putrajaya)?|malaysia)\b.*$"
+)
+
+ALIASES = {
+    "pj": "petaling jaya",
+    "kl": "kuala lumpur",
+    "klcc": "kuala lumpur city centre",
+    "jb": "johor bahru",
+}
+
+COUNT_RE = re.compile(r"\b(how many|number of|count|total)\b")
+LOOKUP_RE = re.compile(r"\b(where is|where's|wheres|address|location of|locate|directions?|google maps?|map link|how (do i|to) get)\b")
+LIST_ALL_RE = re.compile(r"\b(all|every|list)\b")
+LIMIT_RE = re.compile(r"\b(?:top|first|any)?\s*(\d{1,2})\s+(?:outlets?|stores?|branch(?:es)?|cafes?|shops?)\b")
+# Things the table doesn't hold, or questions that lean on earlier turns
+DEFER_RE = re.compile(
+    r"\b(open(s|ing)?|clos(e|es|ed|ing)|hours?|24/7|menu|phone|contact|wifi|parking|drive[- ]?thru|"
+    r"delivery|halal|dine[- ]in|it|that|this|those|them|same|previous|near me)\b"
+)
+# The region the outlets table is scraped from (scrapeData.OUTLETS_URL): an
+# answer about "every outlet" is scoped to it, never stated for all of Malaysia
+COVERAGE = "Kuala Lumpur and Selangor"
+# Places that mean every outlet
+NATIONWIDE = {"malaysia", "nationwide", "country", "whole country", "the country", "across malaysia"}
+# Several places, or everywhere but one: not a single lookup
+COMPOUND_WORDS = {"and", "or", "outside", "not", "except", "excluding", "besides", "other", "than", "but"}
+FILLER = set("""
+    how many number of count total list show give tell me all every the a an any some please
+    zus coffee outlet outlets store stores branch branches cafe cafes shop shops kedai location locations
+    where is wheres s are there do does you your we have has got in at near nearby around within inside
+    located find what which can i get to address of for google map maps link directions direction
+    closest nearest top first area areas
+""".split())
+
+def normalize(text: str) -> str:
+    return " ".join(WORD_RE.findall(str(text or "").lower()))
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def postcode_state(postcode: str):
+    prefix = int(postcode[:2])
+    return next((state for prefixes, state in POSTCODE_STATES if prefix in prefixes), None)
+
+def parse_address(address: str) -> dict:
+    """{"postcode", "city", "state"} from a free-text Malaysian address (any may be None)."""
+    text = str(address or "")
+    match = POSTCODE_RE.search(text)
+    if not match:
+        return {"postcode": None, "city": None, "state": None}
+    postcode = match.group(1)
+    state = postcode_state(postcode)
+    # The city is what follows the postcode up to the next comma/period
+    after = re.split(r"[,.]", text[match.end():].lstrip(" ,"), maxsplit=1)[0]
+    city = STATE_SUFFIX_RE.sub("", normalize(after)).strip()
+    if not city or any(c.isdigit() for c in city):
+        city = normalize(state) if state in ("Kuala Lumpur", "Putrajaya") else None
+    return {"postcode": postcode, "city": city, "state": state}
+
+class OutletIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        self.load_rows([], version=None)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.version is not None
+
+    # ---------------- building ----------------
+    def load_rows(self, rows: list, version=None):
+        rows = [dict(r) for r in rows]
+        texts, localities, postings = [], {}, {}
+        for i, row in enumerate(rows):
+            row["place"] = BRAND_RE.sub("", row.get("name") or "").strip()
+            row.update(parse_address(row.get("address")))
+            for key in (row["postcode"], row["city"], normalize(row["state"])):
+                if key:
+                    localities.setdefault(key, set()).add(i)
+            text = normalize(f"{row['place']} {row.get('address') or ''}")
+            texts.append(f" {text} ")
+            for word in set(text.split()):
+                postings.setdefault(word, set()).add(i)
+
+        # Names users call places by: outlet names (and their comma parts) and
+        # the parsed cities / states, each with the rows it stands for
+        places = {}
+        for i, row in enumerate(rows):
+            for part in [row["place"]] + row["place"].split(","):
+                key = normalize(part)
+                if key:
+                    places.setdefault(key, set()).add(i)
+        for key, found in localities.items():
+            if not key.isdigit():
+                places.setdefault(key, set()).update(found)
+        grams, sizes = {}, {}
+        for key in places:
+            sizes[key] = len(trigrams(key))
+            for gram in trigrams(key):
+                grams.setdefault(gram, []).append(key)
+
+        with self._lock:
+            self.rows = rows
+            self.texts = texts
+            self.localities = localities
+            self.postings = postings
+            self.places = places
+            self.grams = grams
+            self.gram_sizes = sizes
+            self.version = version
+        if version is not None:
+            print(f"[INFO] Outlet index v{version}: {len(rows)} outlets, {len(localities)} localities")
+
+    def load_replica(self, replica):
+        self.load_rows(replica.rows(), version=replica.version)
+
+    # ---------------- lookups ----------------
+    def phrase(self, phrase: str) -> set:
+        """Rows whose name or address contains the words of `phrase` in order."""
+        words = phrase.split()
+        if not words or any(w not in self.postings for w in words):
+            return set()
+        candidates = set.intersection(*(self.postings[w] for w in words))
+        return {i for i in candidates if f" {phrase} " in self.texts[i]}
+
+    def fuzzy(self, phrase: str):
+        """(place name, similarity) of the closest outlet or locality name by trigram overlap."""
+        query = trigrams(phrase)
+        shared = Counter(key for gram in query for key in self.grams.get(gram, ()))
+        best, score = None, 0.0
+        for key, n in shared.items():
+            similarity = n / (len(query) + self.gram_sizes[key] - n)
+            if similarity > score:
+                best, score = key, similarity
+        return best, score
+
+    def resolve(self, phrase: str, prefer_names: bool = False):
+        """(rows, display name) for a place phrase, or (None, None) when it isn't recognised."""
+        phrase = ALIASES.get(phrase, phrase)
+        if prefer_names and phrase in self.places:
+            return self.places[phrase], phrase.title()
+        # A known postcode/city/state/outlet name, plus any outlet whose name or
+        # address mentions it
+        if phrase in self.localities or phrase in self.places:
+            return self.localities.get(phrase, set()) | self.phrase(phrase), phrase.title()
+        # A misspelling, only when the whole phrase is one place name
+        if len(phrase) >= 4:
+            key, score = self.fuzzy(phrase)
+            if (key and score >= float(os.getenv("OUTLETS_FUZZY_THRESHOLD", "0.6"))
+                    and len(key.split()) == len(phrase.split())):
+                # Same rows as if the name had been spelt right
+                return self.places[key] | self.localities.get(key, set()) | self.phrase(key), key.title()
+        return None, None
+
+    # ---------------- answering ----------------
+    def parse(self, question: str):
+        """{"intent", "place", "limit"} for a question the index can answer, else None."""
+        lowered = " ".join(question.lower().split())
+        if DEFER_RE.search(lowered):
+            return None
+        text = normalize(lowered)
+        if COUNT_RE.search(text):
+            intent = "count"
+        elif LOOKUP_RE.search(lowered):
+            intent = "lookup"
+        else:
+            intent = "list"
+        match = LIMIT_RE.search(text)
+        limit = int(match.group(1)) if match else None
+        # The place is what's left once the question words around it are gone
+        words = text.split()
+        skip = FILLER | ({match.group(1)} if match else set())
+        while words and words[0] in skip:
+            words.pop(0)
+        while words and words[-1] in skip:
+            words.pop()
+        if COMPOUND_WORDS.intersection(words):
+            return None
+        place = " ".join(words)
+        nationwide = place in NATIONWIDE
+        if nationwide:
+            place = ""
+        if not place and not (nationwide or intent == "count" or LIST_ALL_RE.search(text)):
+            return None
+        return {"intent": intent, "place": place, "limit": limit, "nationwide": nationwide}
+
+    def _line(self, number: int, row: dict) -> str:
+        return f"{number}. {row['name']}\n   {row['address']}\n   {row['google_map']}"
+
+    def answer(self, question: str):
+        """A templated answer, or None to leave the question to the LLM path."""
+        if not self.is_loaded:
+            return None
+        spec = self.parse(question)
+        if spec is None:
+            return None
+        if spec["place"]:
+            found, where = self.resolve(spec["place"], prefer_names=spec["intent"] == "lookup")
+            if not found:
+                return None
+        else:
+            found, where = range(len(self.rows)), None
+        rows = sorted((self.rows[i] for i in found), key=lambda r: r["name"].lower())
+        n = len(rows)
+        label = f" in {where or COVERAGE}"
+        # Asked about all of Malaysia: say what the list covers
+        scope = f"I only have outlet data for {COVERAGE}, not the rest of Malaysia." if spec["nationwide"] else None
+
+        if spec["intent"] == "count":
+            if spec["nationwide"]:
+                return (f"I only have outlet data for {COVERAGE}, where there are {n} ZUS Coffee outlets. "
+                        "Outlets in the rest of Malaysia aren't covered.")
+            if not where:
+                return f"We have {n} ZUS Coffee outlets{label}."
+            return f"There {'is 1 ZUS Coffee outlet' if n == 1 else f'are {n} ZUS Coffee outlets'}{label}."
+        if spec["intent"] == "lookup" and n == 1:
+            row = rows[0]
+            return f"{row['name']} is located at {row['address']}. You can find it here: {row['google_map']}"
+
+        limit = max(1, min(spec["limit"] or DEFAULT_LIMIT, MAX_LIMIT))
+        header = (f"I found {n} outlets matching \"{where}\":" if spec["intent"] == "lookup"
+                  else f"ZUS Coffee outlets{label} ({n}):")
+        lines = ([scope] if scope else []) + [header] + [self._line(i, row) for i, row in enumerate(rows[:limit], 1)]
+        if n > limit:
+            lines.append(f"…and {n - limit} more.")
+        return "\n".join(lines)
+
+def index_enabled() -> bool:
+    return os.getenv("OUTLETS_INDEX", "1") != "0"
+
+outlet_index = OutletIndex()
@@ -0,0 +1,234 @@
+import os
+import json
+import sqlite3
+import argparse
+from dotenv import load_dotenv
+
+# Streams scraped outlets (zus_kl_selangor_outlets.json from scrapeData) into
+# the outlets table. Replaces sql_convert.py's single giant INSERT:
+#   - the JSON array is decoded one outlet at a time (constant memory)
+#   - rows are written in OUTLET_BATCH_SIZE multi-row upserts keyed on the
+#     unique_outlet (name, address) constraint, so reruns are safe. A missing
+#     address is stored as '' rather than NULL: NULLs never conflict in a
+#     unique constraint, so those outlets would be inserted again on every run
+#   - for database targets only new or changed outlets are written (delta
+#     against the existing rows); --prune also deletes outlets no longer listed
+#
+#   uv run outlet_loader.py --sql outlets.sql     # script for the Supabase SQL editor / replica
+#   uv run outlet_loader.py --sqlite outlets.db   # local stand-in database
+#   uv run outlet_loader.py --supabase            # apply directly with SUPABASE_URL/SUPABASE_API_KEY
+
+load_dotenv()
+
+SOURCE_PATH = "zus_kl_selangor_outlets.json"
+
+POSTGRES_SCHEMA = """CREATE TABLE IF NOT EXISTS outlets (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    address TEXT NOT NULL DEFAULT '',
+    google_map VARCHAR(500),
+    CONSTRAINT unique_outlet UNIQUE (name, address)
+);
+"""
+
+SQLITE_SCHEMA = """CREATE TABLE IF NOT EXISTS outlets (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    address TEXT NOT NULL DEFAULT '',
+    google_map TEXT,
+    CONSTRAINT unique_outlet UNIQUE (name, address)
+);
+"""
+
+# Tables created before addresses were normalized may still hold NULLs
+NULL_ADDRESS_FIX = "UPDATE outlets SET address = '' WHERE address IS NULL;"
+
+UPSERT_SQL = (
+    "INSERT INTO outlets (name, address, google_map) VALUES (?, ?, ?) "
+    "ON CONFLICT (name, address) DO UPDATE SET google_map = excluded.google_map"
+)
+
+def iter_json_array(path: str, chunk_size: int = 1 << 16):
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} is not a JSON array")
+        buffer = buffer[1:]
+        eof = False
+        while True:
+            buffer = buffer.lstrip().lstrip(",").lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+
+def iter_outlets(path: str = SOURCE_PATH):
+    for outlet in iter_json_array(path):
+        name = (outlet.get("name") or "").strip()
+        if not name:
+            continue
+        yield {"name": name, "address": outlet.get("address") or "", "google_map": outlet.get("google_map")}
+
+def batched(rows, size):
+    """Chunks of rows, deduplicated on (name, address) inside each chunk (last one wins)."""
+    batch = {}
+    for row in rows:
+        batch[(row["name"], row["address"])] = row
+        if len(batch) >= size:
+            yield list(batch.values())
+            batch = {}
+    if batch:
+        yield list(batch.values())
+
+def sql_literal(value) -> str:
+    if value is None:
+        return "NULL"
+    return "'" + str(value).replace("'", "''") + "'"
+
+def upsert_statement(rows) -> str:
+    values = ",\n".join(
+        f"({sql_literal(r['name'])}, {sql_literal(r['address'])}, {sql_literal(r['google_map'])})" for r in rows
+    )
+    return (
+        "INSERT INTO outlets (name, address, google_map) VALUES\n"
+        f"{values}\n"
+        "ON CONFLICT (name, address) DO UPDATE SET google_map = EXCLUDED.google_map;\n"
+    )
+
+class SQLFileTarget:
+    """Writes a re-runnable SQL script (CREATE TABLE IF NOT EXISTS + batched upserts)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.file = open(self.tmp_path, "w", encoding="utf-8")
+        self.file.write(POSTGRES_SCHEMA + "\n" + NULL_ADDRESS_FIX + "\n\n")
+
+    def existing(self) -> dict:
+        return {}
+
+    def upsert(self, rows):
+        self.file.write(upsert_statement(rows) + "\n")
+
+    def delete(self, keys):
+        pass
+
+    def close(self, success: bool = True):
+        self.file.close()
+        # A failed run leaves the previous script in place
+        if success:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+
+class SQLiteTarget:
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SQLITE_SCHEMA + NULL_ADDRESS_FIX)
+
+    def existing(self) -> dict:
+        return {(name, address): google_map
+                for name, address, google_map in self.conn.execute("SELECT name, address, google_map FROM outlets")}
+
+    def upsert(self, rows):
+        with self.conn:
+            self.conn.executemany(UPSERT_SQL, [(r["name"], r["address"], r["google_map"]) for r in rows])
+
+    def delete(self, keys):
+        with self.conn:
+            self.conn.executemany("DELETE FROM outlets WHERE name = ? AND address = ?", keys)
+
+    def close(self, success: bool = True):
+        self.conn.close()
+
+class SupabaseTarget:
+    def __init__(self, supabase=None):
+        if supabase is None:
+            from supabase import create_client
+            supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_API_KEY"])
+        self.supabase = supabase
+        self.supabase.table("outlets").update({"address": ""}).is_("address", "null").execute()
+
+    def existing(self) -> dict:
+        rows, start, page = {}, 0, 1000
+        while True:
+            data = (self.supabase.table("outlets").select("name, address, google_map")
+                    .order("id").range(start, start + page - 1).execute().data)
+            rows.update({(r["name"], r["address"]): r["google_map"] for r in data})
+            if len(data) < page:
+                return rows
+            start += page
+
+    def upsert(self, rows):
+        self.supabase.table("outlets").upsert(rows, on_conflict="name,address").execute()
+
+    def delete(self, keys):
+        for name, address in keys:
+            self.supabase.table("outlets").delete().eq("name", name).eq("address", address).execute()
+
+    def close(self, success: bool = True):
+        pass
+
+def load_outlets(target, path: str = SOURCE_PATH, batch_size: int = None, prune: bool = False) -> dict:
+    """Stream outlets from `path` into `target`; returns counts of what was written."""
+    batch_size = batch_size or int(os.getenv("OUTLET_BATCH_SIZE", "500"))
+    existing = target.existing()
+    stats = {"read": 0, "written": 0, "unchanged": 0, "deleted": 0}
+    seen = set()
+
+    def changed_rows():
+        for row in iter_outlets(path):
+            stats["read"] += 1
+            key = (row["name"], row["address"])
+            seen.add(key)
+            if key in existing and existing[key] == row["google_map"]:
+                stats["unchanged"] += 1
+                continue
+            yield row
+
+    try:
+        for rows in batched(changed_rows(), batch_size):
+            target.upsert(rows)
+            stats["written"] += len(rows)
+        if prune and existing:
+            removed = [key for key in existing if key not in seen]
+            if removed:
+                target.delete(removed)
+            stats["deleted"] = len(removed)
+    except Exception:
+        target.close(success=False)
+        raise
+    target.close()
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", default=SOURCE_PATH, help="scraped outlets JSON array")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--sql", help="write a re-runnable SQL script to this path (default: outlets.sql)")
+    group.add_argument("--sqlite", help="apply to a SQLite database at this path")
+    group.add_argument("--supabase", action="store_true", help="apply to Supabase (SUPABASE_URL / SUPABASE_API_KEY)")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--prune", action="store_true", help="delete outlets that are no longer listed")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        target = SQLiteTarget(args.sqlite)
+    elif args.supabase:
+        target = SupabaseTarget()
+    else:
+        target = SQLFileTarget(args.sql or "outlets.sql")
+    stats = load_outlets(target, args.source, args.batch_size, args.prune)
+    print(f"[SUCCESS] {stats['read']} outlets read, {stats['written']} written, "
+          f"{stats['unchanged']} unchanged, {stats['deleted']} deleted")
@@ -0,0 +1,99 @@
+import json
+
+# Structured outlet lookups. The LLM only produces a small filter
+#   {"intent": "list" | "count" | "none", "keywords": ["uptown", "damansara"], "limit": 10}
+# and this module turns it into one of a fixed set of parameterized statements,
+# so no generated SQL text ever reaches the database. Keywords are matched
+# against the outlet name only (addresses are too inconsistent to filter on).
+
+INTENTS = ("list", "count", "none")
+MAX_KEYWORDS = 3
+MAX_KEYWORD_LENGTH = 40
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+FILTER_PROMPT = """Turn the user's question about ZUS Coffee outlets into a JSON filter:
+{"intent": "list" | "count" | "none", "keywords": [string], "limit": integer}
+- keywords: up to 3 short words/phrases that must all appear in the outlet name (area, mall or street), lowercase; [] for all outlets
+- intent "count" for how-many questions, "list" otherwise, "none" if the question is not about finding outlets
+- limit: number of outlets the user wants, default 20
+Output only the JSON."""
+
+def parse_filter(raw) -> dict:
+    """Validate LLM output (JSON text or dict) into a normalized filter; raises ValueError."""
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else dict(raw)
+    except (TypeError, ValueError):
+        raise ValueError("Outlet filter is not valid JSON.")
+    if not isinstance(data, dict):
+        raise ValueError("Outlet filter must be a JSON object.")
+
+    intent = str(data.get("intent", "list")).lower()
+    if intent not in INTENTS:
+        raise ValueError(f"Unknown outlet filter intent: {intent}")
+
+    keywords = data.get("keywords") or []
+    if isinstance(keywords, str):
+        keywords = [keywords]
+    if not isinstance(keywords, list):
+        raise ValueError("Outlet filter keywords must be a list.")
+    cleaned = []
+    for keyword in keywords:
+        keyword = " ".join(str(keyword).lower().split())[:MAX_KEYWORD_LENGTH]
+        if keyword and keyword not in cleaned:
+            cleaned.append(keyword)
+
+    try:
+        limit = int(data.get("limit") or DEFAULT_LIMIT)
+    except (TypeError, ValueError):
+        limit = DEFAULT_LIMIT
+    return {
+        "intent": intent,
+        "keywords": cleaned[:MAX_KEYWORDS],
+        "limit": max(1, min(limit, MAX_LIMIT)),
+    }
+
+def filter_key(outlet_filter: dict) -> tuple:
+    return (outlet_filter["intent"], tuple(outlet_filter["keywords"]), outlet_filter["limit"])
+
+def like_pattern(keyword: str) -> str:
+    escaped = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def _statement(intent: str, n_keywords: int) -> str:
+    where = " AND ".join(["name LIKE ? ESCAPE '\\'"] * n_keywords)
+    where = f" WHERE {where}" if where else ""
+    if intent == "count":
+        return f"SELECT COUNT(id) AS count FROM outlets{where}"
+    return f"SELECT name, address, google_map FROM outlets{where} ORDER BY name LIMIT ?"
+
+# Every statement the outlets tool can run: (intent, keyword count) → SQL.
+# The text never varies, so SQLite's statement cache reuses the compiled plan.
+STATEMENTS = {
+    (intent, n): _statement(intent, n)
+    for intent in ("list", "count")
+    for n in range(MAX_KEYWORDS + 1)
+}
+
+def build_query(outlet_filter: dict):
+    """(SQL, params) for the replica. SQLite LIKE is case-insensitive for ASCII, like ILIKE."""
+    keywords = outlet_filter["keywords"]
+    sql = STATEMENTS[(outlet_filter["intent"], len(keywords))]
+    params = [like_pattern(k) for k in keywords]
+    if outlet_filter["intent"] == "list":
+        params.append(outlet_filter["limit"])
+    return sql, tuple(params)
+
+async def run_postgrest(supabase, outlet_filter: dict):
+    """The same query through the PostgREST builder, which sends the values as parameters."""
+    if outlet_filter["intent"] == "count":
+        query = supabase.table("outlets").select("id", count="exact", head=True)
+    else:
+        query = supabase.table("outlets").select("name, address, google_map")
+    for keyword in outlet_filter["keywords"]:
+        query = query.ilike("name", like_pattern(keyword))
+    if outlet_filter["intent"] == "count":
+        result = await query.execute()
+        return [{"count": result.count}]
+    result = await query.order("name").limit(outlet_filter["limit"]).execute()
+    return result.data
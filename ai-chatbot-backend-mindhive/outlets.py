@@ -1,189 +1,225 @@
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
-from supabase import create_client, Client
-import sqlparse
-from sqlparse.sql import Identifier, IdentifierList
-from sqlparse.tokens import Keyword, DML
-from typing import Tuple, List
+from supabase import acreate_client, AsyncClient
 from fastapi import APIRouter, Query, HTTPException
+from outlets_replica import replica, use_replica, supabase_fallback_enabled
+from outlet_queries import FILTER_PROMPT, parse_filter, filter_key, build_query, run_postgrest
+from outlet_index import outlet_index, index_enabled
+from cache import TTLCache, normalize_text
+from clients import get_clients
+from llm_gateway import LLMGateway
+import metrics
 
 router = APIRouter(tags=["Outlets"])
 
-Table_Schema = """
-Table: outlets
-    - id (SERIAL PRIMARY KEY)
-    - name (VARCHAR NOT NULL)
-    - address (TEXT)
-    - google_map (VARCHAR)
-"""
 load_dotenv()  
 
+# question → validated filter, and filter → rows. Both are dropped whenever the
+# outlets table is reloaded.
+filter_cache = TTLCache(
+    maxsize=int(os.getenv("OUTLETS_FILTER_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("OUTLETS_FILTER_CACHE_TTL", "86400")),
+    name="outlets_filters"
+)
+rows_cache = TTLCache(
+    maxsize=int(os.getenv("OUTLETS_ROWS_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("OUTLETS_ROWS_CACHE_TTL", "3600")),
+    name="outlets_rows"
+)
+
+# Bumped on every replica reload and every /outlets/refresh, so answers cached
+# elsewhere (semantic cache) also expire on the Supabase backend, where the
+# replica version never changes
+_generation = 0
+
+def invalidate_caches(*_):
+    global _generation
+    _generation += 1
+    filter_cache.clear()
+    rows_cache.clear()
+
+def data_version() -> str:
+    return f"{replica.version}.{_generation}"
+
+replica.on_reload(invalidate_caches)
+# Locality / name index for templated answers, rebuilt from each snapshot
+replica.on_reload(outlet_index.load_replica)
+
+async def load_index(supabase: AsyncClient = None):
+    """Build the outlet index from the data the lookups use: the replica, or
+    a Supabase snapshot when OUTLETS_BACKEND=supabase (no replica reloads)."""
+    if use_replica():
+        # A replica load builds the index through on_reload
+        await replica.ensure_loaded()
+        if not outlet_index.is_loaded:
+            outlet_index.load_replica(replica)
+        return
+    supabase = supabase or await get_clients().get_supabase()
+    result = await supabase.table("outlets").select("id, name, address, google_map").order("id").execute()
+    outlet_index.load_rows(result.data, version=(outlet_index.version or 0) + 1)
+
+async def ensure_index() -> bool:
+    """Load the index on first use; False (LLM path only) when it can't be loaded."""
+    if not outlet_index.is_loaded:
+        try:
+            await load_index()
+        except Exception as e:
+            print(f"[WARN] Outlet index could not be loaded: {e}")
+    return outlet_index.is_loaded
+
+SUMMARY_PROMPT = """You are a helpful assistant that answers user questions about outlets. 
+You will be given outlet data, then the user's question.
+Each outlet has:
+- name
+- address
+- google_map
+
+Instructions:
+1. If the user asks about information that exists in the data (like address or Google Maps link), provide it clearly.
+2. If the user asks about information that does NOT exist in the data (like opening hours, closing time, menu items), politely tell the user you do not have that information, and provide the Google Maps link for reference.
+3. Respond in a friendly, natural, user-facing way.
+4. Only answer based on the data provided. Do NOT make up information.
+5. Provide concise answers, suitable for chat or voice assistant.
+
+Examples:
+User: "Where is ZUS Coffee – Uptown Damansara?"  
+Assistant: "ZUS Coffee – Uptown Damansara is located at 44-G (Ground Floor), JALAN SS21/39, DAMANSARA UTAMA, 47400 PETALING JAYA, SELANGOR. You can find it here: https://maps.app.goo.gl/SGuUWhHHEBNd8mFWA"
+
+User: "When does ZUS Coffee – Uptown Damansara open?"  
+Assistant: "Sorry, I don't have the opening or closing times for ZUS Coffee – Uptown Damansara. Please check here for more info: https://maps.app.goo.gl/SGuUWhHHEBNd8mFWA"
+"""
+
 class Outlets:
     @staticmethod
-    def supabaseConnect() :
+    async def supabaseConnect() -> AsyncClient:
         supabase_url = os.environ["SUPABASE_URL"]  
         supabase_api_key = os.environ["SUPABASE_API_KEY"] 
 
-        client = create_client(supabase_url, supabase_api_key) 
+        client = await acreate_client(supabase_url, supabase_api_key) 
         return client
 
-    def __init__(self):
-        self.openai = OpenAI()
-        self.supabase = Outlets.supabaseConnect()
-
-
-    def generate_sql_query(self, user_question: str, schema_description: str) -> str:
-        messages = [
-                {
-                    "role": "system",
-                    "content": f"""
-                        You are an expert Text-to-SQL translator for PostgreSQL (Supabase).
-                        Your job is to convert a natural language question into a valid SQL query.
-
-                        RULES:
-                        1. Output ONLY SQL query (no explanations).
-                        2. Never use DELETE, UPDATE, INSERT, DROP, or any other modification statements.
-                        3. Do NOT interpolate raw user input into queries. 
-                        4. Use safe WHERE clauses.Use ONLY tables/columns in the provided schema.
-                        5. Do NOT invent tables or columns.
-                        6. Use simple ANSI SQL.
-                        7. Do not wrap SQL in markdown.
-                        8. Never use wildcard * when generating SQL
-                        9. When generating SQL, do NOT use parameters such as $1 or ?
-                        10. When generating SQL for outlet lookup, always search using ONLY the "name" column. Do NOT filter by "address" because address strings vary and are not reliable for matching.
-                            Never include conditions like address LIKE ... even if the user mentions the location. Use: WHERE name ILIKE '%<keywords>%' only.
-                        11. Always end with a semicolon.
-                        12. If user intent is impossible with the schema, output: -- Unable to generate SQL
-                        
-
-                        Database Schema:
-                        {schema_description}
-                        """
-                },
-                {
-                    "role": "user",
-                    "content": user_question
-                }
-        ]
-
-        response = self.openai.chat.completions.create(
-            model= "gpt-5-mini-2025-08-07",
-            messages= messages
+    def __init__(self, gateway: LLMGateway = None, supabase: AsyncClient = None):
+        self.gateway = gateway or get_clients().gateway
+        self.supabase = supabase
+
+    @classmethod
+    async def create(cls):
+        # Reuses the application-lifetime LLM gateway and Supabase client
+        clients = get_clients()
+        if use_replica():
+            await replica.ensure_loaded()
+            # Supabase is only needed if the replica has to fall back
+            return cls(clients.gateway)
+        return cls(clients.gateway, await clients.get_supabase())
+
+
+    async def generate_filter(self, user_question: str) -> dict:
+        content = await self.gateway.complete(
+            [
+                {"role": "system", "content": FILTER_PROMPT},
+                {"role": "user", "content": user_question}
+            ],
+            stage="outlets.filter",
+            response_format={"type": "json_object"}
         )
-        return response.choices[0].message.content
-
-    def execute_sql_query(self, sql_query):
+        return parse_filter(content)
+
+    async def find_outlets(self, outlet_filter: dict):
+        key = filter_key(outlet_filter)
+        rows = rows_cache.get(key)
+        if rows is not None:
+            return rows
+        with metrics.span("outlets.query"):
+            rows = await self._find_outlets(outlet_filter)
+        # Errors come back as {"error": ...} and are not cached
+        if isinstance(rows, list):
+            rows_cache.set(key, rows)
+        return rows
+
+    async def _find_outlets(self, outlet_filter: dict):
+        if use_replica():
+            try:
+                sql, params = build_query(outlet_filter)
+                return await replica.execute(sql, params)
+            except Exception as e:
+                if not supabase_fallback_enabled():
+                    return {"error": str(e)}
+                print(f"[WARN] Outlets replica failed, falling back to Supabase: {e}")
+        return await self.find_remote_outlets(outlet_filter)
+
+    async def find_remote_outlets(self, outlet_filter: dict):
         try:
-            result = self.supabase.rpc("custom_query", {"query_text": sql_query}).execute()
-            return result.data
+            if self.supabase is None:
+                self.supabase = await get_clients().get_supabase()
+            return await run_postgrest(self.supabase, outlet_filter)
         except Exception as e:
             return {"error": str(e)}
 
-    @staticmethod    
-    def validate_generated_sql(sql: str) -> Tuple[bool, str]:
-        # Parse SQL
-        parsed = sqlparse.parse(sql)
-        if not parsed:
-            return False
-        stmt = parsed[0]
-
-        if stmt.get_type() != "SELECT":
-            return False, "Only SELECT queries allowed."
-        
-        if "*" in sql:
-            return False, "Wildcard '*' is not allowed."
-        
-        # Check for forbidden keywords
-        forbidden = ["DROP", "DELETE", "UPDATE", "INSERT", "--", ";--"]
-        for kw in forbidden:
-            if kw.lower() in sql.lower():
-                return False, f"Forbidden keyword detected: {kw}"
-        
-        tables = []
-        from_seen = False
-        
-        # Check if only allowed tables are used
-        for token in stmt.tokens:
-            if token.ttype is Keyword and token.value.upper() == "FROM":
-                from_seen = True
-                continue
-
-            if from_seen:
-                if isinstance(token, Identifier):
-                    tables.append(token.get_real_name())
-                    from_seen = False
-                elif isinstance(token, IdentifierList):
-                    for ident in token.get_identifiers():
-                        tables.append(ident.get_real_name())
-                    from_seen = False
-
-        if len(tables) == 0:
-            return False, "No table found in FROM clause."
-
-        if len(tables) > 1:
-            return False, "Multiple tables detected. Only the 'outlets' table is allowed."
-
-        if tables[0].lower() != "outlets":
-            return False, f"Invalid table: {tables[0]}. Only 'outlets' table is allowed."     
-               
-        return True, ""
-
-    def summarize_outlets(self, query: str, outlets):
-        prompt = f"""
-            You are a helpful assistant that answers user questions about outlets. 
-            You have access to the following outlet data:
-            {outlets}
-            Each outlet has:
-            - name
-            - address
-            - google_map
-
-            Instructions:
-            1. If the user asks about information that exists in the data (like address or Google Maps link), provide it clearly.
-            2. If the user asks about information that does NOT exist in the data (like opening hours, closing time, menu items), politely tell the user you do not have that information, and provide the Google Maps link for reference.
-            3. Respond in a friendly, natural, user-facing way.
-            4. Only answer based on the data provided. Do NOT make up information.
-            5. Provide concise answers, suitable for chat or voice assistant.
-
-            Examples:
-            User: "Where is ZUS Coffee – Uptown Damansara?"  
-            Assistant: "ZUS Coffee – Uptown Damansara is located at 44-G (Ground Floor), JALAN SS21/39, DAMANSARA UTAMA, 47400 PETALING JAYA, SELANGOR. You can find it here: https://maps.app.goo.gl/SGuUWhHHEBNd8mFWA"
-
-            User: "When does ZUS Coffee – Uptown Damansara open?"  
-            Assistant: "Sorry, I don't have the opening or closing times for ZUS Coffee – Uptown Damansara. Please check here for more info: https://maps.app.goo.gl/SGuUWhHHEBNd8mFWA"
-
-            User Question: {query}
-
-            """
-        response = self.openai.chat.completions.create(
-        model="gpt-5-mini-2025-08-07",
-        messages=[{"role": "user", "content": prompt}]
+    def stream_summary(self, query: str, outlets):
+        # Instructions first, then the rows and the question, for a cacheable prefix
+        return self.gateway.stream(
+            [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Outlet data:\n{outlets}\n\nUser Question: {query}"}
+            ],
+            stage="outlets.summary"
         )
-        return response.choices[0].message.content
 
-@router.get("/outlets")
-async def main(query: str, schema: str = Table_Schema):
-    
-    client = Outlets()
-    print(f"User Question: {query}")
+    async def summarize_outlets(self, query: str, outlets):
+        return "".join([token async for token in self.stream_summary(query, outlets)])
 
-    sql_query = client.generate_sql_query(query, schema)
-    print(f"Generated SQL Query:\n{sql_query}")
+async def stream_outlet_answer(query: str):
+    print(f"User Question: {query}")
 
-    is_valid, reason = client.validate_generated_sql(sql_query)
+    # Counts, lists and lookups by place or outlet name come straight from the
+    # index, before any client is set up; the LLM filter + summary path
+    # handles everything else
+    if index_enabled() and await ensure_index():
+        with metrics.span("outlets.index"):
+            answer = outlet_index.answer(query)
+        if answer is not None:
+            yield answer
+            return
+
+    client = await Outlets.create()
+    cache_key = normalize_text(query)
+    outlet_filter = filter_cache.get(cache_key)
+    if outlet_filter is None:
+        outlet_filter = await client.generate_filter(query)
+        print(f"Generated outlet filter: {outlet_filter}")
+        if outlet_filter["intent"] == "none":
+            raise ValueError("Unable to answer this question from the outlets data.")
+        filter_cache.set(cache_key, outlet_filter)
+
+    query_results = await client.find_outlets(outlet_filter)
+    async for token in client.stream_summary(query=query, outlets=query_results):
+        yield token
+
+async def answer_outlet_question(query: str) -> str:
+    data = "".join([token async for token in stream_outlet_answer(query)])
+    print(f"Query Results:\n{data}")
+    return data
+
+@router.post("/outlets/refresh")
+async def refresh_outlets():
+    if use_replica():
+        await replica.refresh()
+    else:
+        invalidate_caches()
+        if index_enabled():
+            await load_index()
+    return {"version": replica.version, "rows": replica.row_count, "loaded_at": replica.loaded_at}
+
+@router.get("/outlets/cache")
+def outlets_cache_stats():
+    return {"filters": filter_cache.stats(), "rows": rows_cache.stats()}
 
-    if not is_valid:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsafe or invalid SQL generated: {reason}"
-        )
-    
+@router.get("/outlets")
+async def main(query: str):
     try:
-        query_results = client.execute_sql_query(sql_query)
-        data = client.summarize_outlets(query=query, outlets=query_results)
-        print(f"Query Results:\n{data}")
-        return data
+        return await answer_outlet_question(query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
   
@@ -0,0 +1,153 @@
+import os
+import time
+import sqlite3
+import asyncio
+import threading
+
+# Embedded, read-only SQLite copy of the Supabase `outlets` table. The table is
+# small (~250 rows), so the fixed parameterized lookups from outlet_queries run
+# in-process instead of going over the network to Supabase.
+#
+# OUTLETS_BACKEND=local     → run the lookups against the replica (default)
+# OUTLETS_BACKEND=supabase  → always query Supabase through PostgREST
+# OUTLETS_REPLICA_SOURCE=sql|supabase → load from outlets.sql or a Supabase snapshot
+# OUTLETS_REFRESH_SECONDS   → periodic reload interval, 0 disables it
+# OUTLETS_SUPABASE_FALLBACK=1 → retry on Supabase when the replica cannot run a query
+
+SQL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "outlets.sql")
+
+REPLICA_SCHEMA = """
+CREATE TABLE outlets (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    address TEXT,
+    google_map TEXT,
+    CONSTRAINT unique_outlet UNIQUE (name, address)
+);
+"""
+
+SNAPSHOT_QUERY = "SELECT id, name, address, google_map FROM outlets ORDER BY id;"
+
+def _read_only_authorizer(action, arg1, arg2, db_name, trigger):
+    # Only SELECTs that read the outlets table are allowed
+    if action in (sqlite3.SQLITE_SELECT, sqlite3.SQLITE_FUNCTION):
+        return sqlite3.SQLITE_OK
+    if action == sqlite3.SQLITE_READ and arg1 == "outlets":
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
+
+class OutletsReplica:
+    def __init__(self):
+        self._conn = None
+        self._lock = threading.Lock()
+        self.version = 0
+        self.loaded_at = None
+        self.row_count = 0
+        self._listeners = []
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._conn is not None
+
+    def on_reload(self, callback):
+        """Register a callback run after every successful (re)load."""
+        self._listeners.append(callback)
+
+    @staticmethod
+    def _new_connection():
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.executescript(REPLICA_SCHEMA)
+        return conn
+
+    def _swap(self, conn):
+        conn.execute("PRAGMA query_only = ON")
+        conn.set_authorizer(_read_only_authorizer)
+        row_count = conn.execute("SELECT COUNT(id) FROM outlets").fetchone()[0]
+        with self._lock:
+            old, self._conn = self._conn, conn
+            self.version += 1
+            self.loaded_at = time.time()
+            self.row_count = row_count
+        if old is not None:
+            old.close()
+        for callback in self._listeners:
+            callback(self)
+
+    def load_sql_file(self, path: str = SQL_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            script = f.read()
+        # The file starts with a Postgres CREATE TABLE (SERIAL etc.); the replica
+        # uses its own schema and only replays the INSERT statements.
+        start = script.upper().find("INSERT INTO")
+        if start == -1:
+            raise ValueError(f"No INSERT statements found in {path}")
+        conn = self._new_connection()
+        conn.executescript(script[start:])
+        self._swap(conn)
+
+    def load_rows(self, rows):
+        conn = self._new_connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO outlets (id, name, address, google_map) VALUES (?, ?, ?, ?)",
+            [(r.get("id"), r["name"], r.get("address"), r.get("google_map")) for r in rows]
+        )
+        self._swap(conn)
+
+    async def load_supabase(self, supabase):
+        result = await supabase.table("outlets").select("id, name, address, google_map").order("id").execute()
+        self.load_rows(result.data)
+
+    async def refresh(self, supabase=None):
+        source = os.getenv("OUTLETS_REPLICA_SOURCE", "sql").lower()
+        if source == "supabase":
+            if supabase is None:
+                from clients import get_clients
+                supabase = await get_clients().get_supabase()
+            await self.load_supabase(supabase)
+        else:
+            await asyncio.to_thread(self.load_sql_file, os.getenv("OUTLETS_SQL_PATH", SQL_PATH))
+        print(f"[INFO] Outlets replica v{self.version} loaded with {self.row_count} rows from {source}")
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            conn = self._conn
+            if conn is None:
+                raise RuntimeError("Outlets replica is not loaded.")
+            rows = conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def rows(self) -> list:
+        """Every outlet row of the current snapshot."""
+        return self._execute(SNAPSHOT_QUERY)
+
+    async def execute(self, sql: str, params=()) -> list:
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    async def ensure_loaded(self):
+        if not self.is_loaded:
+            await self.refresh()
+
+    async def refresh_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep serving the previous snapshot
+                print(f"[WARN] Outlets replica refresh failed: {e}")
+
+def use_replica() -> bool:
+    return os.getenv("OUTLETS_BACKEND", "local").lower() == "local"
+
+def supabase_fallback_enabled() -> bool:
+    return os.getenv("OUTLETS_SUPABASE_FALLBACK", "1") != "0"
+
+replica = OutletsReplica()
+
+def start_refresher():
+    """Schedule periodic reloads; returns the task (or None) so the caller can cancel it."""
+    interval = float(os.getenv("OUTLETS_REFRESH_SECONDS", "0"))
+    if not use_replica() or interval <= 0:
+        return None
+    return asyncio.create_task(replica.refresh_forever(interval))
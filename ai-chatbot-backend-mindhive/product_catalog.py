@@ -0,0 +1,423 @@
+import os
+import re
+import json
+import math
+import threading
+from typing import Any
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from local_vectorstore import top_k
+from dataProcess import format_chunk
+
+# In-memory product catalog built from zus_products.json (the output of
+# scrapeData.scrape_products / extract_product_info), for the questions that
+# are really filters and sorts over variant data: "most expensive tumblers",
+# "which blue cups are in stock", "mugs under RM40". Those are answered from
+# the table directly; everything else still goes through RAG, whose retriever
+# is fused with a BM25 index over the same products (HybridRetriever).
+#
+# Variants are stored column-wise (one NumPy array per field, indexed by
+# variant row) so a filter is a few vectorized comparisons and a sort is one
+# argsort; colors also have an inverted index (word → variant rows).
+#
+# PRODUCTS_CATALOG_PATH   → catalog file, reloaded when its mtime changes
+# PRODUCTS_STRUCTURED=1   → answer structured questions from the table
+# PRODUCTS_HYBRID=1       → fuse BM25 hits into the vector retriever's results
+
+CATALOG_PATH = "zus_products.json"
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+CATEGORIES = ("tumbler", "cup", "mug", "flask", "bottle", "bundle", "glass")
+# Words in variant names that are not colors
+COLOR_NOISE = {
+    "default", "title", "ml", "oz", "l", "a", "and", "with", "the", "of", "in", "on", "for",
+    "all", "day", "new", "edition", "limited",
+}
+# Words in product names that don't single out a product
+NAME_NOISE = COLOR_NOISE | {"zus", "can", "on", "to"}
+COLOR_SYNONYMS = {"gray": "grey", "colour": "color"}
+# Asked-for colors the catalog may not carry, so "pink mugs" gets an exact "none"
+BASE_COLORS = {
+    "black", "white", "grey", "silver", "gold", "blue", "navy", "green", "red", "pink", "purple",
+    "yellow", "orange", "brown", "beige", "cream", "teal", "mint", "maroon",
+}
+
+# A size ("500ml", "20oz", "1.5 l") is never read as a price
+SIZE = r"\d+(?:\.\d+)?\s*(?:ml|l|litres?|liters?|oz)\b"
+MONEY = r"(?:rm\s*)?(\d+(?:\.\d+)?)(?![\d.]|\s*(?:ml|l|litres?|liters?|oz)\b)"
+PRICE_BETWEEN_RE = re.compile(rf"\bbetween\s+{MONEY}\s*(?:and|to|-)\s*{MONEY}")
+PRICE_RANGE_RE = re.compile(rf"\brm\s*(\d+(?:\.\d+)?)\s*(?:-|to)\s*{MONEY}")
+# "under/over RMx" exclude RMx itself, "up to/from RMx" include it
+PRICE_MAX_RE = re.compile(rf"\b(?:(under|below|less than|cheaper than)|at most|max(?:imum)?|up to|within)\s+{MONEY}")
+PRICE_MIN_RE = re.compile(rf"\b(?:(over|above|more than|pricier than)|at least|from|min(?:imum)?)\s+{MONEY}")
+MOST_EXPENSIVE_RE = re.compile(r"\b(most expensive|priciest|highest[- ]priced?|highest price|most premium)\b")
+CHEAPEST_RE = re.compile(r"\b(cheapest|least expensive|lowest[- ]priced?|lowest price|most affordable)\b")
+IN_STOCK_RE = re.compile(r"\b(in stock|available|in-stock|can i buy|can buy)\b")
+SOLD_OUT_RE = re.compile(r"\b(sold out|out of stock|unavailable|not available|no longer available)\b")
+COUNT_RE = re.compile(r"\bhow many\b")
+# "top 3", "3 cheapest", "cheapest 3", "most expensive 2"
+TOP_N_RE = re.compile(
+    r"\btop\s*(\d+)?|\b(\d+)\s+(?:most|cheapest|least|priciest|lowest|highest)|"
+    r"\b(?:cheapest|priciest|most expensive|least expensive|most affordable|lowest[- ]priced?|highest[- ]priced?)\s+(\d+)\b"
+)
+PLURAL_CATEGORY_RE = re.compile(r"\b(" + "|".join(CATEGORIES) + r")(e?s)\b")
+# Questions that lean on earlier turns, or ask about something the table
+# doesn't hold (sizes included), stay with the LLM
+DEFER_RE = re.compile(
+    r"\b(it|its|those|these|them|same|above|previous|again|(this|that|which) ones?|"
+    r"the (first|second|third|last) one|colou?rs|capacity|size|material|hot|cold|dishwasher|warranty)\b|"
+    rf"\b{SIZE}"
+)
+# Yes/no questions about one item ("is the white mug microwave safe?") and
+# requests to describe one are for RAG, not a filter
+YES_NO_RE = re.compile(r"^(is|are|does|do|did|can|could|will|would|should|has|have)\s+(the|this|that|my|your|zus)\b")
+DESCRIBE_RE = re.compile(r"\b(tell me (more )?about|describe|details (of|on|about)|more about)\b")
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for token in TOKEN_RE.findall(str(text).lower()):
+        token = COLOR_SYNONYMS.get(token, token)
+        # Light plural folding: "tumblers" → "tumbler", "glasses" → "glass"
+        if len(token) > 3 and token.endswith("es") and token[:-2].endswith(("ss", "sh", "ch", "x")):
+            token = token[:-2]
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+def money(price: float) -> str:
+    return f"RM{price:.2f}"
+
+class BM25Index:
+    """Okapi BM25 over a handful of short documents, postings held as NumPy arrays."""
+
+    def __init__(self, documents, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        postings = {}
+        lengths = []
+        for doc_id, text in enumerate(documents):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((doc_id, tf))
+        self.size = len(lengths)
+        self.doc_len = np.asarray(lengths, dtype=np.float32)
+        avgdl = float(self.doc_len.mean()) if self.size else 1.0
+        self.norm = self.k1 * (1 - self.b + self.b * self.doc_len / max(avgdl, 1e-9))
+        self.postings = {}
+        for token, entries in postings.items():
+            ids = np.fromiter((d for d, _ in entries), dtype=np.int32, count=len(entries))
+            tf = np.fromiter((t for _, t in entries), dtype=np.float32, count=len(entries))
+            idf = math.log(1 + (self.size - len(entries) + 0.5) / (len(entries) + 0.5))
+            self.postings[token] = (ids, tf, idf)
+
+    def search(self, query: str, k: int = 5) -> list:
+        """[(doc_id, score)] best first; documents sharing no term are left out."""
+        if not self.size:
+            return []
+        scores = np.zeros(self.size, dtype=np.float32)
+        for token in set(tokenize(query)):
+            entry = self.postings.get(token)
+            if entry is None:
+                continue
+            ids, tf, idf = entry
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + self.norm[ids])
+        best = top_k(scores, k)
+        return [(int(i), float(scores[i])) for i in best if scores[i] > 0]
+
+class ProductCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.path = None
+        self.version = None
+        self._load_products([])
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.version is not None
+
+    # ---------------- loading ----------------
+    def _load_products(self, products: list):
+        # The scraper reads collection pages and single product URLs, so the
+        # same product can be listed more than once; keep its first copy
+        seen = set()
+        unique = []
+        for product in products:
+            product_id = product.get("product_id")
+            if product_id is None or product_id not in seen:
+                seen.add(product_id)
+                unique.append(product)
+        products = unique
+        names, urls, ids, rows = [], [], [], []
+        for p, product in enumerate(products):
+            names.append(product.get("product_name", "Unknown"))
+            urls.append(product.get("source_url", ""))
+            ids.append(str(product.get("product_id")))
+            for variant in product.get("variants", []):
+                try:
+                    price = float(variant.get("price") or 0)
+                except (TypeError, ValueError):
+                    price = math.nan
+                rows.append((p, price, bool(variant.get("available")), str(variant.get("color") or "")))
+
+        self.products = products
+        self.names = names
+        self.urls = urls
+        self.product_ids = ids
+        self.variant_product = np.asarray([r[0] for r in rows], dtype=np.int32)
+        self.price = np.asarray([r[1] for r in rows], dtype=np.float64)
+        self.available = np.asarray([r[2] for r in rows], dtype=bool)
+        self.color = [r[3] for r in rows]
+
+        color_rows = {}
+        for row, color in enumerate(self.color):
+            for token in set(tokenize(color)) - COLOR_NOISE:
+                if not token.isdigit():
+                    color_rows.setdefault(token, []).append(row)
+        self.color_index = {token: np.asarray(r, dtype=np.int64) for token, r in color_rows.items()}
+        name_tokens = [set(tokenize(name)) for name in names]
+        # Terms that name a specific product ("og", "frozee", "corak"): a
+        # question using one is about that product, not a filter
+        self.name_terms = {
+            t for tokens in name_tokens for t in tokens
+            if t not in CATEGORIES and t not in NAME_NOISE and t not in BASE_COLORS
+            and t not in self.color_index and not any(c.isdigit() for c in t)
+        }
+        # A product is in a category when its name, product type or tags say
+        # so: the shop tags cups "Tumbler" without it being in the name
+        category_tokens = [
+            tokens.union(tokenize(product.get("product_type") or ""), *map(tokenize, product.get("tags") or []))
+            for tokens, product in zip(name_tokens, products)
+        ]
+        self.category_mask = {
+            category: np.asarray([category in tokens for tokens in category_tokens], dtype=bool)
+            for category in CATEGORIES
+        }
+        # Catalogs scraped before tags were kept only know categories by name
+        self.has_tags = any("tags" in product or "product_type" in product for product in products)
+        self.documents = [format_chunk(product) for product in products]
+        self.bm25 = BM25Index(self.documents)
+
+    def load(self, path: str = None):
+        path = path or os.getenv("PRODUCTS_CATALOG_PATH", CATALOG_PATH)
+        with open(path, encoding="utf-8") as f:
+            products = json.load(f)["products"]
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            self._load_products(products)
+            self.path = path
+            self.version = str(mtime)
+        print(f"[INFO] Product catalog loaded: {len(self.names)} products, {len(self.color)} variants from {path}")
+        if self.names and not self.has_tags:
+            print(f"[WARN] {path} has no product tags; category questions go to RAG until it is re-scraped")
+
+    def ensure_loaded(self) -> bool:
+        """(Re)load when the file is new or has changed; False when there is no catalog file."""
+        path = os.getenv("PRODUCTS_CATALOG_PATH", CATALOG_PATH)
+        try:
+            mtime = str(os.path.getmtime(path))
+        except OSError:
+            return self.is_loaded
+        if path != self.path or mtime != self.version:
+            try:
+                self.load(path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[WARN] Product catalog {path} could not be loaded: {e}")
+        return self.is_loaded
+
+    # ---------------- structured queries ----------------
+    def parse(self, question: str):
+        """The filter/sort a question asks for, or None when it isn't a structured question."""
+        text = " ".join(question.lower().split())
+        if DEFER_RE.search(text) or YES_NO_RE.search(text) or DESCRIBE_RE.search(text):
+            return None
+        tokens = tokenize(text)
+        if self.name_terms.intersection(tokens):
+            return None
+        # Without tags a category filter would miss products not named after it
+        if not self.has_tags and any(c in tokens for c in CATEGORIES):
+            return None
+        spec = {
+            "categories": [c for c in CATEGORIES if c in tokens],
+            "colors": [t for t in dict.fromkeys(tokens)
+                       if (t in self.color_index or t in BASE_COLORS) and t not in CATEGORIES],
+            "min_price": None,
+            "max_price": None,
+            "min_strict": False,
+            "max_strict": False,
+            "available": None,
+            "sort": None,
+            "count": bool(COUNT_RE.search(text)),
+            "limit": None,
+        }
+        between = PRICE_BETWEEN_RE.search(text) or PRICE_RANGE_RE.search(text)
+        if between:
+            low, high = sorted(float(v) for v in between.groups())
+            spec["min_price"], spec["max_price"] = low, high
+        else:
+            if match := PRICE_MAX_RE.search(text):
+                spec["max_price"], spec["max_strict"] = float(match.group(2)), bool(match.group(1))
+            if match := PRICE_MIN_RE.search(text):
+                spec["min_price"], spec["min_strict"] = float(match.group(2)), bool(match.group(1))
+        if SOLD_OUT_RE.search(text):
+            spec["available"] = False
+        elif IN_STOCK_RE.search(text):
+            spec["available"] = True
+        if MOST_EXPENSIVE_RE.search(text):
+            spec["sort"] = "desc"
+        elif CHEAPEST_RE.search(text):
+            spec["sort"] = "asc"
+        if spec["sort"]:
+            match = TOP_N_RE.search(text)
+            n = match and next((g for g in match.groups() if g), None)
+            # "most expensive tumblers" → a few, "most expensive tumbler" → one
+            plural = PLURAL_CATEGORY_RE.search(text) or not spec["categories"]
+            spec["limit"] = int(n) if n else (3 if plural else 1)
+
+        structured = (
+            spec["colors"] or spec["min_price"] is not None or spec["max_price"] is not None
+            or spec["available"] is not None or spec["sort"] or (spec["count"] and spec["categories"])
+        )
+        return spec if structured else None
+
+    def select(self, spec: dict) -> np.ndarray:
+        """Variant rows matching `spec`, ordered by price (ascending unless sort="desc")."""
+        mask = np.ones(len(self.color), dtype=bool)
+        if spec.get("categories"):
+            wanted = np.zeros(len(self.names), dtype=bool)
+            for category in spec["categories"]:
+                wanted |= self.category_mask[category]
+            mask &= wanted[self.variant_product]
+        if spec.get("colors"):
+            colored = np.zeros(len(self.color), dtype=bool)
+            for color in spec["colors"]:
+                colored[self.color_index.get(color, [])] = True
+            mask &= colored
+        if spec.get("min_price") is not None:
+            mask &= (self.price > spec["min_price"]) if spec.get("min_strict") else (self.price >= spec["min_price"])
+        if spec.get("max_price") is not None:
+            mask &= (self.price < spec["max_price"]) if spec.get("max_strict") else (self.price <= spec["max_price"])
+        if spec.get("available") is not None:
+            mask &= self.available == spec["available"]
+        rows = np.flatnonzero(mask)
+        key = -self.price[rows] if spec.get("sort") == "desc" else self.price[rows]
+        return rows[np.argsort(key, kind="stable")]
+
+    def group(self, rows, limit: int = None):
+        """(number of products, [(product index, [variant rows])] for the first `limit`), in row order."""
+        products = self.variant_product[rows]
+        unique, first = np.unique(products, return_index=True)
+        order = unique[np.argsort(first, kind="stable")]
+        return len(order), [(int(p), rows[products == p].tolist()) for p in order[:limit]]
+
+    @staticmethod
+    def describe(spec: dict, plural: bool = True) -> str:
+        noun = "/".join(c + ("s" if plural else "") for c in spec["categories"]) or ("products" if plural else "product")
+        parts = [" ".join(spec["colors"] + [noun])]
+        if spec["available"] is True:
+            parts.append("in stock")
+        elif spec["available"] is False:
+            parts.append("that are sold out")
+        low, high = spec["min_price"], spec["max_price"]
+        if low is not None and high is not None and not spec["min_strict"] and not spec["max_strict"]:
+            parts.append(f"between {money(low)} and {money(high)}")
+        else:
+            bounds = []
+            if low is not None:
+                bounds.append(f"{'over' if spec['min_strict'] else 'from'} {money(low)}")
+            if high is not None:
+                bounds.append(f"{'under' if spec['max_strict'] else 'up to'} {money(high)}")
+            if bounds:
+                parts.append(" and ".join(bounds))
+        return " ".join(parts)
+
+    def _line(self, number: int, product: int, rows: list) -> str:
+        prices = sorted({float(self.price[r]) for r in rows})
+        price = money(prices[0]) if len(prices) == 1 else f"{money(prices[0])}–{money(prices[-1])}"
+        colors = ", ".join(
+            self.color[r] + ("" if self.available[r] else " (sold out)") for r in rows
+        )
+        return f"{number}. {self.names[product]} – {price} – {colors}\n   {self.urls[product]}"
+
+    def answer(self, question: str, limit: int = None):
+        """An exact answer for a structured question, or None to leave it to RAG."""
+        if not self.is_loaded:
+            return None
+        spec = self.parse(question)
+        if spec is None:
+            return None
+        limit = spec["limit"] or limit or int(os.getenv("PRODUCTS_STRUCTURED_LIMIT", "10"))
+        total, groups = self.group(self.select(spec), limit)
+        description = self.describe(spec)
+        if not total:
+            return f"Sorry, I couldn't find any {description} in our current catalog."
+
+        if spec["sort"]:
+            label = "most expensive" if spec["sort"] == "desc" else "cheapest"
+            header = f"Our {label} {self.describe(spec, plural=len(groups) > 1)}:"
+        elif spec["count"]:
+            header = f"We have {total} {description}:"
+        else:
+            header = f"{description[0].upper()}{description[1:]} ({total}):"
+        lines = [header] + [self._line(i, p, rows) for i, (p, rows) in enumerate(groups, 1)]
+        if total > limit and not spec["sort"]:
+            lines.append(f"…and {total - limit} more.")
+        return "\n".join(lines)
+
+    # ---------------- lexical retrieval ----------------
+    def search(self, query: str, k: int = 5) -> list:
+        return self.bm25.search(query, k)
+
+    def document(self, product: int) -> Document:
+        # Same text and metadata as the chunks dataProcess ingests into the vector store
+        return Document(
+            page_content=self.documents[product],
+            metadata={"product_id": self.products[product].get("product_id"),
+                      "name": self.names[product], "url": self.urls[product]},
+        )
+
+class HybridRetriever(BaseRetriever):
+    """
+    Vector retriever results fused with the catalog's BM25 hits by reciprocal
+    rank fusion, de-duplicated per product. Exact names and words the
+    embedding blurs ("BYSS", "600ml", "Corak") still find their product.
+    """
+
+    vector_retriever: Any
+    catalog: Any
+    k: int = 3
+    lexical_k: int = 5
+    rrf_k: int = 60
+
+    def _fuse(self, query: str, vector_docs: list) -> list:
+        scores, docs = {}, {}
+        ranked = [
+            [(str(doc.metadata.get("product_id") or doc.page_content), lambda doc=doc: doc) for doc in vector_docs],
+            [(self.catalog.product_ids[i], lambda i=i: self.catalog.document(i))
+             for i, _ in self.catalog.search(query, self.lexical_k)],
+        ]
+        for hits in ranked:
+            for rank, (key, document) in enumerate(hits):
+                scores[key] = scores.get(key, 0.0) + 1 / (self.rrf_k + rank + 1)
+                if key not in docs:
+                    docs[key] = document()
+        return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)[:self.k]]
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None):
+        return self._fuse(query, self.vector_retriever.invoke(query))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None):
+        return self._fuse(query, await self.vector_retriever.ainvoke(query))
+
+def structured_enabled() -> bool:
+    return os.getenv("PRODUCTS_STRUCTURED", "1") != "0"
+
+def hybrid_enabled() -> bool:
+    return os.getenv("PRODUCTS_HYBRID", "1") != "0"
+
+catalog = ProductCatalog()
@@ -1,49 +1,71 @@
 import os
+import asyncio
+from uuid import uuid4
 from dotenv import load_dotenv
 from fastapi import APIRouter, Query
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableSequence, RunnablePassthrough
 from langchain_pinecone import PineconeVectorStore, Pinecone
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from langchain_openai import OpenAIEmbeddings
 from pinecone import Pinecone, ServerlessSpec
+from session_store import get_store
+from history import ConversationHistory
+from llm_gateway import with_stage
+from clients import get_clients
+from intent_router import is_self_contained
+from product_catalog import catalog, HybridRetriever, structured_enabled, hybrid_enabled
+import metrics
 
 load_dotenv()
 router = APIRouter(tags=["Products"])
-conv_history = []
 index_name  = "pinecone-chatbot"  
 
-def pineconeConnect() :
-    pinecone_api_key = os.environ["PINECONE_API_KEY"] 
-    openai_api_key = os.environ["OPENAI_API_KEY"]  
-
-    client = Pinecone(pinecone_api_key) 
-    index = client.Index(index_name)
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    vectorstore = PineconeVectorStore(
-        index=index,
-        embedding=embeddings
-    )
+def pineconeConnect(embeddings=None) :
+    if embeddings is None:
+        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+
+    # VECTOR_BACKEND=local serves retrieval from the in-process snapshot
+    # written by dataProcess.ingest_to_pinecone instead of Pinecone
+    if os.getenv("VECTOR_BACKEND", "pinecone").lower() == "local":
+        from local_vectorstore import LocalVectorStore
+        vectorstore = LocalVectorStore.load(os.getenv("LOCAL_VECTOR_PATH", "product_index"), embeddings)
+    else:
+        pinecone_api_key = os.environ["PINECONE_API_KEY"] 
+        openai_api_key = os.environ["OPENAI_API_KEY"]  
+
+        client = Pinecone(pinecone_api_key) 
+        index = client.Index(index_name, pool_threads=int(os.getenv("PINECONE_POOL_THREADS", "4")))
+        vectorstore = PineconeVectorStore(
+            index=index,
+            embedding=embeddings
+        )
     retriever = vectorstore.as_retriever(
         search_kwargs={"k": 3, "score_threshold": 0.4}
     )
+    # PRODUCTS_HYBRID: fuse in BM25 hits from the product catalog, when there is one
+    if hybrid_enabled() and catalog.ensure_loaded():
+        retriever = HybridRetriever(vector_retriever=retriever, catalog=catalog)
     return retriever
 
+def data_version() -> str:
+    """
+    Identifies the product data answers were built from: the local snapshot's
+    write time, or PRODUCTS_DATA_VERSION (bump it after re-ingesting into Pinecone),
+    plus the catalog file's when one is loaded.
+    """
+    if os.getenv("VECTOR_BACKEND", "pinecone").lower() == "local":
+        meta_path = os.path.join(os.getenv("LOCAL_VECTOR_PATH", "product_index"), "meta.json")
+        version = str(os.path.getmtime(meta_path)) if os.path.exists(meta_path) else "empty"
+    else:
+        version = os.getenv("PRODUCTS_DATA_VERSION", "0")
+    # Structured answers come from the catalog file
+    return f"{version}:{catalog.version}" if catalog.is_loaded else version
+
 def combineAnswer(answers):
     return "\n\n".join(answer.page_content for answer in answers)
 
-def formatConvHistory(messages):
-    return (
-        "\n".join(
-            f"Human: {message}" if i%2==0 else f"AI: {message}"
-            for i, message in enumerate(messages)
-        )
-    )
-
-@router.get("/products")
-def main(query: str):
-    retriever = pineconeConnect()
-    llm = ChatOpenAI(model="gpt-5-mini-2025-08-07")
+def build_product_chain(llm, retriever):
     standaloneQ_template = ("Given some conversation history (if any) and a question, convert the question to a standalone question. " 
                             "conversation history: {conv_history}"
                             "question: {question}"
@@ -64,9 +86,9 @@ def main(query: str):
 
     answer_prompt = PromptTemplate.from_template(answer_template)
 
-    standaloneQ_chain = standaloneQ_prompt.pipe(llm).pipe(StrOutputParser())
+    standaloneQ_chain = standaloneQ_prompt.pipe(with_stage(llm, "products.rewrite")).pipe(StrOutputParser())
 
-    answer_chain = answer_prompt.pipe(llm).pipe(StrOutputParser())
+    answer_chain = answer_prompt.pipe(with_stage(llm, "products.answer")).pipe(StrOutputParser())
 
     retriever_chain = RunnableSequence(
         lambda x: x["standaloneQ"],
@@ -85,18 +107,108 @@ def main(query: str):
         },
         answer_chain
     )
-
-
-    response = chain.invoke(
+    return ProductChain(standaloneQ_chain, retriever, answer_chain, chain)
+
+class ProductChain:
+    """
+    The products RAG flow with an optional shortcut around the standalone-question
+    rewrite (PRODUCTS_REWRITE):
+      always → original sequential chain: rewrite, then retrieve, then answer
+      auto   → skip the rewrite when there is no history or the question is
+               already self-contained; otherwise rewrite, then retrieve
+    """
+
+    def __init__(self, standaloneQ_chain, retriever, answer_chain, sequential_chain, rewrite_mode: str = None):
+        self.standaloneQ_chain = standaloneQ_chain
+        self.retriever = retriever
+        self.answer_chain = answer_chain
+        self.sequential_chain = sequential_chain
+        self.rewrite_mode = (rewrite_mode or os.getenv("PRODUCTS_REWRITE", "auto")).lower()
+        self.stats = {"rewrites_skipped": 0, "rewrites": 0}
+
+    async def retrieve(self, question: str):
+        with metrics.span("products.retrieval"):
+            return await self.retriever.ainvoke(question)
+
+    async def retrieve_context(self, question: str, conv_history: str) -> str:
+        if not conv_history or is_self_contained(question):
+            self.stats["rewrites_skipped"] += 1
+            return combineAnswer(await self.retrieve(question))
+
+        self.stats["rewrites"] += 1
+        standalone = await self.standaloneQ_chain.ainvoke(
+            {"question": question, "conv_history": conv_history}
+        )
+        return combineAnswer(await self.retrieve(standalone))
+
+    async def astream(self, inputs: dict):
+        # The LLM steps are timed and metered by the gateway
+        if self.rewrite_mode == "always":
+            async for token in self.sequential_chain.astream(inputs):
+                yield token
+            return
+
+        context = await self.retrieve_context(inputs["question"], inputs["conv_history"])
+        async for token in self.answer_chain.astream({**inputs, "context": context}):
+            yield token
+
+_product_history = None
+
+def get_product_history() -> ConversationHistory:
+    # Products keeps its own Q/A history, namespaced apart from the chat session
+    global _product_history
+    if _product_history is None:
+        _product_history = ConversationHistory(get_store(), prefix="products:")
+    return _product_history
+
+async def stream_product_answer(query: str, session_id: str):
+    history = get_product_history()
+
+    # Price / color / availability filters and sorts are answered exactly from
+    # the catalog table, without retrieval or an LLM call
+    if structured_enabled() and catalog.ensure_loaded():
+        with metrics.span("products.structured"):
+            answer = catalog.answer(query)
+        if answer is not None:
+            yield answer
+            await history.append(session_id, query, answer, tool=True)
+            return
+
+    _, conv_history = await history.load(session_id)
+
+    # Built once per process and shared (see clients.AppClients)
+    chain = await get_clients().get_product_chain()
+
+    chunks = []
+    async for token in chain.astream(
         {
             "question": query,
-            "conv_history": formatConvHistory(conv_history)
+            "conv_history": conv_history
         }
-    )
+    ):
+        chunks.append(token)
+        yield token
 
-    conv_history.append(query)
-    conv_history.append(response)
-    return response
+    await history.append(session_id, query, "".join(chunks), tool=True)
+
+async def answer_product_question(query: str, session_id: str) -> str:
+    return "".join([token async for token in stream_product_answer(query, session_id)])
+
+@router.get("/products/cache")
+def products_cache_stats():
+    clients = get_clients()
+    embeddings = clients.embeddings
+    chain = clients._product_chain
+    return {
+        "embeddings": embeddings.stats() if hasattr(embeddings, "stats") else None,
+        "rewrite": chain.stats if chain is not None else None,
+    }
+
+@router.get("/products")
+async def main(query: str, session_id: str = None):
+    # Without a session_id each request is its own conversation, so direct
+    # callers never share one history
+    return await answer_product_question(query, session_id or str(uuid4()))
 
 if __name__ == "__main__":
-    main("Do you have blue tumblers from ZUS?")
\ No newline at end of file
+    asyncio.run(main("Do you have blue tumblers from ZUS?"))
\ No newline at end of file
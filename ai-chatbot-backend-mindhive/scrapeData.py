@@ -1,11 +1,25 @@
-import requests
 import json
+import asyncio
 from tqdm import tqdm
 
-import requests
+import httpx
 from bs4 import BeautifulSoup
 import re
-import time
+from fetcher import Fetcher
+
+try:
+    import lxml.html
+except ImportError:  # html.parser fallback, still one tree per page
+    lxml = None
+
+PRODUCT_URLS = [
+    "https://shop.zuscoffee.com/collections/shop-all-lifestyle/products.json",
+    "https://shop.zuscoffee.com/products/all-day-cup-500ml-17oz-sundaze-collection/product.json",
+    "https://shop.zuscoffee.com/products/all-day-cup-500ml-17oz/product.json",
+    "https://shop.zuscoffee.com/products/zus-og-cup-2-0-with-screw-on-lid/product.json",
+    "https://shop.zuscoffee.com/products/frozee-cold-cup-650ml-22oz/product.json"
+]
+OUTLETS_URL = "https://zuscoffee.com/category/store/kuala-lumpur-selangor/"
 
 def filter_by_tags(product, allowed_tags):
     """
@@ -29,11 +43,17 @@ def extract_product_info(product):
     """
     Extract only the essential product information:
     - Product name
+    - Product type and tags (the shop's own categories)
     - Variants with color and price
     """
+    tags = product.get('tags', [])
+    if isinstance(tags, str):
+        tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
     extracted = {
         "product_name": product.get('title', 'Unknown'),
         "product_id": product.get('id'),
+        "product_type": product.get('product_type') or "",
+        "tags": tags,
         "variants": [],
         "source_url": f"https://shop.zuscoffee.com/products/{product.get('handle')}"
     }
@@ -49,15 +69,31 @@ def extract_product_info(product):
     
     return extracted
 
-def scrape_products(filter_tags=None):
+async def fetch_all(urls, fetcher=None, progress=True):
+    """Fetch every URL concurrently (bounded per host by the fetcher). Failed URLs map to the exception."""
+    own = fetcher is None
+    fetcher = fetcher or Fetcher()
+    progress = tqdm(total=len(urls), desc="Processing URLs", disable=not progress)
+
+    async def fetch(url):
+        try:
+            return await fetcher.get(url)
+        except httpx.HTTPError as e:
+            return e
+        finally:
+            progress.update(1)
+
+    try:
+        results = await asyncio.gather(*(fetch(url) for url in urls))
+        return dict(zip(urls, results))
+    finally:
+        progress.close()
+        if own:
+            await fetcher.aclose()
+
+def scrape_products(filter_tags=None, urls=None, fetcher=None):
     # List of URLs to scrape
-    urls = [
-        "https://shop.zuscoffee.com/collections/shop-all-lifestyle/products.json",
-        "https://shop.zuscoffee.com/products/all-day-cup-500ml-17oz-sundaze-collection/product.json",
-        "https://shop.zuscoffee.com/products/all-day-cup-500ml-17oz/product.json",
-        "https://shop.zuscoffee.com/products/zus-og-cup-2-0-with-screw-on-lid/product.json",
-        "https://shop.zuscoffee.com/products/frozee-cold-cup-650ml-22oz/product.json"
-    ]
+    urls = urls or PRODUCT_URLS
     
     # Store all product data
     products_list = []
@@ -69,12 +105,15 @@ def scrape_products(filter_tags=None):
     
     print(f"Scraping products with filter tags: {filter_tags}")
     print()
+
+    responses = asyncio.run(fetch_all(urls, fetcher))
     
-    for url in tqdm(urls, desc="Processing URLs"):
+    for url in urls:
+        response = responses[url]
+        if isinstance(response, Exception):
+            print(f"✗ Error scraping {url}: {response}")
+            continue
         try:
-            response = requests.get(url)
-            response.raise_for_status()  # Raise an error for bad status codes
-            
             # Parse JSON directly
             data = response.json()
             
@@ -102,8 +141,6 @@ def scrape_products(filter_tags=None):
                     else:
                         filtered_count += 1
             
-        except requests.exceptions.RequestException as e:
-            print(f"✗ Error scraping {url}: {e}")
         except json.JSONDecodeError as e:
             print(f"✗ Error parsing JSON from {url}: {e}")
     
@@ -129,20 +166,39 @@ def scrape_products(filter_tags=None):
     
     return output_data
 
-def get_page(url):
-    """Fetch HTML content with headers"""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-    }
-    res = requests.get(url, headers=headers)
-    res.raise_for_status()
-    return res.text
+MAP_LINK_MARKERS = ("maps", "goo.gl", "g.page", "google.com")
 
-def parse_store_cards(html):
-    soup = BeautifulSoup(html, "html.parser")
-    articles = soup.select("article.elementor-post")
-    outlets = []
+def _has_class(el, name):
+    return name in (el.get("class") or "").split()
+
+def _text(el):
+    # Same as BeautifulSoup get_text(strip=True): stripped strings joined with ""
+    return "".join(t.strip() for t in el.itertext())
+
+def _lxml_store_cards(articles):
+    for art in articles:
+        name_tag = next((p for p in art.iter("p") if _has_class(p, "elementor-heading-title")), None)
+        if name_tag is None:
+            name_tag = next((s for s in art.iter("span") if _has_class(s, "entry-title")), None)
+        if name_tag is None:
+            continue
+        name = _text(name_tag)
+
+        # The first <p> after the name in document order, as find_next("p") does
+        address_tag = next(iter(name_tag.xpath("(descendant::p | following::p)[1]")), None)
+        address = _text(address_tag) if address_tag is not None else None
+
+        map_link = next((a.get("href") for a in art.iter("a")
+                         if any(m in (a.get("href") or "") for m in MAP_LINK_MARKERS)), None)
 
+        if name and address and map_link:
+            yield {
+                "name": name,
+                "address": address,
+                "google_map": map_link
+            }
+
+def _soup_store_cards(articles):
     for art in articles:
         name_tag = art.select_one("p.elementor-heading-title")
         if not name_tag:
@@ -156,38 +212,70 @@ def parse_store_cards(html):
         map_link = map_tag["href"] if map_tag else None
 
         if name and address and map_link:
-            outlets.append({
+            yield {
                 "name": name,
                 "address": address,
                 "google_map": map_link
-            })
+            }
 
-    return outlets
+def parse_listing(html):
+    """
+    Parses a store listing page once and returns (outlets generator, next page URL).
+    Uses lxml when installed, otherwise a single html.parser tree.
+    """
+    if lxml is not None:
+        if not html.strip():
+            return iter(()), None
+        tree = lxml.html.fromstring(html)
+        articles, next_url = [], None
+        # One walk over the tree collects the cards and the "next" pagination link
+        for el in tree.iter("article", "a"):
+            if el.tag == "article":
+                if _has_class(el, "elementor-post"):
+                    articles.append(el)
+            elif next_url is None and _has_class(el, "next") and _has_class(el, "page-numbers"):
+                next_url = el.get("href")
+        return _lxml_store_cards(articles), next_url
 
-def get_all_pages():
-    all_stores = []
-    page_num = 1
-    next_url = "https://zuscoffee.com/category/store/kuala-lumpur-selangor/"
+    soup = BeautifulSoup(html, "html.parser")
+    next_btn = soup.select_one("a.next.page-numbers")
+    return _soup_store_cards(soup.select("article.elementor-post")), next_btn["href"] if next_btn else None
 
-    while True:
-        print(f"Scraping page {page_num}: {next_url}")
+def parse_store_cards(html):
+    return list(parse_listing(html)[0])
 
-        html = get_page(next_url)
-        stores = parse_store_cards(html)
-        all_stores.extend(stores)
+def next_page_url(html):
+    return parse_listing(html)[1]
 
-        soup = BeautifulSoup(html, "html.parser")
-        next_btn = soup.select_one("a.next.page-numbers")
+async def crawl_outlet_pages(start_url=OUTLETS_URL, fetcher=None):
+    """
+    Walks the paginated store listing. As soon as a page's next link is known
+    the next fetch is started, so it overlaps with parsing the current page.
+    """
+    own = fetcher is None
+    fetcher = fetcher or Fetcher()
+    all_stores = []
+    page_num = 1
+    try:
+        pending = asyncio.ensure_future(fetcher.get(start_url))
+        while pending is not None:
+            page = await pending
+            print(f"Scraping page {page_num}: {page.url}{'' if page.changed else ' (not modified)'}")
 
-        if not next_btn:
-            break  # No more pages
+            outlets, next_url = parse_listing(page.text)
+            pending = asyncio.ensure_future(fetcher.get(next_url)) if next_url else None
 
-        next_url = next_btn["href"]
-        page_num += 1
-        time.sleep(1)
+            all_stores.extend(await asyncio.to_thread(list, outlets))
+            page_num += 1
+    finally:
+        if own:
+            await fetcher.aclose()
 
     return all_stores
 
+def get_all_pages(start_url=OUTLETS_URL, fetcher=None):
+    return asyncio.run(crawl_outlet_pages(start_url, fetcher))
+
 if __name__ == "__main__":
     scraped_data = scrape_products(filter_tags=['Tumbler', 'BYSS'])
     print(f"\n📊 Total products scraped: {len(scraped_data['products'])}")
@@ -0,0 +1,129 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from cache import normalize_text
+from clients import get_clients
+
+# Answer cache for /api/chat tool answers. Once the planner has picked a tool,
+# the message is embedded and compared (cosine) against earlier cached
+# messages; the earlier answer is reused when the similarity clears
+# SEMANTIC_CACHE_THRESHOLD and
+#   - the conversation context matches (see context_key), and
+#   - the cached answer came from the same tool, and
+#   - the product/outlet data versions the answer was built from are current.
+# Only tool answers (products / outlets) are cached. SEMANTIC_CACHE=0 disables it.
+
+CACHEABLE_ACTIONS = ("call_products", "call_outlets")
+
+def context_key(conv_history: list, turns: int = 2) -> str:
+    """
+    Answers on a fresh conversation are interchangeable; mid-conversation ones
+    are only reused when the last `turns` messages are the same.
+    """
+    if not conv_history:
+        return ""
+    recent = "\n".join(normalize_text(str(m)) for m in conv_history[-turns:])
+    return hashlib.sha1(recent.encode("utf-8")).hexdigest()
+
+class SemanticCache:
+    def __init__(self, embeddings=None, threshold: float = None, maxsize: int = None, ttl: float = None):
+        self._embeddings = embeddings
+        self.threshold = threshold if threshold is not None else float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+        self.maxsize = maxsize or int(os.getenv("SEMANTIC_CACHE_SIZE", "2000"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+        self._matrix = None
+        self._valid = np.zeros(self.maxsize, dtype=bool)
+        self._entries = OrderedDict()  # slot -> entry, least recently used first
+        self._free = list(range(self.maxsize - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.stale = 0
+        self.latency_saved_ms = 0.0
+
+    @property
+    def embeddings(self):
+        return self._embeddings or get_clients().embeddings
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "stale_evictions": self.stale,
+            "latency_saved_ms": round(self.latency_saved_ms, 1),
+        }
+
+    def cache_counts(self) -> dict:
+        return {"hits": self.hits, "misses": self.lookups - self.hits, "size": len(self._entries)}
+
+    def _release(self, slot):
+        self._entries.pop(slot, None)
+        self._valid[slot] = False
+        self._free.append(slot)
+
+    def clear(self):
+        with self._lock:
+            for slot in list(self._entries):
+                self._release(slot)
+
+    async def embed(self, message: str) -> np.ndarray:
+        vector = np.asarray(await self.embeddings.aembed_query(message), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, vector: np.ndarray, context: str, versions: dict):
+        """Best compatible cached entry above the threshold, as (entry, similarity), or (None, best score)."""
+        self.lookups += 1
+        now = time.monotonic()
+        with self._lock:
+            if self._matrix is None or not self._entries:
+                return None, 0.0
+            scores = self._matrix @ vector
+            scores[~self._valid] = -1.0
+            best_score = float(scores.max())
+            for slot in np.argsort(-scores)[:8]:
+                score = float(scores[slot])
+                if score < self.threshold:
+                    break
+                entry = self._entries.get(int(slot))
+                if entry is None:
+                    continue
+                if entry["expires_at"] <= now or entry["versions"] != versions:
+                    self.stale += 1
+                    self._release(int(slot))
+                    continue
+                if entry["context"] != context:
+                    continue
+                self._entries.move_to_end(int(slot))
+                self.hits += 1
+                self.latency_saved_ms += entry["latency_ms"]
+                return entry, score
+        return None, best_score
+
+    def store(self, vector: np.ndarray, message: str, context: str, versions: dict, response: dict, latency_ms: float):
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+            if not self._free:
+                lru_slot = next(iter(self._entries))
+                self._release(lru_slot)
+            slot = self._free.pop()
+            self._matrix[slot] = vector
+            self._valid[slot] = True
+            self._entries[slot] = {
+                "message": message,
+                "context": context,
+                "versions": dict(versions),
+                "response": response,
+                "latency_ms": latency_ms,
+                "expires_at": time.monotonic() + self.ttl,
+            }
+
+def semantic_cache_enabled() -> bool:
+    return os.getenv("SEMANTIC_CACHE", "1") != "0"
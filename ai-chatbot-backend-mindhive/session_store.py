@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+
+# SESSION_BACKEND=memory → per-process LRU/TTL store (single worker)
+# SESSION_BACKEND=sqlite → shared SQLite file, safe across uvicorn workers on one node.
+#                          Single node only: SESSION_DB_PATH must be on a local disk,
+#                          since WAL mode is not safe on network filesystems.
+DEFAULT_TTL_SECONDS = 60 * 60
+DEFAULT_MAX_SESSIONS = 10_000
+DEFAULT_MAX_MESSAGES = 50
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+def _encode(message) -> str:
+    return json.dumps(message, ensure_ascii=False, default=str)
+
+class ConversationStore:
+    """Session-keyed conversation history. Messages alternate Human / AI."""
+
+    async def get(self, session_id: str) -> list:
+        raise NotImplementedError
+
+    async def append(self, session_id: str, *messages):
+        raise NotImplementedError
+
+    async def clear(self, session_id: str):
+        raise NotImplementedError
+
+class MemoryConversationStore(ConversationStore):
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 max_messages: int = DEFAULT_MAX_MESSAGES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        # session_id -> [last_access, messages, sizes]
+        self._sessions = OrderedDict()
+        self._bytes = 0
+
+    def _drop(self, session_id):
+        _, _, sizes = self._sessions.pop(session_id)
+        self._bytes -= sum(sizes)
+
+    def _expire(self, now):
+        # Sessions are kept in access order, so expired ones sit at the front
+        while self._sessions:
+            session_id, (last_access, _, _) = next(iter(self._sessions.items()))
+            if now - last_access < self.ttl_seconds:
+                break
+            self._drop(session_id)
+
+    def _touch(self, session_id, now):
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            entry = [now, [], []]
+            self._sessions[session_id] = entry
+        entry[0] = now
+        self._sessions.move_to_end(session_id)
+        return entry
+
+    async def get(self, session_id: str) -> list:
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return []
+        self._touch(session_id, now)
+        return list(entry[1])
+
+    async def append(self, session_id: str, *messages):
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._touch(session_id, now)
+        _, history, sizes = entry
+        for message in messages:
+            size = len(_encode(message))
+            history.append(message)
+            sizes.append(size)
+            self._bytes += size
+
+        # Keep whole Human/AI pairs so the history never starts on an AI turn
+        while len(history) > self.max_messages:
+            for _ in range(min(2, len(history))):
+                history.pop(0)
+                self._bytes -= sizes.pop(0)
+
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._sessions)))
+
+    async def clear(self, session_id: str):
+        if session_id in self._sessions:
+            self._drop(session_id)
+
+    def stats(self) -> dict:
+        return {"sessions": len(self._sessions), "bytes": self._bytes}
+
+class SQLiteConversationStore(ConversationStore):
+    def __init__(self, path: str, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_messages: int = DEFAULT_MAX_MESSAGES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self._local = threading.local()
+        self._last_sweep = 0.0
+        with self._conn() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, seq);
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    last_access REAL NOT NULL
+                );
+            """)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads; keep one per worker thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _sweep(self, conn, now):
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        cutoff = now - self.ttl_seconds
+        conn.execute("DELETE FROM messages WHERE session_id IN (SELECT session_id FROM sessions WHERE last_access < ?)", (cutoff,))
+        conn.execute("DELETE FROM sessions WHERE last_access < ?", (cutoff,))
+
+    def _get(self, session_id):
+        now = time.time()
+        with self._conn() as conn:
+            self._sweep(conn, now)
+            row = conn.execute("SELECT last_access FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None or now - row[0] >= self.ttl_seconds:
+                return []
+            conn.execute("UPDATE sessions SET last_access = ? WHERE session_id = ?", (now, session_id))
+            rows = conn.execute(
+                "SELECT content FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                (session_id, self.max_messages)
+            ).fetchall()
+        return [json.loads(content) for (content,) in reversed(rows)]
+
+    def _append(self, session_id, messages):
+        now = time.time()
+        with self._conn() as conn:
+            row = conn.execute("SELECT last_access FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is not None and now - row[0] >= self.ttl_seconds:
+                conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.execute(
+                "INSERT INTO sessions (session_id, last_access) VALUES (?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET last_access = excluded.last_access",
+                (session_id, now)
+            )
+            conn.executemany(
+                "INSERT INTO messages (session_id, content, created_at) VALUES (?, ?, ?)",
+                [(session_id, _encode(m), now) for m in messages]
+            )
+            # Drop whole Human/AI pairs from the front, as the memory store does,
+            # so the history never starts on an AI turn
+            count = conn.execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+            excess = count - self.max_messages
+            if excess > 0:
+                excess += excess % 2
+                conn.execute(
+                    "DELETE FROM messages WHERE seq IN "
+                    "(SELECT seq FROM messages WHERE session_id = ? ORDER BY seq ASC LIMIT ?)",
+                    (session_id, excess)
+                )
+
+    def _clear(self, session_id):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    async def get(self, session_id: str) -> list:
+        return await asyncio.to_thread(self._get, session_id)
+
+    async def append(self, session_id: str, *messages):
+        await asyncio.to_thread(self._append, session_id, messages)
+
+    async def clear(self, session_id: str):
+        await asyncio.to_thread(self._clear, session_id)
+
+def create_store() -> ConversationStore:
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    ttl_seconds = float(os.getenv("SESSION_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+    max_messages = int(os.getenv("SESSION_MAX_MESSAGES", DEFAULT_MAX_MESSAGES))
+
+    if backend == "memory":
+        return MemoryConversationStore(
+            ttl_seconds=ttl_seconds,
+            max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", DEFAULT_MAX_SESSIONS)),
+            max_messages=max_messages,
+            max_bytes=int(os.getenv("SESSION_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        )
+    if backend == "sqlite":
+        return SQLiteConversationStore(
+            os.getenv("SESSION_DB_PATH", "sessions.db"),
+            ttl_seconds=ttl_seconds,
+            max_messages=max_messages,
+        )
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+
+_store = None
+
+def get_store() -> ConversationStore:
+    global _store
+    if _store is None:
+        _store = create_store()
+    return _store
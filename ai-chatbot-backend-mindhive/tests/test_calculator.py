@@ -0,0 +1,95 @@
+"""
+SafeCalculator: resource limits on adversarial input, operands with no
+operator between them, and reuse of cached compiles.
+
+    uv run pytest tests/test_calculator.py
+"""
+import time
+
+import pytest
+
+from calculator import LimitExceeded, SafeCalculator
+from intent_router import FastIntentRouter
+
+# Every input must come back (as a value or an error) well within this
+BUDGET_SECONDS = 0.05
+
+@pytest.fixture
+def calculator():
+    return SafeCalculator()
+
+def timed(calculator, expression):
+    start = time.perf_counter()
+    result = calculator.eval_expr(expression)
+    assert time.perf_counter() - start < BUDGET_SECONDS, expression
+    return result
+
+@pytest.mark.parametrize("expression, value", [
+    ("12*7+3", 87), ("2**10", 1024), ("(1500-250)/4", 312.5), ("-3+5*2", 7),
+    ("1 + 2", 3), ("2 **3", 8), ("((2+3)*(4-1))**2", 225),
+])
+def test_arithmetic(calculator, expression, value):
+    assert calculator.eval_expr(expression) == value
+
+@pytest.mark.parametrize("expression", [
+    "9**9**9",
+    "2**10000000",
+    "(10**100)**(10**100)",
+    "10**38**10",
+    "2**2**2**2**2**2**2**2",
+    "((((2**64)**2)**2)**2)**2",
+    "(2**127)*(2**127)*(2**127)*(2**127)*(2**127)*(2**127)*(2**127)*(2**127)*(2**127)",
+    "1.5**100000",
+    "2**1e300",
+    "9" * 200,
+])
+def test_huge_results_hit_a_limit(calculator, expression):
+    result = timed(calculator, expression)
+    assert result["success"] is False
+    assert result["error"].startswith("Expression exceeds calculator limits")
+
+@pytest.mark.parametrize("expression", [
+    "(" * 100 + "1" + ")" * 100,
+    "-" * 200 + "1",
+    "+".join(["1"] * 200),
+    "(" * 60 + "2**2" + ")" * 60 + "**" + "(" * 60 + "2" + ")" * 60,
+])
+def test_deep_or_long_expressions_are_bounded(calculator, expression):
+    result = timed(calculator, expression)
+    assert not isinstance(result, dict) or result["success"] is False
+
+def test_nesting_limit(calculator):
+    with pytest.raises(LimitExceeded):
+        calculator.compile("-" * 100 + "1")
+
+@pytest.mark.parametrize("expression", ["1 2", "2 3*4", "3 4 + 1", "2* *3", "1. 5", "1e 3"])
+def test_juxtaposed_operands_are_rejected(calculator, expression):
+    result = calculator.eval_expr(expression)
+    assert isinstance(result, dict) and result["success"] is False
+    assert not calculator.is_expression(expression)
+
+def test_router_leaves_juxtaposed_operands_to_the_planner():
+    router = FastIntentRouter()
+    assert router.route("what is 3 4 + 1") is None
+    assert router.route("what is 34 + 1")["payload"]["expression"] == "34 + 1"
+
+def test_compiles_are_cached(calculator):
+    compiled = calculator.compile("12*7+3")
+    assert calculator.compile("12*7+3") is compiled
+    assert calculator.compiled.hits == 1
+    # A differently spaced input is compiled on its own, never served another's result
+    assert calculator.compile("12 * 7 + 3") is not compiled
+    assert calculator.eval_expr("12 * 7 + 3") == 87
+
+def test_cached_compile_is_not_confused_with_spacing(calculator):
+    assert calculator.eval_expr("12") == 12
+    assert calculator.eval_expr("1 2")["success"] is False
+    assert calculator.eval_expr("2**3") == 8
+    assert calculator.eval_expr("2* *3")["success"] is False
+
+def test_rejections_are_cached(calculator):
+    for _ in range(3):
+        assert calculator.eval_expr("9**9**9")["success"] is False
+        assert calculator.eval_expr("1 2")["success"] is False
+    assert len(calculator.compiled) == 2
+    assert calculator.compiled.hits == 4
@@ -0,0 +1,61 @@
+"""
+scrapeData.parse_listing (lxml and html.parser backends) must extract exactly
+what the old two-pass BeautifulSoup parser did, on real listing pages and on
+pages with missing or odd fields.
+
+    uv run pytest tests/test_outlet_parser.py
+"""
+import glob
+import os
+
+import pytest
+
+import scrapeData
+from bench_outlet_parser import FIXTURES as BENCH_PAGES, legacy_parse
+
+ODD_PAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "outlet_pages")
+PAGES = sorted(glob.glob(os.path.join(BENCH_PAGES, "*.html")) + glob.glob(os.path.join(ODD_PAGES, "*.html")))
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+def parse(html):
+    outlets, next_url = scrapeData.parse_listing(html)
+    return list(outlets), next_url
+
+@pytest.fixture(params=["lxml", "html.parser"])
+def backend(request, monkeypatch):
+    if request.param == "lxml" and scrapeData.lxml is None:
+        pytest.skip("lxml is not installed")
+    if request.param == "html.parser":
+        monkeypatch.setattr(scrapeData, "lxml", None)
+    return request.param
+
+@pytest.mark.parametrize("path", PAGES, ids=os.path.basename)
+def test_matches_legacy_parser(path, backend):
+    html = read(path)
+    assert parse(html) == legacy_parse(html)
+
+def test_odd_fields(backend):
+    outlets, next_url = parse(read(os.path.join(ODD_PAGES, "odd-fields.html")))
+    names = [o["name"] for o in outlets]
+    assert names == [
+        "ZUS Coffee – Jaya One",
+        "ZUS Coffee &Bakery– Sunway\xa0Pyramid",
+        "ZUS Coffee – Menara UOA Bangsar",
+        "ZUS Coffee – Kota Damansara",
+        "ZUS Coffee – Wangsa Walk Mall",
+    ]
+    assert outlets[1]["address"] == "Lot LG2.37,   Level LG2,Sunway Pyramid, 47500 Subang Jaya, Selangor"
+    assert outlets[1]["google_map"] == "https://g.page/sunway-pyramid-zus?share"
+    assert outlets[3]["google_map"] == "https://maps.google.com/?q=ZUS+Kota+Damansara"
+    # No address of its own: the next paragraph on the page, as before
+    assert outlets[4]["address"] == "© ZUS Coffee"
+    assert next_url == "https://zuscoffee.com/category/store/kuala-lumpur-selangor/page/3/"
+
+@pytest.mark.parametrize("name, stores", [("last-page.html", 1), ("no-stores.html", 0), ("empty.html", 0)])
+def test_last_and_empty_pages(name, stores, backend):
+    outlets, next_url = parse(read(os.path.join(ODD_PAGES, name)))
+    assert len(outlets) == stores
+    assert next_url is None
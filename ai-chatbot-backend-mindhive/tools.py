@@ -0,0 +1,58 @@
+import os
+import products
+import outlets
+from clients import get_clients
+
+# "local"  → call the products/outlets pipelines in-process
+# "remote" → call /api/products and /api/outlets over HTTP (split deployments)
+DISPATCH_MODES = ("local", "remote")
+
+class ToolError(Exception):
+    pass
+
+class ToolDispatcher:
+    def __init__(self, mode: str = None, api_base: str = None):
+        self.mode = (mode or os.getenv("TOOL_DISPATCH_MODE", "local")).lower()
+        if self.mode not in DISPATCH_MODES:
+            raise ValueError(f"Unknown tool dispatch mode: {self.mode}")
+        self.api_base = api_base or os.getenv("API_BASE_URL")
+        if self.mode == "remote" and not self.api_base:
+            raise ValueError("API_BASE_URL is required when TOOL_DISPATCH_MODE=remote")
+
+    async def _get(self, path: str, params: dict):
+        res = await get_clients().http.get(f"{self.api_base}/{path}", params=params)
+        if res.is_error:
+            raise ToolError(f"{path} returned HTTP {res.status_code}")
+        return res.json()
+
+    async def call_products(self, query: str, session_id: str):
+        if self.mode == "remote":
+            return await self._get("products", {"query": query, "session_id": session_id})
+        return await products.answer_product_question(query, session_id)
+
+    async def call_outlets(self, query: str):
+        if self.mode == "remote":
+            return await self._get("outlets", {"query": query})
+        try:
+            return await outlets.answer_outlet_question(query)
+        except Exception as e:
+            raise ToolError(str(e)) from e
+
+    # Streaming variants yield answer tokens; remote mode has no streaming
+    # endpoint, so the whole answer arrives as a single chunk.
+    async def stream_products(self, query: str, session_id: str):
+        if self.mode == "remote":
+            yield await self.call_products(query, session_id)
+            return
+        async for token in products.stream_product_answer(query, session_id):
+            yield token
+
+    async def stream_outlets(self, query: str):
+        if self.mode == "remote":
+            yield await self.call_outlets(query)
+            return
+        try:
+            async for token in outlets.stream_outlet_answer(query):
+                yield token
+        except Exception as e:
+            raise ToolError(str(e)) from e
@@ -15,6 +15,13 @@ const apiBase = process.env.REACT_APP_API_BASE_URL;
         planner: ['Greet', 'Finish']
       }];
   });
+  const [sessionId] = useState(() => {
+    const saved = localStorage.getItem('zus-session-id');
+    if (saved) return saved;
+    const id = crypto.randomUUID();
+    localStorage.setItem('zus-session-id', id);
+    return id;
+  });
   const [input, setInput] = useState('');
   const [showCommands, setShowCommands] = useState(false);
   const [isTyping, setIsTyping] = useState(false);
@@ -80,7 +87,7 @@ const apiBase = process.env.REACT_APP_API_BASE_URL;
         const res = await fetch(`${apiBase}/api/chat`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ question: input }),
+        body: JSON.stringify({ question: input, session_id: sessionId }),
         });
         /*
         if (!res.ok) throw new Error("Failed to get AI answer");
@@ -117,24 +124,69 @@ const apiBase = process.env.REACT_APP_API_BASE_URL;
         const res = await fetch(`${apiBase}/api/chat`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ question: input }),
+        body: JSON.stringify({ question: input, session_id: sessionId, stream: true }),
         });
         
-        if (!res.ok) throw new Error("Failed to get AI answer");
-        const data = await res.json();
-        //console.log("res: ", data.message)
+        if (!res.ok || !res.body) throw new Error("Failed to get AI answer");
 
-        const answerText = (data && (data.message || data.text)) || "(no answer)";
-    
-        const aiMessage = {
-          id: Date.now() + 1,
-          role: 'assistant',
-          content: answerText,
-          timestamp: new Date().toISOString(),
-          planner: data.debug.planner_action
+        const aiId = Date.now() + 1;
+        let started = false;
+        let planner;
+        const updateAiMessage = (patch) => {
+          if (!started) {
+            started = true;
+            setIsTyping(false);
+            setMessages(prev => [...prev, {
+              id: aiId,
+              role: 'assistant',
+              content: '',
+              timestamp: new Date().toISOString(),
+              planner,
+              ...patch(null)
+            }]);
+            return;
+          }
+          setMessages(prev => prev.map(m => m.id === aiId ? { ...m, ...patch(m) } : m));
         };
-        
-        setMessages(prev => [...prev, aiMessage]);
+
+        // Server-Sent Events: "plan", then "token" chunks, then "done" (or "error")
+        const handleEvent = (event, data) => {
+          if (event === 'plan') {
+            // Keep the typing indicator until the first answer token arrives
+            planner = data.planner_action;
+          } else if (event === 'token') {
+            updateAiMessage(m => ({ content: (m ? m.content : '') + data.text }));
+          } else if (event === 'done') {
+            const answerText = (data && (data.message || data.text)) || "(no answer)";
+            updateAiMessage(() => ({
+              content: String(answerText),
+              planner: data && data.debug ? data.debug.planner_action : planner
+            }));
+          } else if (event === 'error') {
+            throw new Error(data.message);
+          }
+        };
+
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+          let boundary;
+          while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let event = 'message';
+            let dataLines = [];
+            raw.split('\n').forEach(line => {
+              if (line.startsWith('event:')) event = line.slice(6).trim();
+              else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+            });
+            handleEvent(event, JSON.parse(dataLines.join('\n')));
+          }
+        }
         setIsTyping(false);
       } 
       catch (err) {